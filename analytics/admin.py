@@ -0,0 +1,25 @@
+from django.contrib import admin
+from .models import DailySales, ProductSales
+
+
+class RollupAdmin(admin.ModelAdmin):
+    """Сводки только для просмотра: их ведут сигналы и rebuild_analytics"""
+    list_filter = ['status']
+    date_hierarchy = 'day'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DailySales)
+class DailySalesAdmin(RollupAdmin):
+    list_display = ['day', 'status', 'orders', 'units', 'revenue']
+
+
+@admin.register(ProductSales)
+class ProductSalesAdmin(RollupAdmin):
+    list_display = ['day', 'status', 'dimension', 'object_id', 'units', 'revenue']
+    list_filter = ['dimension', 'status']
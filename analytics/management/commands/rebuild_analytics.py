@@ -0,0 +1,25 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересчитать сводки продаж из заказов (целиком или за период)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Первый день периода, ГГГГ-ММ-ДД')
+        parser.add_argument('--until', help='Последний день периода, ГГГГ-ММ-ДД')
+
+    def parse(self, value, name):
+        if not value:
+            return None
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f'--{name}: ожидается дата ГГГГ-ММ-ДД, получено {value!r}')
+
+    def handle(self, *args, since=None, until=None, **options):
+        daily, products = rebuild(self.parse(since, 'since'), self.parse(until, 'until'))
+        self.stdout.write(self.style.SUCCESS(f'Готово: {daily} дневных строк, {products} строк по товарам'))
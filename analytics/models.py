@@ -0,0 +1,95 @@
+from django.db import models
+from knifestore.models import Order
+
+
+class DailySales(models.Model):
+    """Сводка заказов за день в разрезе статуса"""
+    day = models.DateField(
+        verbose_name="День"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=Order.STATUS_CHOICES,
+        verbose_name="Статус"
+    )
+    orders = models.IntegerField(
+        default=0,
+        verbose_name="Заказов"
+    )
+    units = models.IntegerField(
+        default=0,
+        verbose_name="Единиц товара"
+    )
+    revenue = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name="Выручка"
+    )
+
+    class Meta:
+        verbose_name = "Продажи за день"
+        verbose_name_plural = "Продажи по дням"
+        ordering = ['-day', 'status']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status'], name='unique_daily_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status}: {self.revenue}"
+
+
+class ProductSales(models.Model):
+    """Продажи позиций за день по ножу, бренду или категории"""
+    KNIFE = 'knife'
+    BRAND = 'brand'
+    CATEGORY = 'category'
+    DIMENSION_CHOICES = [
+        (KNIFE, 'Нож'),
+        (BRAND, 'Бренд'),
+        (CATEGORY, 'Категория'),
+    ]
+
+    day = models.DateField(
+        verbose_name="День"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=Order.STATUS_CHOICES,
+        verbose_name="Статус"
+    )
+    dimension = models.CharField(
+        max_length=10,
+        choices=DIMENSION_CHOICES,
+        verbose_name="Разрез"
+    )
+    # id ножа, бренда или категории; без FK, чтобы сводка не мешала удалять справочники
+    object_id = models.BigIntegerField(
+        verbose_name="Объект"
+    )
+    units = models.IntegerField(
+        default=0,
+        verbose_name="Единиц товара"
+    )
+    revenue = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        verbose_name="Выручка"
+    )
+
+    class Meta:
+        verbose_name = "Продажи товара за день"
+        verbose_name_plural = "Продажи товаров по дням"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'status', 'dimension', 'object_id'],
+                name='unique_product_sales'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['dimension', 'day'], name='product_sales_dim_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.dimension}#{self.object_id}: {self.units}"
@@ -0,0 +1,93 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Sum
+from django.utils import timezone
+
+from knifestore.models import Brand, Category, Knife, Order
+from .models import DailySales, ProductSales
+
+DEFAULT_PERIOD_DAYS = 30
+MAX_PERIOD_DAYS = 366
+TOP_LIMIT = 10
+NAME_FIELDS = {
+    ProductSales.KNIFE: (Knife, 'title'),
+    ProductSales.BRAND: (Brand, 'name'),
+    ProductSales.CATEGORY: (Category, 'name'),
+}
+
+
+def excluded_statuses():
+    """Статусы, которые не считаются продажей (по умолчанию — отменённые)"""
+    return list(getattr(settings, 'ANALYTICS_EXCLUDED_STATUSES', ['cancelled']))
+
+
+def period(days=None, until=None):
+    """(since, until) включительно; days ограничен MAX_PERIOD_DAYS"""
+    until = until or timezone.localdate()
+    days = min(max(int(days or DEFAULT_PERIOD_DAYS), 1), MAX_PERIOD_DAYS)
+    return until - timedelta(days=days - 1), until
+
+
+def average(total, count):
+    return (Decimal(total) / count).quantize(Decimal('0.01')) if count else Decimal(0)
+
+
+def top_products(dimension, since, until, limit=TOP_LIMIT):
+    """Лидеры продаж разреза по выручке; названия — одним запросом к справочнику"""
+    rows = list(
+        ProductSales.objects.filter(dimension=dimension, day__range=(since, until))
+        .exclude(status__in=excluded_statuses())
+        .values('object_id')
+        .annotate(units=Sum('units'), revenue=Sum('revenue'))
+        .order_by('-revenue', '-units', 'object_id')[:limit]
+    )
+    model, field = NAME_FIELDS[dimension]
+    names = dict(model.objects.filter(pk__in=[row['object_id'] for row in rows]).values_list('pk', field))
+    return [
+        {'id': row['object_id'], 'name': names.get(row['object_id'], f'#{row["object_id"]} (удалён)'),
+         'units': row['units'], 'revenue': row['revenue']}
+        for row in rows
+    ]
+
+
+def sales_report(since, until, limit=TOP_LIMIT):
+    """
+    Отчёт за период только по таблицам сводок: по дням, по статусам,
+    средний чек и размер корзины, лидеры по ножам, брендам и категориям.
+    """
+    excluded = excluded_statuses()
+    daily = DailySales.objects.filter(day__range=(since, until))
+
+    days = {}
+    for row in daily.exclude(status__in=excluded).values('day').annotate(
+            orders=Sum('orders'), units=Sum('units'), revenue=Sum('revenue')).order_by('day'):
+        days[row['day']] = row
+
+    labels = dict(Order.STATUS_CHOICES)
+    statuses = [
+        {'status': row['status'], 'label': labels.get(row['status'], row['status']),
+         'orders': row['orders'], 'units': row['units'], 'revenue': row['revenue']}
+        for row in daily.values('status').annotate(
+            orders=Sum('orders'), units=Sum('units'), revenue=Sum('revenue')).order_by('status')
+    ]
+
+    orders = sum(row['orders'] for row in days.values())
+    units = sum(row['units'] for row in days.values())
+    revenue = sum((row['revenue'] for row in days.values()), Decimal(0))
+    return {
+        'since': since,
+        'until': until,
+        'excluded_statuses': excluded,
+        'totals': {
+            'orders': orders,
+            'units': units,
+            'revenue': revenue,
+            'average_order_value': average(revenue, orders),
+            'average_basket_size': average(units, orders),
+        },
+        'daily': list(days.values()),
+        'statuses': statuses,
+        'top': {dimension: top_products(dimension, since, until, limit) for dimension in NAME_FIELDS},
+    }
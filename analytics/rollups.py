@@ -0,0 +1,260 @@
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from knifestore.models import Knife, Order, OrderItem
+from .models import DailySales, ProductSales
+
+# Снимки строк до и после изменения: из них считается дельта сводок
+OrderState = namedtuple('OrderState', 'pk day status total')
+ItemState = namedtuple('ItemState', 'order_id knife_id quantity price')
+
+
+def order_day(value):
+    return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+
+
+def order_state(order):
+    return OrderState(order.pk, order_day(order.order_date), order.status, order.total_amount or Decimal(0))
+
+
+def item_state(item):
+    return ItemState(item.order_id, item.knife_id, item.quantity, item.price)
+
+
+class RollupDelta:
+    """
+    Накопитель изменений сводок.
+
+    Дельты по одинаковым ключам складываются в памяти, затем apply() пишет
+    каждую таблицу сводок одним INSERT ... ON CONFLICT/ON DUPLICATE KEY
+    UPDATE x = x + d на все строки сразу. Внутри транзакции запись
+    откладывается до её коммита: строка DailySales дня — общая для всех
+    заказов, и её блокировка не должна жить всё время оформления. Если
+    процесс упадёт между коммитом и записью, расхождение исправит
+    rebuild_analytics.
+    """
+
+    def __init__(self):
+        self.daily = defaultdict(lambda: [0, 0, Decimal(0)])
+        self.items = defaultdict(lambda: [0, Decimal(0)])
+
+    def add_order(self, key, sign, total):
+        row = self.daily[key]
+        row[0] += sign
+        row[2] += sign * total
+
+    def add_item(self, key, knife_id, sign, quantity, price):
+        self.daily[key][1] += sign * quantity
+        row = self.items[key + (knife_id,)]
+        row[0] += sign * quantity
+        row[1] += sign * quantity * price
+
+    def product_rows(self):
+        """(day, status, knife_id) -> строки по ножу, бренду и категории"""
+        knife_ids = {knife_id for _, _, knife_id in self.items}
+        owners = {
+            pk: (brand_id, category_id)
+            for pk, brand_id, category_id in Knife.objects.filter(pk__in=knife_ids)
+            .values_list('pk', 'publisher_id', 'category_id')
+        }
+        rows = defaultdict(lambda: [0, Decimal(0)])
+        for (day, status, knife_id), (units, revenue) in self.items.items():
+            brand_id, category_id = owners.get(knife_id, (None, None))
+            for dimension, object_id in ((ProductSales.KNIFE, knife_id),
+                                         (ProductSales.BRAND, brand_id),
+                                         (ProductSales.CATEGORY, category_id)):
+                if object_id is None:
+                    continue
+                row = rows[(day, status, dimension, object_id)]
+                row[0] += units
+                row[1] += revenue
+        return rows
+
+    def apply(self):
+        if not self.daily and not self.items:
+            return
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(self.write, robust=True)
+        else:
+            self.write()
+
+    def write(self):
+        increment_many(DailySales, ['day', 'status'], ['orders', 'units', 'revenue'], [
+            key + tuple(values) for key, values in self.daily.items() if any(values)
+        ])
+        if self.items:
+            increment_many(ProductSales, ['day', 'status', 'dimension', 'object_id'], ['units', 'revenue'], [
+                key + tuple(values) for key, values in self.product_rows().items() if any(values)
+            ])
+
+
+def increment_many(model, key_fields, value_fields, rows, batch_size=500):
+    """
+    Прибавить значения к строкам сводки одним запросом на пакет:
+    [(ключ..., значения...), ...]; недостающие строки создаются.
+
+    bulk_create(update_conflicts=True) здесь не подходит — он перезаписывает
+    колонки значением из INSERT, а нужно прибавить.
+    """
+    if not rows:
+        return
+    connection = transaction.get_connection()
+    quote = connection.ops.quote_name
+    fields = [model._meta.get_field(name) for name in key_fields + value_fields]
+    table = quote(model._meta.db_table)
+    columns = ', '.join(quote(field.column) for field in fields)
+    placeholder = '(' + ', '.join(['%s'] * len(fields)) + ')'
+    if connection.vendor == 'mysql':
+        conflict = 'ON DUPLICATE KEY UPDATE ' + ', '.join(
+            f'{quote(name)} = {quote(name)} + VALUES({quote(name)})' for name in value_fields
+        )
+    else:
+        # SQLite и PostgreSQL
+        conflict = 'ON CONFLICT ({}) DO UPDATE SET {}'.format(
+            ', '.join(quote(name) for name in key_fields),
+            ', '.join(f'{quote(name)} = {table}.{quote(name)} + excluded.{quote(name)}' for name in value_fields),
+        )
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        params = [
+            field.get_db_prep_save(value, connection)
+            for row in batch
+            for field, value in zip(fields, row)
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) VALUES {", ".join([placeholder] * len(batch))} {conflict}',
+                params,
+            )
+
+
+def order_keys(order_ids):
+    return {
+        pk: (order_day(order_date), status)
+        for pk, order_date, status in Order.objects.filter(pk__in=set(order_ids))
+        .values_list('pk', 'order_date', 'status')
+    }
+
+
+def orders_changed(pairs):
+    """
+    [(OrderState до или None, OrderState после или None), ...]
+
+    Смена дня или статуса переносит в новый ключ и заказ, и все его позиции
+    (один запрос на позиции всех таких заказов).
+    """
+    delta = RollupDelta()
+    moved = {}
+    for old, new in pairs:
+        old_key = (old.day, old.status) if old else None
+        new_key = (new.day, new.status) if new else None
+        if old_key == new_key:
+            # Тот же день и статус: меняется только сумма (update_total, правка заказа)
+            delta.daily[new_key][2] += new.total - old.total
+            continue
+        if old:
+            delta.add_order(old_key, -1, old.total)
+        if new:
+            delta.add_order(new_key, 1, new.total)
+        if old and new:
+            moved[new.pk] = (old_key, new_key)
+    if moved:
+        items = OrderItem.objects.filter(order_id__in=moved).values_list('order_id', 'knife_id', 'quantity', 'price')
+        for order_id, knife_id, quantity, price in items:
+            old_key, new_key = moved[order_id]
+            delta.add_item(old_key, knife_id, -1, quantity, price)
+            delta.add_item(new_key, knife_id, 1, quantity, price)
+    delta.apply()
+
+
+def items_changed(pairs):
+    """[(ItemState до или None, ItemState после или None), ...] — ключ заказа одним запросом"""
+    keys = order_keys(state.order_id for pair in pairs for state in pair if state is not None)
+    delta = RollupDelta()
+    for old, new in pairs:
+        if old and old.order_id in keys:
+            delta.add_item(keys[old.order_id], old.knife_id, -1, old.quantity, old.price)
+        if new and new.order_id in keys:
+            delta.add_item(keys[new.order_id], new.knife_id, 1, new.quantity, new.price)
+    delta.apply()
+
+
+def recorded(instance):
+    """Объект уже учтён сигналом post_save (пакетный путь сохранял по одному)"""
+    return getattr(instance, '_analytics_recorded', False)
+
+
+def items_bulk_changed(items, previous=()):
+    """
+    Для bulk_create/bulk_update позиций (оформление заказа, пакетный API):
+    сигналы там не срабатывают. previous — копии позиций до изменения.
+    """
+    previous = {item.pk: item for item in previous}
+    items_changed([
+        (item_state(previous[item.pk]) if item.pk in previous else None, item_state(item))
+        for item in items if not recorded(item)
+    ])
+
+
+def orders_bulk_changed(orders, previous=()):
+    """То же для заказов: новые (previous пуст) и изменённые bulk_update"""
+    previous = {order.pk: order for order in previous}
+    orders_changed([
+        (order_state(previous[order.pk]) if order.pk in previous else None, order_state(order))
+        for order in orders if not recorded(order)
+    ])
+
+
+@transaction.atomic
+def rebuild(since=None, until=None):
+    """
+    Пересчитать сводки за период [since, until] из заказов (бэкфилл, сверка).
+
+    Возвращает число записанных строк (дневных, товарных).
+    """
+    tz = timezone.get_current_timezone()
+    orders = Order.objects.annotate(day=TruncDate('order_date', tzinfo=tz))
+    items = OrderItem.objects.annotate(day=TruncDate('order__order_date', tzinfo=tz), status=F('order__status'))
+    daily, products = DailySales.objects.all(), ProductSales.objects.all()
+    if since:
+        orders, items = orders.filter(day__gte=since), items.filter(day__gte=since)
+        daily, products = daily.filter(day__gte=since), products.filter(day__gte=since)
+    if until:
+        orders, items = orders.filter(day__lte=until), items.filter(day__lte=until)
+        daily, products = daily.filter(day__lte=until), products.filter(day__lte=until)
+    daily.delete()
+    products.delete()
+
+    line_total = ExpressionWrapper(F('quantity') * F('price'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    units = {
+        (row['day'], row['status']): row['units']
+        for row in items.values('day', 'status').annotate(units=Sum('quantity'))
+    }
+    daily_rows = [
+        DailySales(day=row['day'], status=row['status'], orders=row['orders'],
+                   units=units.get((row['day'], row['status'])) or 0, revenue=row['revenue'] or 0)
+        for row in orders.values('day', 'status').annotate(orders=Count('pk'), revenue=Sum('total_amount'))
+    ]
+    DailySales.objects.bulk_create(daily_rows, batch_size=1000)
+
+    product_rows = []
+    for dimension, column in ((ProductSales.KNIFE, 'knife_id'),
+                              (ProductSales.BRAND, 'knife__publisher_id'),
+                              (ProductSales.CATEGORY, 'knife__category_id')):
+        grouped = (
+            items.exclude(**{f'{column}__isnull': True})
+            .values('day', 'status', column)
+            .annotate(units=Sum('quantity'), revenue=Sum(line_total))
+        )
+        product_rows.extend(
+            ProductSales(day=row['day'], status=row['status'], dimension=dimension, object_id=row[column],
+                         units=row['units'], revenue=row['revenue'])
+            for row in grouped
+        )
+    ProductSales.objects.bulk_create(product_rows, batch_size=1000)
+    return len(daily_rows), len(product_rows)
@@ -0,0 +1,53 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from knifestore.models import Order, OrderItem
+from .rollups import ItemState, OrderState, item_state, items_changed, order_day, order_state, orders_changed
+
+
+@receiver(pre_save, sender=Order)
+def order_remember_state(sender, instance, raw=False, **kwargs):
+    # День, статус и сумма до сохранения: из них считается дельта сводок
+    instance._analytics_old = None
+    if raw or instance.pk is None:
+        return
+    old = Order.objects.filter(pk=instance.pk).values_list('order_date', 'status', 'total_amount').first()
+    if old is not None:
+        instance._analytics_old = OrderState(instance.pk, order_day(old[0]), old[1], old[2])
+
+
+@receiver(post_save, sender=Order)
+def order_update_rollups(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    orders_changed([(getattr(instance, '_analytics_old', None), order_state(instance))])
+    instance._analytics_recorded = True
+
+
+@receiver(post_delete, sender=Order)
+def order_remove_rollups(sender, instance, **kwargs):
+    # Позиции удаляются каскадом раньше заказа и вычитаются своим сигналом
+    orders_changed([(order_state(instance), None)])
+
+
+@receiver(pre_save, sender=OrderItem)
+def orderitem_remember_state(sender, instance, raw=False, **kwargs):
+    instance._analytics_old = None
+    if raw or instance.pk is None:
+        return
+    old = OrderItem.objects.filter(pk=instance.pk).values_list('order_id', 'knife_id', 'quantity', 'price').first()
+    if old is not None:
+        instance._analytics_old = ItemState(*old)
+
+
+@receiver(post_save, sender=OrderItem)
+def orderitem_update_rollups(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    items_changed([(getattr(instance, '_analytics_old', None), item_state(instance))])
+    instance._analytics_recorded = True
+
+
+@receiver(post_delete, sender=OrderItem)
+def orderitem_remove_rollups(sender, instance, **kwargs):
+    items_changed([(item_state(instance), None)])
@@ -0,0 +1,68 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from basket.checkout import place_order
+from knifestore.models import Customer, OrderItem
+from knifestore.tests import make_catalog
+
+from .models import DailySales, ProductSales
+from .rollups import rebuild
+
+
+def snapshot():
+    # Обнулившиеся строки инкрементальный путь оставляет, rebuild — не создаёт
+    return (
+        sorted(row for row in DailySales.objects.values_list('day', 'status', 'orders', 'units', 'revenue') if any(row[2:])),
+        sorted(
+            row for row in ProductSales.objects.values_list('day', 'status', 'dimension', 'object_id', 'units', 'revenue')
+            if any(row[4:])
+        ),
+    )
+
+
+class RollupTests(TestCase):
+    """Инкрементальные сводки совпадают с полным пересчётом rebuild()"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.knives = make_catalog(4, quantity=50)
+        cls.customer = Customer.objects.create()
+
+    def checkout(self, lines):
+        # Сводки пишутся после коммита транзакции заказа
+        with self.captureOnCommitCallbacks(execute=True):
+            return place_order(self.customer, lines, 'Адрес').order
+
+    def assertMatchesRebuild(self):
+        incremental = snapshot()
+        rebuild()
+        self.assertEqual(incremental, snapshot())
+
+    def test_checkout(self):
+        self.checkout([(self.knives[0].pk, 2), (self.knives[1].pk, 1)])
+        self.checkout([(self.knives[0].pk, 1), (self.knives[2].pk, 3)])
+        self.assertEqual(DailySales.objects.get().orders, 2)
+        self.assertMatchesRebuild()
+
+    def test_checkout_writes_each_table_once(self):
+        with CaptureQueriesContext(connection) as captured:
+            self.checkout([(knife.pk, 1) for knife in self.knives])
+        writes = [query['sql'] for query in captured.captured_queries if query['sql'].startswith('INSERT INTO "analytics_')]
+        self.assertEqual(len(writes), 3)  # сводка заказа, сводка позиций, товары
+        self.assertMatchesRebuild()
+
+    def test_status_change_item_edit_and_delete(self):
+        order = self.checkout([(self.knives[0].pk, 2), (self.knives[1].pk, 1)])
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 'shipped'
+            order.save()
+        item = OrderItem.objects.get(order=order, knife=self.knives[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            item.quantity = 5
+            item.save()
+        self.assertMatchesRebuild()
+        with self.captureOnCommitCallbacks(execute=True):
+            order.delete()
+        self.assertMatchesRebuild()
+        self.assertFalse(ProductSales.objects.exclude(units=0).exists())
@@ -0,0 +1,19 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.shortcuts import render
+
+from .reports import period, sales_report
+
+
+@staff_member_required
+def sales_dashboard(request):
+    """Отчёт по продажам; читает только таблицы сводок, не заказы"""
+    try:
+        days = int(request.GET.get('days', 0))
+    except ValueError:
+        days = 0
+    since, until = period(days)
+    return render(request, 'analytics/dashboard.html', context={
+        'report': sales_report(since, until),
+        'days': (until - since).days + 1,
+        'periods': [7, 30, 90, 365],
+    })
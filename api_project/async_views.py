@@ -0,0 +1,176 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import InvalidPage, Paginator
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from knifestore.asyncdb import gather_reads
+from knifestore.conditional import compute_validators, not_modified, set_validators
+from knifestore.models import Knife
+
+from .compiled import compile_serializer
+from .permission import PaginationPage
+from .serializers import KnifeSerializer
+from .views import KnifeViewSet
+
+knife_list_sync = KnifeViewSet.as_view({'get': 'list', 'post': 'create'})
+knife_detail_sync = KnifeViewSet.as_view(
+    {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'}
+)
+
+LIST_PARAMS = {'format', PaginationPage.page_query_param, PaginationPage.page_size_query_param}
+DETAIL_PARAMS = {'format'}
+CONDITIONAL_HEADERS = ('HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE')
+
+
+def wants_plain_json(request):
+    """Ответ KnifeViewSet был бы JSONRenderer без отступов (а не browsable API)"""
+    accept = request.META.get('HTTP_ACCEPT', '')
+    if 'indent' in accept:
+        return False
+    format = request.GET.get('format')
+    if format is not None:
+        return format == 'json'
+    return 'text/html' not in accept
+
+
+async def fast_path_user(request, allowed_params):
+    """
+    Пользователь, если запрос можно обслужить без DRF: чтение JSON по сессии
+    с правом view_knife и только известными параметрами. Иначе None —
+    фильтры, поиск, ?fields=, курсоры, токены и запись идут в KnifeViewSet.
+    """
+    if request.method not in ('GET', 'HEAD') or 'HTTP_AUTHORIZATION' in request.META:
+        return None
+    if not set(request.GET) <= allowed_params or not wants_plain_json(request):
+        return None
+    if not getattr(settings, 'API_COMPILED_SERIALIZERS', True):
+        return None
+    user = await request.auser()
+    if not user.is_authenticated or not await user.ahas_perm('knifestore.view_knife'):
+        return None
+    request.user = user
+    return user
+
+
+def page_size(request):
+    value = request.GET.get(PaginationPage.page_size_query_param)
+    if value is not None and value.isdigit() and int(value) > 0:
+        return min(int(value), PaginationPage.max_page_size)
+    return PaginationPage.page_size
+
+
+def page_links(request, number, paginator):
+    url = request.build_absolute_uri()
+    param = PaginationPage.page_query_param
+    following = replace_query_param(url, param, number + 1) if number < paginator.num_pages else None
+    if number <= 1:
+        previous = None
+    elif number == 2:
+        previous = remove_query_param(url, param)
+    else:
+        previous = replace_query_param(url, param, number - 1)
+    return following, previous
+
+
+async def read_page(request, queryset, scopes, reads):
+    """
+    Валидаторы и данные ответа. Без условных заголовков всё читается
+    одновременно; с ними сначала валидаторы — на 304 строки не нужны.
+    """
+    def validators():
+        return compute_validators([request.get_full_path(), 'json'], queryset=queryset, scopes=scopes)
+
+    if any(header in request.META for header in CONDITIONAL_HEADERS):
+        result = await sync_to_async(validators)()
+        response = not_modified(request, result)
+        if response is not None:
+            return result, response, None
+        return result, None, await gather_reads(*reads)
+    result, *data = await gather_reads(validators, *reads)
+    return result, None, data
+
+
+def json_response(request, data, validators, allow):
+    response = HttpResponse(JSONRenderer().render(data), content_type='application/json')
+    response['Allow'] = allow
+    set_validators(request, response, validators)
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+def finish(request, response, allow):
+    response['Allow'] = allow
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+@csrf_exempt
+async def knife_list(request):
+    """
+    GET /api/knives/ под ASGI: COUNT, страница values() и валидаторы
+    читаются одновременно, строки рендерятся скомпилированным планом
+    KnifeSerializer. Ответ байт в байт совпадает с KnifeViewSet.list.
+    """
+    compiled = compile_serializer(KnifeSerializer)
+    number = request.GET.get(PaginationPage.page_query_param, '1')
+    user = None
+    if compiled is not None and number.isdigit() and int(number) > 0:
+        user = await fast_path_user(request, LIST_PARAMS)
+    if user is None:
+        return await sync_to_async(knife_list_sync)(request)
+
+    allow = 'GET, POST, HEAD, OPTIONS'
+    number, size = int(number), page_size(request)
+    queryset = Knife.objects.all()
+    rows = compiled.values(queryset)
+    validators, response, data = await read_page(request, None, ['knife'], [
+        queryset.count,
+        lambda: list(rows[(number - 1) * size:number * size]),
+    ])
+    if response is not None:
+        return finish(request, response, allow)
+    count, page = data
+
+    paginator = Paginator(range(count), size)
+    try:
+        paginator.validate_number(number)
+    except InvalidPage:
+        # Страницы нет — ошибку в формате DRF строит KnifeViewSet
+        return await sync_to_async(knife_list_sync)(request)
+    following, previous = page_links(request, number, paginator)
+    body = {
+        'count': count,
+        'next': following,
+        'previous': previous,
+        'results': await compiled.arender(page, request),
+    }
+    return json_response(request, body, validators, allow)
+
+
+@csrf_exempt
+async def knife_detail(request, pk):
+    """GET /api/knives/<pk>/ под ASGI: валидаторы и строка читаются одновременно"""
+    compiled = compile_serializer(KnifeSerializer)
+    user = None
+    if compiled is not None:
+        user = await fast_path_user(request, DETAIL_PARAMS)
+    if user is None:
+        return await sync_to_async(knife_detail_sync)(request, pk=str(pk))
+
+    allow = 'GET, PUT, PATCH, DELETE, HEAD, OPTIONS'
+    queryset = Knife.objects.filter(pk=pk)
+    rows = compiled.values(queryset)
+    validators, response, data = await read_page(request, queryset, [f'knife:{pk}'], [
+        lambda: list(rows),
+    ])
+    if response is not None:
+        return finish(request, response, allow)
+    [found] = data
+    if not found:
+        return await sync_to_async(knife_detail_sync)(request, pk=str(pk))
+    [item] = await compiled.arender(found, request)
+    return json_response(request, item, validators, allow)
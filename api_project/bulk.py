@@ -0,0 +1,353 @@
+import copy
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connection, transaction
+from django.db.models import ProtectedError, Q
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.relations import ManyRelatedField
+from rest_framework.response import Response
+from rest_framework.validators import UniqueTogetherValidator, UniqueValidator
+
+DEFAULT_BULK_MAX_ITEMS = 1000
+
+
+class PayloadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Слишком много объектов в одном запросе.'
+    default_code = 'payload_too_large'
+
+
+def to_pk(model, value):
+    """Значение из JSON -> pk модели; None, если это не pk"""
+    if isinstance(value, bool) or value is None:
+        return None
+    try:
+        return model._meta.pk.to_python(value)
+    except (DjangoValidationError, TypeError, ValueError):
+        return None
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PK-связь, которая в пакетной проверке берёт объект из заранее загруженного
+    словаря (BulkListSerializer.prefetch_relations), а не делает get() на элемент.
+    Вне пакета ведёт себя как обычный PrimaryKeyRelatedField.
+    """
+    prefetched = None
+
+    def to_internal_value(self, data):
+        if self.prefetched is None or self.pk_field is not None:
+            return super().to_internal_value(data)
+        pk = to_pk(self.get_queryset().model, data)
+        if pk is None:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.prefetched[pk]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    many=True без запросов на элемент.
+
+    Перед проверкой все PK-связи пакета загружаются одним in_bulk на поле,
+    а UniqueValidator/UniqueTogetherValidator заменяются одной проверкой на
+    весь пакет (дубли внутри запроса и в базе). create/update пишут через
+    bulk_create/bulk_update; вызывать внутри transaction.atomic.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.instance_map = {}
+        self.matched_instances = []
+        self.validated_items = []
+
+    @property
+    def model(self):
+        return self.child.Meta.model
+
+    def relation_fields(self):
+        for name, field in self.child.fields.items():
+            if field.read_only:
+                continue
+            many = isinstance(field, ManyRelatedField)
+            relation = field.child_relation if many else field
+            if isinstance(relation, PrefetchedPrimaryKeyRelatedField):
+                yield name, relation, many
+
+    def many_fields(self):
+        return [name for name, _, many in self.relation_fields() if many]
+
+    def prefetch_relations(self, data):
+        items = [item for item in data if isinstance(item, dict)]
+        for name, relation, many in self.relation_fields():
+            model = relation.get_queryset().model
+            raw = []
+            for item in items:
+                value = item.get(name)
+                if many and isinstance(value, list):
+                    raw.extend(value)
+                elif not many:
+                    raw.append(value)
+            pks = {pk for pk in (to_pk(model, value) for value in raw) if pk is not None}
+            relation.prefetched = relation.get_queryset().in_bulk(pks) if pks else {}
+
+    def collect_unique_sets(self):
+        """Снять поштучные проверки уникальности, запомнив, что проверять для пакета"""
+        unique_sets = []
+        for name, field in self.child.fields.items():
+            unique = [validator for validator in field.validators if isinstance(validator, UniqueValidator)]
+            if unique:
+                field.validators = [validator for validator in field.validators if validator not in unique]
+                unique_sets.append(((name,), (field.source,), unique[0].queryset, unique[0].message))
+        together = [validator for validator in self.child.validators if isinstance(validator, UniqueTogetherValidator)]
+        if together:
+            self.child.validators = [validator for validator in self.child.validators if validator not in together]
+            for validator in together:
+                sources = tuple(self.child.fields[name].source for name in validator.fields)
+                message = validator.message.format(field_names=', '.join(validator.fields))
+                unique_sets.append((tuple(validator.fields), sources, validator.queryset, message))
+        return unique_sets
+
+    def run_child_validation(self, data):
+        instance = None
+        if self.instance is not None:
+            pk = to_pk(self.model, data.get('id')) if isinstance(data, dict) else None
+            instance = self.instance_map.get(pk)
+            if instance is None:
+                self.matched_instances.append(None)
+                raise ValidationError({'id': ['Объект с таким id не найден.']})
+            if any(matched is instance for matched in self.matched_instances):
+                self.matched_instances.append(None)
+                raise ValidationError({'id': ['id повторяется в запросе.']})
+        self.matched_instances.append(instance)
+        self.validated_items.append(None)
+        self.child.instance = instance
+        self.child.initial_data = data
+        attrs = super().run_child_validation(data)
+        self.validated_items[-1] = attrs
+        return attrs
+
+    def to_internal_value(self, data):
+        if self.instance is not None:
+            self.instance_map = {obj.pk: obj for obj in self.instance}
+        self.matched_instances = []
+        self.validated_items = []
+        if isinstance(data, list):
+            self.prefetch_relations(data)
+        unique_sets = self.collect_unique_sets()
+        try:
+            validated = super().to_internal_value(data)
+        except ValidationError as error:
+            if not isinstance(error.detail, list):
+                raise
+            # Уникальность проверяем и у прошедших элементов — все ошибки пакета сразу
+            errors = error.detail
+        else:
+            errors = [{} for _ in validated]
+        self.check_unique(self.validated_items, unique_sets, errors)
+        if any(errors):
+            raise ValidationError(errors)
+        return validated
+
+    def check_unique(self, validated, unique_sets, errors):
+        for names, sources, queryset, message in unique_sets:
+            seen = {}
+            for index, attrs in enumerate(validated):
+                if attrs is None:
+                    continue
+                instance = self.matched_instances[index] if self.instance is not None else None
+                values = []
+                for name, source in zip(names, sources):
+                    value = attrs[source] if source in attrs else getattr(instance, source, None)
+                    values.append(getattr(value, 'pk', value))
+                if any(value is None for value in values):
+                    continue
+                key = tuple(values)
+                if key in seen:
+                    errors[index][names[0]] = ['Значение повторяется в запросе.']
+                else:
+                    seen[key] = index
+            if not seen:
+                continue
+            if len(sources) == 1:
+                condition = Q(**{f'{sources[0]}__in': [key[0] for key in seen]})
+            else:
+                condition = Q()
+                for key in seen:
+                    condition |= Q(**dict(zip(sources, key)))
+            for row in queryset.filter(condition).values_list('pk', *sources):
+                index = seen.get(tuple(row[1:]))
+                if index is None:
+                    continue
+                instance = self.matched_instances[index] if self.instance is not None else None
+                if instance is None or instance.pk != row[0]:
+                    errors[index][names[0]] = [str(message)]
+
+    def split_attrs(self, attrs):
+        many = {name: attrs.pop(name) for name in self.many_fields() if name in attrs}
+        return attrs, many
+
+    def write_many(self, pairs, replace=True):
+        """M2M пакетом: [(объект, {поле: [связанные]}), ...] — перезапись through-таблиц"""
+        for name in self.many_fields():
+            descriptor = getattr(self.model, self.child.fields[name].source)
+            through = descriptor.through
+            source_name = descriptor.field.m2m_field_name()
+            target_name = descriptor.field.m2m_reverse_field_name()
+            changed = [(obj, many[name]) for obj, many in pairs if name in many]
+            if not changed:
+                continue
+            if replace:
+                through.objects.filter(**{f'{source_name}__in': [obj.pk for obj, _ in changed]}).delete()
+            through.objects.bulk_create([
+                through(**{f'{source_name}_id': obj.pk, f'{target_name}_id': related.pk})
+                for obj, related_list in changed
+                for related in {related.pk: related for related in related_list}.values()
+            ])
+
+    def create(self, validated_data):
+        pairs = [self.split_attrs(dict(attrs)) for attrs in validated_data]
+        objects = [self.model(**attrs) for attrs, _ in pairs]
+        if connection.features.can_return_rows_from_bulk_insert:
+            self.model.objects.bulk_create(objects)
+        else:
+            # Без RETURNING (MySQL) pk новых строк не узнать — сохраняем по одной в той же транзакции
+            for obj in objects:
+                obj.save(force_insert=True)
+        self.write_many([(obj, many) for obj, (_, many) in zip(objects, pairs)], replace=False)
+        return objects
+
+    def update(self, instances, validated_data):
+        fields = set()
+        pairs = []
+        for instance, attrs in zip(self.matched_instances, validated_data):
+            attrs, many = self.split_attrs(dict(attrs))
+            for name, value in attrs.items():
+                setattr(instance, name, value)
+                fields.add(name)
+            pairs.append((instance, many))
+        objects = [instance for instance, _ in pairs]
+        if fields:
+            now = timezone.now()
+            for field in self.model._meta.concrete_fields:
+                if getattr(field, 'auto_now', False):
+                    fields.add(field.name)
+                    for obj in objects:
+                        setattr(obj, field.attname, now)
+            self.model.objects.bulk_update(objects, sorted(fields))
+        self.write_many(pairs)
+        return objects
+
+
+class BulkModelMixin:
+    """
+    POST/PUT/PATCH/DELETE {prefix}/bulk/ — пакет объектов одним запросом.
+
+    Тело — JSON-массив: объекты для POST, объекты с id для PUT/PATCH, id для
+    DELETE. Пакет применяется одной транзакцией: любая ошибка отменяет всё,
+    а ответ содержит результат по каждому элементу (index, status, id/errors).
+    Размер пакета ограничен bulk_max_items / настройкой BULK_MAX_ITEMS.
+    """
+    bulk_max_items = None
+
+    def get_bulk_max_items(self):
+        if self.bulk_max_items is not None:
+            return self.bulk_max_items
+        return getattr(settings, 'BULK_MAX_ITEMS', DEFAULT_BULK_MAX_ITEMS)
+
+    def get_bulk_payload(self, request):
+        data = request.data
+        if request.method == 'DELETE' and isinstance(data, dict):
+            data = data.get('ids')
+        if not isinstance(data, list):
+            raise ValidationError({'detail': 'Ожидался JSON-массив.'})
+        if not data:
+            raise ValidationError({'detail': 'Пустой пакет.'})
+        limit = self.get_bulk_max_items()
+        if len(data) > limit:
+            raise PayloadTooLarge(f'В пакете {len(data)} объектов, допускается не более {limit}.')
+        return data
+
+    def after_bulk_write(self, objects, previous):
+        """
+        Реакция на массовую запись в обход сигналов (кэши, индексы).
+
+        previous — копии объектов до изменения (пусто при создании).
+        """
+
+    def bulk_representation(self, objects):
+        # Повторная выборка с prefetch M2M — без запроса на объект при сериализации
+        serializer = self.get_serializer()
+        many = [name for name, field in serializer.fields.items() if isinstance(field, ManyRelatedField)]
+        fetched = self.get_queryset().model._default_manager.prefetch_related(*many).in_bulk(
+            [obj.pk for obj in objects],
+        )
+        return [serializer.to_representation(fetched.get(obj.pk, obj)) for obj in objects]
+
+    def invalid_response(self, errors):
+        results = [
+            {'index': index, 'status': 400, 'errors': item_errors} if item_errors
+            else {'index': index, 'status': 424, 'errors': {'detail': 'Не применено: в пакете есть ошибки.'}}
+            for index, item_errors in enumerate(errors)
+        ]
+        return Response({'results': results}, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['post', 'put', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request, *args, **kwargs):
+        data = self.get_bulk_payload(request)
+        if request.method == 'DELETE':
+            return self.bulk_destroy(data)
+
+        instance = None
+        previous = []
+        if request.method in ('PUT', 'PATCH'):
+            model = self.get_queryset().model
+            ids = [to_pk(model, item.get('id')) for item in data if isinstance(item, dict)]
+            instance = list(self.filter_queryset(self.get_queryset()).filter(pk__in=[pk for pk in ids if pk is not None]))
+            previous = [copy.copy(obj) for obj in instance]
+        serializer = self.get_serializer(
+            instance=instance, data=data, many=True, partial=request.method == 'PATCH',
+        )
+        if not serializer.is_valid():
+            errors = serializer.errors
+            if isinstance(errors, dict):
+                raise ValidationError(errors)
+            return self.invalid_response(errors)
+
+        with transaction.atomic():
+            objects = serializer.save()
+            self.after_bulk_write(objects, previous)
+
+        code = 201 if instance is None else 200
+        results = [
+            {'index': index, 'status': code, 'id': obj.pk, 'data': item}
+            for index, (obj, item) in enumerate(zip(objects, self.bulk_representation(objects)))
+        ]
+        return Response({'results': results}, status=code)
+
+    def bulk_destroy(self, ids):
+        model = self.get_queryset().model
+        pks = [to_pk(model, value) for value in ids]
+        queryset = self.filter_queryset(self.get_queryset()).filter(pk__in=[pk for pk in pks if pk is not None])
+        found = set(queryset.values_list('pk', flat=True))
+        try:
+            with transaction.atomic():
+                queryset.delete()
+        except ProtectedError as error:
+            protected = {obj.pk for obj in error.protected_objects}
+            return Response({
+                'detail': 'Есть связанные объекты, удаление отменено.',
+                'protected': sorted(str(obj) for obj in error.protected_objects)[:100],
+                'count': len(protected),
+            }, status=status.HTTP_409_CONFLICT)
+        results = [
+            {'index': index, 'status': 204 if pk in found else 404, 'id': value}
+            for index, (value, pk) in enumerate(zip(ids, pks))
+        ]
+        return Response({'results': results}, status=status.HTTP_200_OK)
@@ -0,0 +1,205 @@
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.response import Response
+
+
+class NotCompilable(Exception):
+    """Сериализатор содержит поля, которые нельзя прочитать из values()"""
+
+
+class FieldPlan:
+    """Одно поле вывода: колонка values() и преобразование значения"""
+    many = False
+
+    def __init__(self, name, column, convert=None):
+        self.name = name
+        self.column = column
+        self.convert = convert
+
+
+class FilePlan(FieldPlan):
+    """FileField/ImageField: абсолютный URL, как у DRF при наличии request"""
+
+    def __init__(self, name, column, storage):
+        super().__init__(name, column)
+        self.storage = storage
+
+    def url(self, value, request):
+        if not value:
+            return None
+        url = self.storage.url(value)
+        return request.build_absolute_uri(url) if request is not None else url
+
+
+class ManyPlan:
+    """
+    M2M-поле: id связанных объектов одним запросом к through-таблице на
+    порцию строк, в порядке Meta.ordering связанной модели — как related.all().
+    """
+    many = True
+
+    def __init__(self, name, descriptor):
+        self.name = name
+        self.through = descriptor.through
+        self.source = descriptor.field.m2m_column_name()
+        self.target = descriptor.field.m2m_reverse_name()
+        target_field = descriptor.field.m2m_reverse_field_name()
+        ordering = descriptor.field.related_model._meta.ordering
+        self.ordering = [
+            f'-{target_field}__{name[1:]}' if name.startswith('-') else f'{target_field}__{name}'
+            for name in ordering
+        ] + ['pk']
+
+    def rows(self, pks):
+        return (
+            self.through.objects.filter(**{f'{self.source}__in': pks})
+            .order_by(*self.ordering)
+            .values_list(self.source, self.target)
+        )
+
+    def load(self, pks):
+        related = {pk: [] for pk in pks}
+        for source, target in self.rows(pks):
+            related[source].append(target)
+        return related
+
+    async def aload(self, pks):
+        related = {pk: [] for pk in pks}
+        async for source, target in self.rows(pks):
+            related[source].append(target)
+        return related
+
+
+class CompiledSerializer:
+    """
+    Предвычисленный план чтения для ModelSerializer.
+
+    Строки читаются через values(), значения проходят через to_representation
+    тех же полей DRF (Decimal, даты, выбор), поэтому результат совпадает с
+    serializer.data байт в байт, но без экземпляров модели и без обхода
+    полей сериализатора на каждую строку.
+    """
+
+    def __init__(self, serializer_class, selected=None):
+        self.serializer_class = serializer_class
+        serializer = serializer_class()
+        model = serializer.Meta.model
+        self.pk_column = model._meta.pk.attname
+        self.fields = []
+        for name, field in serializer.fields.items():
+            if field.write_only or (selected is not None and name not in selected):
+                continue
+            if field.source == '*' or '.' in field.source:
+                raise NotCompilable(f'{serializer_class.__name__}.{name}: source={field.source!r}')
+            if isinstance(field, ManyRelatedField):
+                if not isinstance(field.child_relation, PrimaryKeyRelatedField) \
+                        or field.child_relation.pk_field is not None:
+                    raise NotCompilable(f'{serializer_class.__name__}.{name}')
+                self.fields.append(ManyPlan(name, getattr(model, field.source)))
+            elif isinstance(field, PrimaryKeyRelatedField):
+                if field.pk_field is not None:
+                    raise NotCompilable(f'{serializer_class.__name__}.{name}')
+                self.fields.append(FieldPlan(name, model._meta.get_field(field.source).attname))
+            elif isinstance(field, serializers.FileField):
+                storage = model._meta.get_field(field.source).storage
+                self.fields.append(FilePlan(name, field.source, storage))
+            elif isinstance(field, (serializers.SerializerMethodField, serializers.BaseSerializer,
+                                    serializers.RelatedField)):
+                raise NotCompilable(f'{serializer_class.__name__}.{name}: {type(field).__name__}')
+            else:
+                self.fields.append(FieldPlan(name, field.source, field.to_representation))
+        self.columns = list(dict.fromkeys(
+            [self.pk_column] + [plan.column for plan in self.fields if not plan.many]
+        ))
+        self.many = [plan for plan in self.fields if plan.many]
+
+    def values(self, queryset):
+        return queryset.values(*self.columns)
+
+    def render(self, rows, request=None):
+        """Список dict из values() -> список представлений (как serializer.data)"""
+        rows = list(rows)
+        related = {}
+        if self.many and rows:
+            pks = [row[self.pk_column] for row in rows]
+            related = {plan.name: plan.load(pks) for plan in self.many}
+        return self.build(rows, related, request)
+
+    async def arender(self, rows, request=None):
+        """render() для async-представлений: строки уже прочитаны, M2M — через async for"""
+        related = {}
+        if self.many and rows:
+            pks = [row[self.pk_column] for row in rows]
+            related = {plan.name: await plan.aload(pks) for plan in self.many}
+        return self.build(rows, related, request)
+
+    def build(self, rows, related, request):
+        result = []
+        for row in rows:
+            item = {}
+            for plan in self.fields:
+                if plan.many:
+                    item[plan.name] = related[plan.name][row[self.pk_column]]
+                    continue
+                value = row[plan.column]
+                if value is None:
+                    item[plan.name] = None
+                elif isinstance(plan, FilePlan):
+                    item[plan.name] = plan.url(value, request)
+                elif plan.convert is not None:
+                    item[plan.name] = plan.convert(value)
+                else:
+                    item[plan.name] = value
+            result.append(item)
+        return result
+
+
+_compiled = {}
+
+
+def compile_serializer(serializer_class, selected=None):
+    """
+    План на класс сериализатора (и набор полей ?fields=) строится один раз;
+    None — класс не компилируется.
+    """
+    key = serializer_class, selected
+    if key not in _compiled:
+        try:
+            _compiled[key] = CompiledSerializer(serializer_class, selected)
+        except NotCompilable:
+            _compiled[key] = None
+    return _compiled[key]
+
+
+def compile_for(serializer):
+    """План для сериализатора с контекстом запроса: ?expand= идёт обычным путём"""
+    if serializer.context.get('expand'):
+        return None
+    return compile_serializer(type(serializer), serializer.context.get('fields'))
+
+
+class CompiledListMixin:
+    """
+    list() через скомпилированный план: страница выбирается как values(),
+    пагинация и формат ответа прежние. Отключается API_COMPILED_SERIALIZERS =
+    False или compiled_read = False у представления; несовместимые
+    сериализаторы автоматически идут обычным путём.
+    """
+    compiled_read = True
+
+    def get_compiled_serializer(self):
+        if not self.compiled_read or not getattr(settings, 'API_COMPILED_SERIALIZERS', True):
+            return None
+        return compile_for(self.get_serializer())
+
+    def list(self, request, *args, **kwargs):
+        compiled = self.get_compiled_serializer()
+        if compiled is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = compiled.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(compiled.render(page, request))
+        return Response(compiled.render(queryset, request))
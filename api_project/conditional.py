@@ -0,0 +1,44 @@
+from knifestore.conditional import compute_validators, not_modified, set_validators
+
+
+class ConditionalViewSetMixin:
+    """
+    ETag/Last-Modified для list и retrieve.
+
+    Валидаторы списка — версии conditional_scopes (без запроса к таблице);
+    у retrieve к ним добавляется max(conditional_field) строки по ключу.
+    На If-None-Match ответ 304 отдаётся без выборки и сериализации строк.
+    У моделей без даты изменения (conditional_field = None) — только версии.
+    """
+    conditional_field = 'updated_at'
+    conditional_scopes = ()
+
+    def get_conditional_parts(self, request):
+        return [request.get_full_path(), request.accepted_renderer.format]
+
+    def get_validators(self, request, queryset, scopes):
+        return compute_validators(
+            self.get_conditional_parts(request),
+            queryset=queryset if self.conditional_field else None,
+            field=self.conditional_field,
+            scopes=scopes,
+        )
+
+    def conditional(self, request, validators, handler, *args, **kwargs):
+        response = not_modified(request, validators)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            set_validators(request, response, validators)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        validators = self.get_validators(request, None, list(self.conditional_scopes))
+        return self.conditional(request, validators, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        lookup = self.kwargs[lookup_url_kwarg]
+        queryset = self.filter_queryset(self.get_queryset()).filter(**{self.lookup_field: lookup})
+        scopes = [f'{queryset.model._meta.model_name}:{lookup}']
+        validators = self.get_validators(request, queryset, scopes)
+        return self.conditional(request, validators, super().retrieve, *args, **kwargs)
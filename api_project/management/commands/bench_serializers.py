@@ -0,0 +1,105 @@
+import time
+from copy import copy
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from api_project.compiled import compile_serializer
+from api_project.serializers import KnifeSerializer, OrderItemSerializer, OrderSerializer, StockSerializer
+from knifestore.models import Customer, Knife, Order, OrderItem, Series, Stock
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнить скорость ModelSerializer(many=True) и скомпилированного плана на N строк. '
+        'Данные создаются во временной транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Сколько строк на модель (по умолчанию 10000)')
+        parser.add_argument('--repeat', type=int, default=3, help='Лучший из N прогонов')
+
+    def handle(self, *args, rows, repeat, **options):
+        template = Knife.objects.order_by('pk').first()
+        if template is None:
+            raise CommandError('Нужен хотя бы один нож как образец для генерации строк.')
+        try:
+            with transaction.atomic():
+                self.seed(template, rows)
+                for serializer_class in (KnifeSerializer, OrderSerializer, OrderItemSerializer, StockSerializer):
+                    self.bench(serializer_class, rows, repeat)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, template, rows):
+        started = time.monotonic()
+        knives = []
+        for number in range(rows):
+            knife = copy(template)
+            knife.pk = None
+            knife.title = f'bench-{number:06d}'
+            knives.append(knife)
+        Knife.objects.bulk_create(knives, batch_size=1000)
+        knife_ids = list(Knife.objects.filter(title__startswith='bench-').values_list('pk', flat=True))
+
+        series_ids = list(Series.objects.values_list('pk', flat=True)[:3])
+        through = Knife.designers.through
+        through.objects.bulk_create(
+            [through(knife_id=knife_id, series_id=series_id) for knife_id in knife_ids for series_id in series_ids],
+            batch_size=5000,
+        )
+        Stock.objects.bulk_create(
+            [Stock(knife_id=knife_id, quantity=number % 50) for number, knife_id in enumerate(knife_ids)],
+            batch_size=5000,
+        )
+        customer = Customer.objects.create(phone='bench')
+        Order.objects.bulk_create(
+            [Order(customer=customer, shipping_address=f'Адрес {number}', total_amount=number) for number in range(rows)],
+            batch_size=5000,
+        )
+        order_ids = list(Order.objects.filter(customer=customer).values_list('pk', flat=True))
+        OrderItem.objects.bulk_create(
+            [OrderItem(order_id=order_id, knife_id=knife_id, quantity=1, price=template.price)
+             for order_id, knife_id in zip(order_ids, knife_ids)],
+            batch_size=5000,
+        )
+        self.stdout.write(f'Сгенерировано по {rows} строк за {time.monotonic() - started:.1f} с')
+
+    def timed(self, func, repeat):
+        best, result = None, None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def bench(self, serializer_class, rows, repeat):
+        model = serializer_class.Meta.model
+        compiled = compile_serializer(serializer_class)
+        if compiled is None:
+            self.stdout.write(f'{model.__name__}: сериализатор не компилируется, пропуск')
+            return
+        queryset = model.objects.order_by('-pk')
+        renderer = JSONRenderer()
+
+        # Как list() без компиляции: экземпляры модели + обход полей DRF на строку
+        plain_time, plain = self.timed(
+            lambda: renderer.render(serializer_class(list(queryset[:rows]), many=True).data), repeat,
+        )
+        fast_time, fast = self.timed(
+            lambda: renderer.render(compiled.render(compiled.values(queryset)[:rows])), repeat,
+        )
+        if plain != fast:
+            raise CommandError(f'{model.__name__}: ответы различаются — план сериализатора некорректен')
+        self.stdout.write(
+            f'{model.__name__:<10} serializer {rows / plain_time:>9.0f} строк/с   '
+            f'compiled {rows / fast_time:>9.0f} строк/с   x{plain_time / fast_time:.1f}   '
+            f'{len(fast) / 1e6:.1f} МБ JSON'
+        )
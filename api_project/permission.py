@@ -1,5 +1,5 @@
 from rest_framework import permissions
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 class CustomPermissions(permissions.DjangoModelPermissions):
     perms_map = {
@@ -12,6 +12,33 @@ class CustomPermissions(permissions.DjangoModelPermissions):
         'DELETE': ['%(app_label)s.delete_%(model_name)s'],
     }
 
+class CursorPaginationPage(CursorPagination):
+    """Курсор по id: стоимость страницы не зависит от глубины, в отличие от OFFSET"""
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+    page_size = 20
+    max_page_size = 500
+
+
 class PaginationPage(PageNumberPagination):
+    """
+    Номера страниц по умолчанию; с ?cursor= (первая страница — ?pagination=cursor)
+    ответ строится курсорной пагинацией CursorPaginationPage.
+    """
     page_size_query_param = 'page_size'
-    page_size = 1
\ No newline at end of file
+    page_size = 20
+    max_page_size = 500
+    cursor_class = CursorPaginationPage
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        params = request.query_params
+        if self.cursor_class.cursor_query_param in params or params.get('pagination') == 'cursor':
+            self.cursor_paginator = self.cursor_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
\ No newline at end of file
@@ -1,42 +1,98 @@
 from rest_framework import serializers
 from knifestore.models import *
+from knifestore.inventory import set_quantities
+from .bulk import BulkListSerializer, PrefetchedPrimaryKeyRelatedField
+from .sparse import SparseFieldsSerializerMixin
 
-class CategorySerializer(serializers.ModelSerializer):
+
+class BulkModelSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
+    """ModelSerializer, чьи PK-связи в пакетной проверке не делают запрос на элемент"""
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
+
+class CategorySerializer(BulkModelSerializer):
     class Meta:
         model = Category
         fields = '__all__'
+        list_serializer_class = BulkListSerializer
 
-class BrandSerializer(serializers.ModelSerializer):
+class BrandSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Brand
         fields = '__all__'
 
-class SeriesSerializer(serializers.ModelSerializer):
+class SeriesSerializer(BulkModelSerializer):
     class Meta:
         model = Series
         fields = '__all__'
+        list_serializer_class = BulkListSerializer
 
-class KnifeSerializer(serializers.ModelSerializer):
+class KnifeSerializer(BulkModelSerializer):
     class Meta:
         model = Knife
         fields = '__all__'
+        list_serializer_class = BulkListSerializer
+        expandable = {'category': CategorySerializer, 'publisher': BrandSerializer, 'designers': SeriesSerializer}
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(BulkModelSerializer):
     class Meta:
         model = Customer
         fields = '__all__'
+        list_serializer_class = BulkListSerializer
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(BulkModelSerializer):
     class Meta:
         model = Order
         fields = '__all__'
+        list_serializer_class = BulkListSerializer
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(BulkModelSerializer):
     class Meta:
         model = OrderItem
         fields = '__all__'
+        list_serializer_class = BulkListSerializer
+        expandable = {'knife': KnifeSerializer, 'order': OrderSerializer}
+
+class StockListSerializer(BulkListSerializer):
+    """
+    Пакет складских записей: остаток пишется не bulk_update, а корректировками
+    журнала (inventory.set_quantities), как инвентаризация на StockUpdateView.
+    Новые записи создаются с нулём и доводятся до заданного остатка так же.
+    """
+
+    def split_quantities(self, validated_data):
+        quantities = []
+        rest = []
+        for attrs in validated_data:
+            attrs = dict(attrs)
+            quantities.append(attrs.pop('quantity', None))
+            rest.append(attrs)
+        return quantities, rest
+
+    def write_quantities(self, objects, quantities, note):
+        request = self.context.get('request')
+        user = request.user if request is not None and request.user.is_authenticated else None
+        balances = set_quantities(
+            {obj.knife_id: quantity for obj, quantity in zip(objects, quantities) if quantity is not None},
+            user=user, note=note,
+        )
+        for obj in objects:
+            obj.quantity = balances.get(obj.knife_id, obj.quantity)
+        return objects
 
-class StockSerializer(serializers.ModelSerializer):
+    def create(self, validated_data):
+        quantities, rest = self.split_quantities(validated_data)
+        objects = super().create([dict(attrs, quantity=0) for attrs in rest])
+        return self.write_quantities(objects, quantities, 'Пакетная постановка на учёт (API)')
+
+    def update(self, instances, validated_data):
+        quantities, rest = self.split_quantities(validated_data)
+        objects = super().update(instances, rest)
+        return self.write_quantities(objects, quantities, 'Пакетная правка остатка (API)')
+
+
+class StockSerializer(BulkModelSerializer):
     class Meta:
         model = Stock
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        list_serializer_class = StockListSerializer
+        expandable = {'knife': KnifeSerializer}
@@ -0,0 +1,108 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import ManyRelatedField
+
+
+def split_param(value):
+    return [name.strip() for name in value.split(',') if name.strip()] if value else []
+
+
+class SparseFieldsSerializerMixin:
+    """
+    Набор полей из контекста: context['fields'] оставляет только перечисленные,
+    context['expand'] заменяет PK-связи вложенными сериализаторами из
+    Meta.expandable ({'поле': КлассСериализатора}).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.context.get('fields')
+        expand = self.context.get('expand') or ()
+        if selected is not None:
+            for name in list(self.fields):
+                if name not in selected and name not in expand:
+                    self.fields.pop(name)
+        expandable = getattr(self.Meta, 'expandable', {})
+        for name in expand:
+            field = self.fields[name]
+            options = {'source': field.source} if field.source != name else {}
+            self.fields[name] = expandable[name](
+                many=isinstance(field, ManyRelatedField), read_only=True, **options,
+            )
+
+
+class SparseFieldsMixin:
+    """
+    ?fields=id,title — только перечисленные поля; ?expand=category,designers —
+    связанные объекты целиком вместо id.
+
+    Только для чтения (GET/HEAD). Выбранные колонки уходят в only() (а в
+    скомпилированном списке — в values()), раскрытые FK — в select_related,
+    M2M — в prefetch_related, поэтому раскрытие не даёт запроса на строку.
+    """
+
+    def get_sparse_fields(self):
+        """(frozenset полей или None, кортеж раскрываемых связей)"""
+        if hasattr(self, '_sparse_fields'):
+            return self._sparse_fields
+        fields, expand = None, ()
+        if self.request is not None and self.request.method in SAFE_METHODS:
+            params = self.request.query_params
+            serializer_class = self.get_serializer_class()
+            readable = [name for name, field in serializer_class().fields.items() if not field.write_only]
+            expandable = getattr(getattr(serializer_class, 'Meta', None), 'expandable', {})
+
+            requested = split_param(params.get('fields'))
+            unknown = [name for name in requested if name not in readable]
+            if unknown:
+                raise ValidationError({'fields': f'Неизвестные поля: {", ".join(unknown)}. '
+                                                 f'Доступны: {", ".join(readable)}'})
+            expand = tuple(dict.fromkeys(split_param(params.get('expand'))))
+            unknown = [name for name in expand if name not in expandable]
+            if unknown:
+                raise ValidationError({'expand': f'Нельзя раскрыть: {", ".join(unknown)}. '
+                                                 f'Доступны: {", ".join(expandable) or "—"}'})
+            if requested:
+                fields = frozenset(requested)
+        self._sparse_fields = fields, expand
+        return self._sparse_fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'], context['expand'] = self.get_sparse_fields()
+        return context
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields, expand = self.get_sparse_fields()
+        if fields is None and not expand:
+            return queryset
+
+        serializer = self.get_serializer()
+        model = queryset.model
+        columns = [model._meta.pk.name]
+        select, prefetch = [], []
+        for name, field in serializer.fields.items():
+            if field.write_only or field.source == '*':
+                continue
+            source = field.source.split('.')[0]
+            many = isinstance(field, ManyRelatedField) or getattr(field, 'many', False)
+            if many:
+                prefetch.append(source)
+            else:
+                columns.append(source)
+            if name in expand:
+                nested = field.child if many else field
+                prefetch.extend(
+                    f'{source}__{child.source}' for child in nested.fields.values()
+                    if isinstance(child, ManyRelatedField)
+                )
+                if not many:
+                    select.append(source)
+        if fields is not None:
+            queryset = queryset.only(*dict.fromkeys(columns))
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
@@ -1,3 +1,165 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from basket.checkout import place_order
+from knifestore.models import Customer, Knife
+from knifestore.tests import make_catalog
+
+from . import async_views
+from .views import KnifeViewSet
+
+
+class ApiTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.knives = make_catalog(7)
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client.force_login(self.admin)
+
+    def get_json(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def all_knives(self):
+        """Все ножи обычным списком DRF, по id"""
+        return self.get_json('/api/knives/', page_size=500)['results']
+
+
+class ExportTests(ApiTestCase):
+    """Курсорная пагинация и потоковая выгрузка отдают каждую строку ровно один раз"""
+
+    def test_cursor_pagination(self):
+        page = self.get_json('/api/knives/', pagination='cursor', page_size=3)
+        ids = []
+        while True:
+            ids += [row['id'] for row in page['results']]
+            if not page['next']:
+                break
+            page = self.get_json(page['next'])
+        self.assertEqual(ids, sorted(knife.pk for knife in self.knives))
+
+    def test_ndjson_export(self):
+        # Порции меньше выборки — проверяется и переход между ними
+        with mock.patch.object(KnifeViewSet, 'export_chunk_size', 3):
+            response = self.client.get('/api/knives/export/')
+            self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+            rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(rows, json.loads(json.dumps(self.all_knives())))
+
+    def test_csv_export_and_filters(self):
+        response = self.client.get('/api/knives/export/', {'output': 'csv', 'title': 'Нож 00'})
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([int(row['id']) for row in rows], [knife.pk for knife in self.knives])
+        self.assertEqual(rows[0]['title'], self.knives[0].title)
+        self.assertEqual(self.client.get('/api/knives/export/', {'output': 'xml'}).status_code, 400)
+
+    def test_export_requires_permission(self):
+        self.client.logout()
+        self.assertIn(self.client.get('/api/knives/export/').status_code, (401, 403))
+
+
+class CompiledSerializerTests(ApiTestCase):
+    """Списки через скомпилированный план совпадают с обычным путём DRF байт в байт"""
+    endpoints = ['categories', 'series', 'knives', 'customers', 'orders', 'orderitems', 'stocks']
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        customer = Customer.objects.create(user=cls.admin, phone='+7 900 000-00-00', address='Адрес')
+        place_order(customer, [(cls.knives[0].pk, 2), (cls.knives[1].pk, 1)], 'Адрес')
+        # Пустые связи и значения: None должен остаться None
+        Knife.objects.filter(pk=cls.knives[2].pk).update(category=None, publisher=None, manufacturer_country='')
+        cls.knives[3].designers.clear()
+
+    def test_lists_match_drf(self):
+        for endpoint in self.endpoints:
+            for params in ({}, {'pagination': 'cursor'}, {'page_size': 1}):
+                url = f'/api/{endpoint}/'
+                compiled = self.client.get(url, params)
+                with override_settings(API_COMPILED_SERIALIZERS=False):
+                    plain = self.client.get(url, params)
+                self.assertEqual(compiled.status_code, 200, (endpoint, compiled.content))
+                self.assertEqual(compiled.content, plain.content, (endpoint, params))
+
+    def test_sparse_fields_match_drf(self):
+        compiled = self.client.get('/api/knives/', {'fields': 'id,title,price,designers'})
+        with override_settings(API_COMPILED_SERIALIZERS=False):
+            plain = self.client.get('/api/knives/', {'fields': 'id,title,price,designers'})
+        self.assertEqual(compiled.content, plain.content)
+
+
+class SparseFieldsTests(ApiTestCase):
+    """?fields= сужает вывод, ?expand= раскрывает связи без запроса на строку"""
+
+    def test_fields(self):
+        rows = self.get_json('/api/knives/', fields='title,id')['results']
+        self.assertEqual([list(row) for row in rows], [['id', 'title']] * len(self.knives))
+        knife = self.get_json(f'/api/knives/{self.knives[0].pk}/', fields='price')
+        self.assertEqual(knife, {'price': str(self.knives[0].price)})
+
+    def test_expand(self):
+        Knife.objects.filter(pk=self.knives[1].pk).update(category=None)
+        rows = self.get_json('/api/knives/', fields='id,category', expand='category,designers')['results']
+        category = self.get_json(f'/api/categories/{self.knives[0].category_id}/')
+        series = self.get_json('/api/series/')['results']
+        self.assertEqual(rows[0], {'id': self.knives[0].pk, 'category': category, 'designers': series})
+        self.assertIsNone(rows[1]['category'])
+
+    def test_expand_query_count_does_not_grow_with_rows(self):
+        counts = []
+        for page_size in (2, len(self.knives)):
+            with CaptureQueriesContext(connection) as queries:
+                self.get_json('/api/knives/', expand='category,publisher,designers', page_size=page_size)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_unknown_names_rejected(self):
+        self.assertEqual(self.client.get('/api/knives/', {'fields': 'id,secret'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/knives/', {'expand': 'stock'}).status_code, 400)
+
+
+class AsyncViewTests(ApiTestCase):
+    """ASGI-представления ножей отвечают теми же байтами и ETag, что KnifeViewSet"""
+
+    async def call_async(self, view, path, headers=None, **kwargs):
+        request = AsyncRequestFactory().get(path, headers=headers)
+        user = self.admin
+
+        async def auser():
+            return user
+
+        request.auser = auser
+        # Быстрый путь не должен уходить в синхронный KnifeViewSet
+        with mock.patch.object(async_views, 'knife_list_sync', side_effect=AssertionError), \
+                mock.patch.object(async_views, 'knife_detail_sync', side_effect=AssertionError):
+            return await view(request, **kwargs)
+
+    async def test_responses_match_viewset(self):
+        pk = self.knives[0].pk
+        for view, path, kwargs in (
+            (async_views.knife_list, '/api/knives/', {}),
+            (async_views.knife_list, '/api/knives/?page=2&page_size=3', {}),
+            (async_views.knife_detail, f'/api/knives/{pk}/', {'pk': pk}),
+        ):
+            expected = await sync_to_async(self.client.get)(path)
+            response = await self.call_async(view, path, **kwargs)
+            self.assertEqual(response.status_code, 200, path)
+            self.assertEqual(response.content, expected.content, path)
+            self.assertEqual(response['ETag'], expected['ETag'], path)
+
+            response = await self.call_async(view, path, headers={'If-None-Match': expected['ETag']}, **kwargs)
+            self.assertEqual(response.status_code, 304, path)
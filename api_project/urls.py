@@ -1,8 +1,10 @@
+from django.conf import settings
+from django.urls import path
 from .views import *
 from rest_framework import routers
 
 urlpatterns = [
-
+    path('analytics/sales/', SalesReportView.as_view(), name='sales_report'),
 ]
 
 router = routers.SimpleRouter()
@@ -16,4 +18,15 @@ router.register('customers', CustomerViewSet, basename='customers')
 router.register('orders', OrderViewSet, basename='orders')
 router.register('orderitems', OrderItemViewSet, basename='orderitems')
 router.register('stocks', StockViewSet, basename='stocks')
-urlpatterns += router.urls
\ No newline at end of file
+
+# Под ASGI чтение ножей обслуживают async-представления; bulk/export и
+# нечисловые id не совпадают с <int:pk> и уходят в маршруты роутера
+if getattr(settings, 'ASYNC_CATALOG_VIEWS', False):
+    from . import async_views
+
+    urlpatterns += [
+        path('knives/', async_views.knife_list, name='knives-list'),
+        path('knives/<int:pk>/', async_views.knife_detail, name='knives-detail'),
+    ]
+
+urlpatterns += router.urls
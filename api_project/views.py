@@ -4,13 +4,29 @@ from .serializers import *
 from rest_framework import viewsets, mixins
 from knifestore.models import *
 from .permission import CustomPermissions, PaginationPage
+from knifestore.search import rank_queryset
+from knifestore.inventory import evaluate_alerts
+from .conditional import ConditionalViewSetMixin
+from .bulk import BulkModelMixin
+from .export import ExportMixin
+from .compiled import CompiledListMixin
+from .sparse import SparseFieldsMixin
+from knifestore.signals import knives_bulk_changed, relations_bulk_changed
 from rest_framework.renderers import AdminRenderer
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from analytics.reports import period, sales_report
+from analytics.rollups import items_bulk_changed, orders_bulk_changed
 # Create your views here.
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ConditionalViewSetMixin, SparseFieldsMixin, CompiledListMixin, ExportMixin, BulkModelMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [CustomPermissions]
     pagination_class = PaginationPage
+    conditional_field = None
+    conditional_scopes = ['category']
 
     def get_queryset(self):
         queryset = Category.objects.all()
@@ -21,7 +37,13 @@ class CategoryViewSet(viewsets.ModelViewSet):
         
         return queryset
 
-class BrandViewSet(mixins.ListModelMixin,
+    def after_bulk_write(self, objects, previous):
+        relations_bulk_changed(objects)
+
+class BrandViewSet(ConditionalViewSetMixin,
+                       SparseFieldsMixin,
+                       ExportMixin,
+                       mixins.ListModelMixin,
                        mixins.RetrieveModelMixin,
                        viewsets.GenericViewSet):
     queryset = Brand.objects.all()
@@ -29,6 +51,8 @@ class BrandViewSet(mixins.ListModelMixin,
     permission_classes = [CustomPermissions]
     pagination_class = PaginationPage
     renderer_classes = [AdminRenderer]
+    conditional_field = None
+    conditional_scopes = ['brand']
 
     def get_queryset(self):
         queryset = Brand.objects.all()
@@ -39,11 +63,13 @@ class BrandViewSet(mixins.ListModelMixin,
         
         return queryset
     
-class SeriesViewSet(viewsets.ModelViewSet):
+class SeriesViewSet(ConditionalViewSetMixin, SparseFieldsMixin, CompiledListMixin, ExportMixin, BulkModelMixin, viewsets.ModelViewSet):
     queryset = Series.objects.all()
     serializer_class = SeriesSerializer
     permission_classes = [CustomPermissions]
     pagination_class = PaginationPage
+    conditional_field = None
+    conditional_scopes = ['series']
 
     def get_queryset(self):
         queryset = Series.objects.all()
@@ -54,43 +80,85 @@ class SeriesViewSet(viewsets.ModelViewSet):
         
         return queryset
 
-class KnifeViewSet(viewsets.ModelViewSet):
+    def after_bulk_write(self, objects, previous):
+        relations_bulk_changed(objects)
+
+class KnifeViewSet(ConditionalViewSetMixin, SparseFieldsMixin, CompiledListMixin, ExportMixin, BulkModelMixin, viewsets.ModelViewSet):
     queryset = Knife.objects.all()
     serializer_class = KnifeSerializer
     permission_classes = [CustomPermissions]
     pagination_class = PaginationPage
+    conditional_scopes = ['knife']
 
     def get_queryset(self):
         queryset = Knife.objects.all()
         title = self.request.query_params.get('title', None)
+        search = self.request.query_params.get('search', None)
 
         if title is not None:
             queryset = queryset.filter(title__icontains=title)
+
+        # Полнотекстовый поиск по индексу, результаты по убыванию релевантности
+        if search:
+            queryset = rank_queryset(queryset, search).order_by('search_rank')
         
         return queryset
+
+    def after_bulk_write(self, objects, previous):
+        knives = list(objects) + list(previous)
+        knives_bulk_changed(
+            [knife.pk for knife in objects],
+            category_ids=[knife.category_id for knife in knives],
+            brand_ids=[knife.publisher_id for knife in knives],
+        )
     
-class CustomerViewSet(viewsets.ModelViewSet):
+class CustomerViewSet(SparseFieldsMixin, CompiledListMixin, ExportMixin, BulkModelMixin, viewsets.ModelViewSet):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
     permission_classes = [CustomPermissions]
     pagination_class = PaginationPage
     
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(SparseFieldsMixin, CompiledListMixin, ExportMixin, BulkModelMixin, viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [CustomPermissions]
     pagination_class = PaginationPage
 
+    def after_bulk_write(self, objects, previous):
+        orders_bulk_changed(objects, previous)
+
     
-class OrderItemViewSet(viewsets.ModelViewSet):
+class OrderItemViewSet(SparseFieldsMixin, CompiledListMixin, ExportMixin, BulkModelMixin, viewsets.ModelViewSet):
     queryset = OrderItem.objects.all()
     serializer_class = OrderItemSerializer
     permission_classes = [CustomPermissions]
     pagination_class = PaginationPage
 
+    def after_bulk_write(self, objects, previous):
+        items_bulk_changed(objects, previous)
+
     
-class StockViewSet(viewsets.ModelViewSet):
+class StockViewSet(SparseFieldsMixin, CompiledListMixin, ExportMixin, BulkModelMixin, viewsets.ModelViewSet):
     queryset = Stock.objects.all()
     serializer_class = StockSerializer
     permission_classes = [CustomPermissions]
-    pagination_class = PaginationPage
\ No newline at end of file
+    pagination_class = PaginationPage
+
+    def after_bulk_write(self, objects, previous):
+        # Остатки уже прошли через журнал (StockListSerializer); порог дозаказа
+        # мог измениться и без движения — очередь пересчитываем по всему пакету
+        evaluate_alerts((stock.knife_id, stock.quantity, stock.reorder_level) for stock in objects)
+
+
+class SalesReportView(APIView):
+    """Сводка продаж за ?days= дней (по умолчанию 30) только из таблиц аналитики"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        try:
+            days = int(request.query_params.get('days', 0))
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            raise ValidationError({'detail': 'days и limit должны быть целыми числами.'})
+        since, until = period(days)
+        return Response(sales_report(since, until, limit=min(max(limit, 1), 100)))
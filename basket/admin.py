@@ -1,3 +1,10 @@
 from django.contrib import admin
+from .models import Promotion
 
-# Register your models here.
+
+@admin.register(Promotion)
+class PromotionAdmin(admin.ModelAdmin):
+    list_display = ['name', 'kind', 'value', 'brand', 'category', 'threshold', 'is_active', 'starts_at', 'ends_at']
+    list_filter = ['kind', 'is_active']
+    list_select_related = ['brand', 'category']
+    search_fields = ['name']
@@ -1,34 +1,29 @@
-from decimal import Decimal
-from django.conf import settings
-from knifestore.models import Knife
+from .pricing import price_basket
+from .storage import get_basket_storage
 
 class Basket:
     def __init__(self, request):
-        self.session = request.session
-        basket = self.session.get(settings.BASKET_SESSION_ID)
-        if not basket:
-            basket = self.session[settings.BASKET_SESSION_ID] = {}
-        self.basket = basket
+        # Где лежит корзина (сессия, БД, кэш) решает settings.BASKET_STORAGE
+        self.storage = get_basket_storage(request)
+        self.basket = self.storage.load()
+        self._pricing = None
 
-    def __iter__(self):
-        product_ids = self.basket.keys()
-
-        product_list = Knife.objects.filter(pk__in=product_ids)
-
-        basket = self.basket.copy()
-        for product in product_list:
-            basket[str(product.pk)]['product'] = product
+    def pricing(self):
+        """Позиции по текущим ценам, акциям и складу (basket.pricing); считается один раз на изменение"""
+        if self._pricing is None:
+            self._pricing = price_basket(self.basket)
+        return self._pricing
 
-        for item in basket.values():
-            item['total_price'] = float(item['price']) * int(item['count'])
-            yield item
+    def __iter__(self):
+        # PricedLine: knife_id, title, count, unit_price, subtotal, discount, total, promotion, in_stock
+        return iter(self.pricing().lines)
 
     def __len__(self):
         return sum(item['count'] for item in self.basket.values())
     
     def save(self):
-        self.session[settings.BASKET_SESSION_ID] = self.basket
-        self.session.modified = True
+        self.storage.save(self.basket)
+        self._pricing = None
 
     def add(self, product, count=1, update_count=False):
         product_id = str(product.id)
@@ -41,6 +36,17 @@ class Basket:
             self.basket[product_id]['count'] += count
         self.save()
 
+    def update_counts(self, counts):
+        """Массовое изменение количеств: {product_id: count}, count <= 0 удаляет строку"""
+        for product_id, count in counts.items():
+            if product_id not in self.basket:
+                continue
+            if count > 0:
+                self.basket[product_id]['count'] = count
+            else:
+                del self.basket[product_id]
+        self.save()
+
     def remove(self, product):
         product_id = str(product.id)
         if product_id in self.basket:
@@ -48,8 +54,9 @@ class Basket:
             self.save()
 
     def get_total_price(self):
-        return sum(float(item['price']) * int(item['count']) for item in self.basket.values())
+        return self.pricing().total
     
     def clear(self):
-        del self.session[settings.BASKET_SESSION_ID]
-        self.session.modified = True
\ No newline at end of file
+        self.storage.clear()
+        self.basket = {}
+        self._pricing = None
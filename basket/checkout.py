@@ -0,0 +1,109 @@
+from collections import OrderedDict
+
+from django.db import IntegrityError, transaction
+
+from analytics.rollups import items_bulk_changed
+from knifestore.inventory import InsufficientStock, apply_movements
+from knifestore.models import Order, OrderItem, StockMovement
+from .pricing import fetch_rows, load_promotions, price_counts
+
+
+class CheckoutError(Exception):
+    """Заказ не может быть оформлен"""
+
+
+class EmptyBasket(CheckoutError):
+    pass
+
+
+class OutOfStock(CheckoutError):
+    """shortages: {knife_id: (запрошено, доступно)}"""
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__(f'Недостаточно товара на складе: {sorted(shortages)}')
+
+
+class CheckoutResult:
+    def __init__(self, order, created):
+        self.order = order
+        self.created = created
+
+
+def collect_lines(lines):
+    """[(knife_id, count), ...] -> {knife_id: count} по возрастанию id (порядок блокировок)"""
+    counts = {}
+    for knife_id, count in lines:
+        counts[int(knife_id)] = counts.get(int(knife_id), 0) + int(count)
+    return OrderedDict(sorted((knife_id, count) for knife_id, count in counts.items() if count > 0))
+
+
+def reserve_stock(counts, order=None):
+    """
+    Списать остатки движениями «продажа» в журнале склада (inventory.apply_movements).
+
+    Строки Stock блокируются и обновляются в порядке knife_id условным
+    UPDATE ... WHERE quantity >= n, поэтому две параллельные покупки не могут
+    взять блокировки крест-накрест. Ножи без записи Stock складом не
+    учитываются и не ограничиваются.
+    """
+    try:
+        apply_movements(
+            {knife_id: -count for knife_id, count in counts.items()}, StockMovement.SALE, order=order,
+        )
+    except InsufficientStock as error:
+        raise OutOfStock(error.shortages)
+
+
+def place_order(customer, lines, shipping_address, status='new', token=None):
+    """
+    Оформить заказ одной транзакцией: цены, списание склада, заказ и позиции.
+
+    Цены и скидки считает тот же движок, что и страница корзины
+    (basket.pricing), но по строкам, прочитанным внутри транзакции, а не из
+    кэша расчётов.
+
+    token — идемпотентный ключ оформления от клиента: повторная отправка той
+    же формы вернёт уже созданный заказ (created=False), а не новый.
+    """
+    if token:
+        existing = Order.objects.filter(checkout_token=token).first()
+        if existing is not None:
+            return CheckoutResult(existing, created=False)
+
+    counts = collect_lines(lines)
+    if not counts:
+        raise EmptyBasket('Корзина пуста')
+
+    try:
+        with transaction.atomic():
+            priced = price_counts(counts, fetch_rows(list(counts)), load_promotions())
+            if priced.missing:
+                raise OutOfStock({knife_id: (counts[knife_id], 0) for knife_id in priced.missing})
+
+            order = Order.objects.create(
+                customer=customer,
+                status=status,
+                shipping_address=shipping_address,
+                total_amount=priced.total,
+                discount_amount=priced.discount,
+                checkout_token=token,
+            )
+            # Движения склада ссылаются на заказ; нехватка откатит и его
+            reserve_stock(counts, order)
+
+            items = OrderItem.objects.bulk_create([
+                OrderItem(order=order, knife_id=line.knife_id, quantity=line.count, price=line.unit_price)
+                for line in priced.lines
+            ])
+            # bulk_create не шлёт сигналы — сводки продаж обновляем явно
+            items_bulk_changed(items)
+    except IntegrityError:
+        # Параллельный запрос с тем же токеном успел первым
+        if token:
+            existing = Order.objects.filter(checkout_token=token).first()
+            if existing is not None:
+                return CheckoutResult(existing, created=False)
+        raise
+
+    return CheckoutResult(order, created=True)
@@ -3,6 +3,8 @@ from knifestore.models import Order
 from .models import *
 
 class OrderForm(forms.ModelForm):
+    checkout_token = forms.UUIDField(required=False, widget=forms.HiddenInput)
+
     class Meta:
         model = Order
         fields = ['customer', 'status', 'shipping_address']
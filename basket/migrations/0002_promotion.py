@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-18 20:03
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('basket', '0001_initial'),
+        ('knifestore', '0010_order_discount_amount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Promotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Название')),
+                ('kind', models.CharField(choices=[('percent', 'Процент с позиции'), ('fixed', 'Рубли с каждой единицы'), ('n_for_m', 'N по цене M'), ('basket_percent', 'Процент с корзины от порога'), ('basket_fixed', 'Рубли с корзины от порога')], max_length=20, verbose_name='Вид')),
+                ('value', models.DecimalField(decimal_places=2, default=0, help_text='Процент или сумма в рублях; для «N по цене M» не используется', max_digits=8, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Размер')),
+                ('buy_count', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='N (берёт)')),
+                ('pay_count', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='M (платит)')),
+                ('threshold', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Порог суммы корзины')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Действует')),
+                ('starts_at', models.DateTimeField(blank=True, null=True, verbose_name='Начало')),
+                ('ends_at', models.DateTimeField(blank=True, null=True, verbose_name='Окончание')),
+                ('brand', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='promotions', to='knifestore.brand', verbose_name='Бренд')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='promotions', to='knifestore.category', verbose_name='Категория')),
+            ],
+            options={
+                'verbose_name': 'Акция',
+                'verbose_name_plural': 'Акции',
+                'ordering': ['name'],
+            },
+        ),
+    ]
@@ -1,3 +1,175 @@
+from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator
 from django.db import models
+from knifestore.models import Brand, Category, Knife
 
-# Create your models here.
+
+class StoredBasket(models.Model):
+    """Серверная корзина пользователя (общая для всех его устройств)"""
+    user = models.OneToOneField(
+        'auth.User',
+        on_delete=models.CASCADE,
+        related_name='stored_basket',
+        verbose_name="Пользователь"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Последнее изменение"
+    )
+
+    class Meta:
+        verbose_name = "Корзина"
+        verbose_name_plural = "Корзины"
+
+    def __str__(self):
+        return f"Корзина {self.user}"
+
+
+class BasketLine(models.Model):
+    """Строка серверной корзины"""
+    basket = models.ForeignKey(
+        StoredBasket,
+        on_delete=models.CASCADE,
+        related_name='lines',
+        verbose_name="Корзина"
+    )
+    knife = models.ForeignKey(
+        Knife,
+        on_delete=models.CASCADE,
+        verbose_name="Нож"
+    )
+    count = models.PositiveIntegerField(
+        verbose_name="Количество"
+    )
+    price = models.DecimalField(
+        max_digits=8,
+        decimal_places=2,
+        verbose_name="Цена на момент добавления"
+    )
+
+    class Meta:
+        verbose_name = "Строка корзины"
+        verbose_name_plural = "Строки корзины"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['basket', 'knife'],
+                name='unique_basket_line'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.knife_id} x {self.count}"
+
+
+class Promotion(models.Model):
+    """
+    Правило скидки для движка basket.pricing.
+
+    Скидки на позицию (процент, рубли с единицы, N по цене M) действуют на
+    ножи бренда и/или категории, а без них — на весь каталог; из подходящих
+    к позиции берётся самая выгодная. Скидка на корзину применяется к сумме
+    после скидок на позиции, если она не меньше порога.
+    """
+    PERCENT = 'percent'
+    FIXED = 'fixed'
+    N_FOR_M = 'n_for_m'
+    BASKET_PERCENT = 'basket_percent'
+    BASKET_FIXED = 'basket_fixed'
+    KIND_CHOICES = [
+        (PERCENT, 'Процент с позиции'),
+        (FIXED, 'Рубли с каждой единицы'),
+        (N_FOR_M, 'N по цене M'),
+        (BASKET_PERCENT, 'Процент с корзины от порога'),
+        (BASKET_FIXED, 'Рубли с корзины от порога'),
+    ]
+    LINE_KINDS = (PERCENT, FIXED, N_FOR_M)
+    BASKET_KINDS = (BASKET_PERCENT, BASKET_FIXED)
+
+    name = models.CharField(
+        max_length=100,
+        verbose_name="Название"
+    )
+    kind = models.CharField(
+        max_length=20,
+        choices=KIND_CHOICES,
+        verbose_name="Вид"
+    )
+    value = models.DecimalField(
+        max_digits=8,
+        decimal_places=2,
+        default=0,
+        validators=[MinValueValidator(0)],
+        verbose_name="Размер",
+        help_text="Процент или сумма в рублях; для «N по цене M» не используется"
+    )
+    brand = models.ForeignKey(
+        Brand,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='promotions',
+        verbose_name="Бренд"
+    )
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='promotions',
+        verbose_name="Категория"
+    )
+    buy_count = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="N (берёт)"
+    )
+    pay_count = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="M (платит)"
+    )
+    threshold = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        verbose_name="Порог суммы корзины"
+    )
+    is_active = models.BooleanField(
+        default=True,
+        verbose_name="Действует"
+    )
+    starts_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Начало"
+    )
+    ends_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Окончание"
+    )
+
+    class Meta:
+        verbose_name = "Акция"
+        verbose_name_plural = "Акции"
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        errors = {}
+        if self.kind in (self.PERCENT, self.BASKET_PERCENT) and self.value > 100:
+            errors['value'] = 'Процент не может быть больше 100'
+        if self.kind == self.N_FOR_M and not (self.buy_count and self.pay_count and self.buy_count > self.pay_count):
+            errors['buy_count'] = 'Для «N по цене M» нужны N > M ≥ 1'
+        if self.kind in self.BASKET_KINDS:
+            if self.threshold is None:
+                errors['threshold'] = 'Для скидки на корзину нужен порог'
+            if self.brand_id or self.category_id:
+                errors['kind'] = 'Скидка на корзину не ограничивается брендом или категорией'
+        if self.starts_at and self.ends_at and self.starts_at >= self.ends_at:
+            errors['ends_at'] = 'Окончание должно быть позже начала'
+        if errors:
+            raise ValidationError(errors)
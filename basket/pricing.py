@@ -0,0 +1,239 @@
+import hashlib
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.utils import timezone
+
+from knifestore.cache import cache_timeout, catalog_cache, make_key, record
+from knifestore.models import Knife
+from .models import Promotion
+
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+PROMOTION_FIELDS = (
+    'id', 'name', 'kind', 'value', 'brand_id', 'category_id',
+    'buy_count', 'pay_count', 'threshold', 'starts_at', 'ends_at',
+)
+
+
+def money(value):
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+class PricedLine:
+    """Позиция корзины по текущей цене; available None — склад ножа не ведётся"""
+    __slots__ = ('knife_id', 'title', 'count', 'unit_price', 'subtotal', 'discount', 'total', 'promotion', 'available')
+
+    def __init__(self, knife_id, title, count, unit_price, available):
+        self.knife_id = knife_id
+        self.title = title
+        self.count = count
+        self.unit_price = unit_price
+        self.subtotal = money(unit_price * count)
+        self.discount = ZERO
+        self.total = self.subtotal
+        self.promotion = None
+        self.available = available
+
+    @property
+    def in_stock(self):
+        return self.available is None or self.count <= self.available
+
+
+class PricedBasket:
+    """Итог расчёта: позиции, скидки, сумма; missing — id ножей, которых уже нет в каталоге"""
+    __slots__ = ('version', 'lines', 'missing', 'subtotal', 'line_discount', 'basket_discount',
+                 'basket_promotion', 'total')
+
+    def __init__(self, version, lines, missing=()):
+        self.version = version
+        self.lines = lines
+        self.missing = list(missing)
+        self.subtotal = sum((line.subtotal for line in lines), ZERO)
+        self.line_discount = sum((line.discount for line in lines), ZERO)
+        self.basket_discount = ZERO
+        self.basket_promotion = None
+        self.total = self.subtotal - self.line_discount
+
+    @property
+    def discount(self):
+        return self.line_discount + self.basket_discount
+
+    @property
+    def count(self):
+        return sum(line.count for line in self.lines)
+
+    @property
+    def shortages(self):
+        """{knife_id: (в корзине, на складе)} — как OutOfStock при оформлении"""
+        return {line.knife_id: (line.count, line.available) for line in self.lines if not line.in_stock}
+
+
+def basket_counts(lines):
+    """Строки корзины {'12': {'count': 2, ...}} -> {12: 2} по возрастанию id"""
+    counts = {}
+    for product_id, line in lines.items():
+        count = int(line['count'])
+        if count > 0:
+            counts[int(product_id)] = counts.get(int(product_id), 0) + count
+    return dict(sorted(counts.items()))
+
+
+def basket_version(counts):
+    """Версия корзины — отпечаток состава; цены в неё не входят, их версии даёт кэш каталога"""
+    raw = ';'.join(f'{knife_id}:{count}' for knife_id, count in counts.items())
+    return hashlib.md5(raw.encode('ascii'), usedforsecurity=False).hexdigest()
+
+
+def load_promotions():
+    """
+    Включённые и не закончившиеся акции списком словарей; кэшируются до
+    изменения любой акции (сигнал поднимает версию 'promotion'). Окно
+    starts_at/ends_at проверяет active_promotions в момент расчёта.
+    """
+    cache = catalog_cache()
+    key = make_key('pricing', 'promotions', ['promotion'])
+    promotions = cache.get(key)
+    if promotions is None:
+        promotions = list(
+            Promotion.objects.filter(is_active=True)
+            .exclude(ends_at__lte=timezone.now())
+            .values(*PROMOTION_FIELDS)
+        )
+        cache.set(key, promotions, cache_timeout())
+    return promotions
+
+
+def active_promotions(promotions, now):
+    return [
+        promotion for promotion in promotions
+        if (promotion['starts_at'] is None or promotion['starts_at'] <= now)
+        and (promotion['ends_at'] is None or promotion['ends_at'] > now)
+    ]
+
+
+def next_change(promotions, now):
+    """Секунд до ближайшего начала или окончания акции (None — таких нет)"""
+    moments = [
+        moment for promotion in promotions for moment in (promotion['starts_at'], promotion['ends_at'])
+        if moment is not None and moment > now
+    ]
+    return (min(moments) - now).total_seconds() if moments else None
+
+
+def line_discount(promotion, unit_price, count):
+    kind = promotion['kind']
+    if kind == Promotion.PERCENT:
+        discount = money(unit_price * count * promotion['value'] / 100)
+    elif kind == Promotion.FIXED:
+        discount = min(promotion['value'], unit_price) * count
+    elif kind == Promotion.N_FOR_M:
+        buy, pay = promotion['buy_count'], promotion['pay_count']
+        discount = (count // buy) * (buy - pay) * unit_price if buy and pay is not None and buy > pay else ZERO
+    else:
+        discount = ZERO
+    return money(min(discount, unit_price * count))
+
+
+def basket_discount(promotion, amount):
+    if promotion['threshold'] is None or amount < promotion['threshold']:
+        return ZERO
+    if promotion['kind'] == Promotion.BASKET_PERCENT:
+        return money(amount * promotion['value'] / 100)
+    return money(min(promotion['value'], amount))
+
+
+def index_line_promotions(promotions):
+    """
+    Акции на позиции по цели: (бренд, категория), где None — «любой». Для
+    строки смотрим только четыре корзины индекса, а не все акции.
+    """
+    index = {}
+    for promotion in promotions:
+        if promotion['kind'] in Promotion.LINE_KINDS:
+            index.setdefault((promotion['brand_id'], promotion['category_id']), []).append(promotion)
+    return index
+
+
+def fetch_rows(knife_ids):
+    """Цена, бренд, категория и остаток ножей одним запросом (LEFT JOIN склада)"""
+    return {
+        pk: row for pk, *row in Knife.objects.filter(pk__in=knife_ids).values_list(
+            'pk', 'title', 'price', 'publisher_id', 'category_id', 'stock__quantity',
+        )
+    }
+
+
+def price_counts(counts, rows, promotions, now=None):
+    """
+    Расчёт без обращений к БД и кэшу: counts {knife_id: количество}, rows —
+    из fetch_rows, promotions — из load_promotions. Все суммы — Decimal,
+    округление до копеек половиной вверх на каждой скидке.
+    """
+    now = now or timezone.now()
+    promotions = active_promotions(promotions, now)
+    index = index_line_promotions(promotions)
+    lines, missing = [], []
+    for knife_id, count in counts.items():
+        row = rows.get(knife_id)
+        if row is None:
+            missing.append(knife_id)
+            continue
+        title, price, brand_id, category_id, available = row
+        line = PricedLine(knife_id, title, count, price, available)
+        candidates = (
+            index.get((None, None), []) + index.get((brand_id, None), [])
+            + index.get((None, category_id), []) + index.get((brand_id, category_id), [])
+        )
+        for promotion in candidates:
+            discount = line_discount(promotion, price, count)
+            if discount > line.discount:
+                line.discount, line.promotion = discount, promotion['name']
+        line.total = line.subtotal - line.discount
+        lines.append(line)
+
+    priced = PricedBasket(basket_version(counts), lines, missing)
+    for promotion in promotions:
+        if promotion['kind'] in Promotion.BASKET_KINDS:
+            discount = basket_discount(promotion, priced.total)
+            if discount > priced.basket_discount:
+                priced.basket_discount, priced.basket_promotion = discount, promotion['name']
+    priced.total -= priced.basket_discount
+    return priced
+
+
+def price_basket(lines, use_cache=True):
+    """
+    Цены корзины по текущему каталогу, акциям и складу.
+
+    Результат кэшируется по версии корзины и версиям её ножей и акций:
+    цена ножа ('knife:<id>'), любое движение склада по нему ('stock:<id>',
+    inventory.apply_movements) и любая акция сбрасывают расчёт, а смена
+    акции по расписанию ограничивает срок записи.
+    Без попадания — один запрос к ножам и складу (акции — из своего кэша).
+    """
+    counts = basket_counts(lines)
+    if not counts:
+        return PricedBasket(basket_version(counts), [])
+    key = None
+    if use_cache:
+        cache = catalog_cache()
+        key = make_key(
+            'pricing', 'basket',
+            ['promotion', *[f'{scope}:{knife_id}' for knife_id in counts for scope in ('knife', 'stock')]],
+            basket_version(counts),
+        )
+        priced = cache.get(key)
+        record('pricing', priced is not None)
+        if priced is not None:
+            return priced
+
+    now = timezone.now()
+    promotions = load_promotions()
+    priced = price_counts(counts, fetch_rows(list(counts)), promotions, now)
+    if key is not None:
+        timeout = cache_timeout()
+        change = next_change(promotions, now)
+        if change is not None:
+            timeout = max(1, min(timeout, int(change)))
+        cache.set(key, priced, timeout)
+    return priced
@@ -0,0 +1,22 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from knifestore.cache import bump
+from .models import Promotion
+from .storage import get_basket_storage
+
+
+@receiver(user_logged_in)
+def merge_anonymous_basket(sender, request, user, **kwargs):
+    # Загрузка пользовательского хранилища вливает в него анонимную корзину из сессии
+    if request is not None and hasattr(request, 'session'):
+        get_basket_storage(request).load()
+
+
+@receiver(post_save, sender=Promotion)
+@receiver(post_delete, sender=Promotion)
+def promotion_changed(sender, **kwargs):
+    # Кэш акций и все расчёты корзин с ними (basket.pricing)
+    transaction.on_commit(lambda: bump('promotion'))
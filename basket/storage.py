@@ -0,0 +1,207 @@
+from abc import ABC, abstractmethod
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from knifestore.models import Knife
+
+from .models import BasketLine, StoredBasket
+
+
+def encode_lines(lines):
+    """{'12': {'count': 2, 'price': '990.00'}} -> '12:2:990.00'"""
+    return ';'.join(
+        f"{product_id}:{int(line['count'])}:{line['price']}"
+        for product_id, line in lines.items()
+    )
+
+
+def decode_lines(raw):
+    """Обратное к encode_lines; понимает и старый формат-словарь из сессии"""
+    if not raw:
+        return {}
+    if isinstance(raw, dict):
+        return {
+            str(product_id): {'count': int(line['count']), 'price': str(line['price'])}
+            for product_id, line in raw.items()
+        }
+    lines = {}
+    for chunk in raw.split(';'):
+        try:
+            product_id, count, price = chunk.split(':')
+            lines[product_id] = {'count': int(count), 'price': price}
+        except ValueError:
+            continue  # Повреждённую строку пропускаем
+    return lines
+
+
+def merge_lines(target, source):
+    """Добавить строки source в target (количество суммируется)"""
+    for product_id, line in source.items():
+        if product_id in target:
+            target[product_id]['count'] += line['count']
+        else:
+            target[product_id] = dict(line)
+    return target
+
+
+class SessionBasketStorage:
+    """Корзина в сессии в компактном виде — для анонимных посетителей"""
+
+    def __init__(self, request):
+        self.request = request
+        self.session = request.session
+
+    def load(self):
+        return decode_lines(self.session.get(settings.BASKET_SESSION_ID))
+
+    def save(self, lines):
+        self.session[settings.BASKET_SESSION_ID] = encode_lines(lines)
+        self.session.modified = True
+
+    def clear(self):
+        if settings.BASKET_SESSION_ID in self.session:
+            del self.session[settings.BASKET_SESSION_ID]
+            self.session.modified = True
+
+
+class UserBasketStorage(SessionBasketStorage, ABC):
+    """
+    База для хранилищ корзины вошедшего пользователя.
+
+    Анонимная корзина из сессии при первом обращении вливается в
+    пользовательскую, так что корзина не теряется при входе.
+    """
+
+    def __init__(self, request):
+        super().__init__(request)
+        user = getattr(request, 'user', None)
+        self.user = user if user is not None and user.is_authenticated else None
+
+    def load(self):
+        if self.user is None:
+            return super().load()
+        lines = self.load_user_lines()
+        anonymous = super().load()
+        if anonymous:
+            merge_lines(lines, anonymous)
+            self.save(lines)
+            super().clear()
+        return lines
+
+    def save(self, lines):
+        if self.user is None:
+            return super().save(lines)
+        self.save_user_lines(lines)
+
+    def clear(self):
+        super().clear()
+        if self.user is not None:
+            self.clear_user_lines()
+
+    @abstractmethod
+    def load_user_lines(self):
+        """Строки корзины пользователя в формате decode_lines"""
+
+    @abstractmethod
+    def save_user_lines(self, lines):
+        """Сохранить строки корзины пользователя целиком"""
+
+    @abstractmethod
+    def clear_user_lines(self):
+        """Удалить корзину пользователя"""
+
+
+class CacheBasketStorage(UserBasketStorage):
+    """Корзина пользователя в кэше (BASKET_CACHE_ALIAS) одной компактной строкой"""
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'BASKET_CACHE_ALIAS', 'default')]
+
+    @property
+    def key(self):
+        return f'basket:user:{self.user.pk}'
+
+    def load_user_lines(self):
+        return decode_lines(self.cache.get(self.key))
+
+    def save_user_lines(self, lines):
+        self.cache.set(self.key, encode_lines(lines), getattr(settings, 'BASKET_CACHE_TIMEOUT', None))
+
+    def clear_user_lines(self):
+        self.cache.delete(self.key)
+
+
+class DatabaseBasketStorage(UserBasketStorage):
+    """
+    Корзина пользователя в таблицах StoredBasket/BasketLine.
+
+    Сохранение пишет только разницу с загруженным состоянием: обычно
+    add/remove меняют одну строку, и это один INSERT/UPDATE/DELETE.
+    """
+
+    def __init__(self, request):
+        super().__init__(request)
+        self._snapshot = {}
+
+    def _basket(self):
+        basket, created = StoredBasket.objects.get_or_create(user=self.user)
+        if not created:
+            StoredBasket.objects.filter(pk=basket.pk).update(updated_at=timezone.now())
+        return basket
+
+    def load_user_lines(self):
+        rows = BasketLine.objects.filter(basket__user=self.user).values_list('knife_id', 'count', 'price')
+        lines = {str(knife_id): {'count': count, 'price': str(price)} for knife_id, count, price in rows}
+        self._snapshot = {product_id: dict(line) for product_id, line in lines.items()}
+        return lines
+
+    @transaction.atomic
+    def save_user_lines(self, lines):
+        basket = self._basket()
+        created, changed = [], []
+        for product_id, line in lines.items():
+            old = self._snapshot.get(product_id)
+            if old == line:
+                continue
+            row = BasketLine(basket=basket, knife_id=int(product_id), count=line['count'], price=Decimal(line['price']))
+            (changed if old else created).append(row)
+
+        if created:
+            # Анонимная корзина из сессии может ссылаться на уже удалённый нож —
+            # такая строка уронила бы вход IntegrityError, её просто не переносим
+            existing = set(
+                Knife.objects.filter(pk__in=[row.knife_id for row in created]).values_list('pk', flat=True)
+            )
+            for row in created:
+                if row.knife_id not in existing:
+                    lines.pop(str(row.knife_id), None)
+            created = [row for row in created if row.knife_id in existing]
+
+        removed = [int(product_id) for product_id in self._snapshot if product_id not in lines]
+        if removed:
+            BasketLine.objects.filter(basket=basket, knife_id__in=removed).delete()
+        for row in changed:
+            BasketLine.objects.filter(basket=basket, knife_id=row.knife_id).update(count=row.count, price=row.price)
+        if created:
+            BasketLine.objects.bulk_create(
+                created,
+                update_conflicts=True,
+                unique_fields=['basket', 'knife'],
+                update_fields=['count', 'price'],
+            )
+        self._snapshot = {product_id: dict(line) for product_id, line in lines.items()}
+
+    def clear_user_lines(self):
+        BasketLine.objects.filter(basket__user=self.user).delete()
+        self._snapshot = {}
+
+
+def get_basket_storage(request):
+    storage_class = import_string(getattr(settings, 'BASKET_STORAGE', 'basket.storage.SessionBasketStorage'))
+    return storage_class(request)
@@ -1,3 +1,246 @@
-from django.test import TestCase
+import datetime
+import uuid
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.conf import settings
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from knifestore.inventory import reconcile
+from knifestore.models import Customer, Order, Stock
+from knifestore.tests import make_catalog
+
+from .models import BasketLine, Promotion
+from .pricing import PROMOTION_FIELDS, money, price_counts
+from .storage import UserBasketStorage, decode_lines, encode_lines
+
+
+class BasketBuyTests(TestCase):
+    """/basket/buy/ оформляет заказ через place_order: склад, журнал, идемпотентность"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.knives = make_catalog(2, quantity=5)
+        cls.user = User.objects.create_user('buyer', 'buyer@example.com', 'password')
+        cls.customer = Customer.objects.create(user=cls.user, address='Адрес')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def buy(self, token=None):
+        return self.client.post(reverse('basket_buy'), {
+            'customer': self.customer.pk,
+            'status': 'new',
+            'shipping_address': 'Адрес',
+            'checkout_token': token or uuid.uuid4(),
+        })
+
+    def add(self, knife, count):
+        self.client.post(reverse('basket_add', args=[knife.pk]), {'count': count})
+
+    def test_buy_places_order(self):
+        self.add(self.knives[0], 2)
+        token = uuid.uuid4()
+        self.assertRedirects(self.buy(token), reverse('user_orders'), fetch_redirect_response=False)
+        self.assertEqual(Stock.objects.get(knife=self.knives[0]).quantity, 3)
+        self.assertEqual(reconcile(), [])
+
+        # Повторная отправка той же формы не создаёт второй заказ
+        self.add(self.knives[0], 2)
+        self.buy(token)
+        self.assertEqual(Order.objects.filter(customer=self.customer).count(), 1)
+
+    def test_out_of_stock_and_empty_basket(self):
+        self.add(self.knives[1], 6)
+        response = self.buy()
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Недостаточно на складе')
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Stock.objects.get(knife=self.knives[1]).quantity, 5)
+
+        self.client.post(reverse('basket_clear'))
+        self.assertContains(self.buy(), 'Корзина пуста')
+
+    def test_get_not_allowed(self):
+        self.assertEqual(self.client.get(reverse('basket_buy')).status_code, 405)
+
+
+class BasketStorageTests(TestCase):
+    """Компактная корзина в сессии и перенос анонимной корзины при входе"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.knives = make_catalog(3)
+        cls.user = User.objects.create_user('buyer', 'buyer@example.com', 'password')
+
+    def fill_session(self, lines):
+        session = self.client.session
+        session[settings.BASKET_SESSION_ID] = encode_lines(lines)
+        session.save()
+        # signed_cookies: данные сессии — это сама кука
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+    def stored_lines(self):
+        return dict(BasketLine.objects.filter(basket__user=self.user).values_list('knife_id', 'count'))
+
+    def test_encoding(self):
+        lines = {'12': {'count': 2, 'price': '990.00'}, '7': {'count': 1, 'price': '1500.50'}}
+        self.assertEqual(encode_lines(lines), '12:2:990.00;7:1:1500.50')
+        self.assertEqual(decode_lines(encode_lines(lines)), lines)
+        # Старый формат-словарь из сессии и повреждённые куски
+        self.assertEqual(decode_lines({12: {'count': '2', 'price': Decimal('990.00')}}), {'12': lines['12']})
+        self.assertEqual(decode_lines('12:2:990.00;мусор;7:x:1'), {'12': lines['12']})
+
+    def test_user_storage_is_abstract(self):
+        request = RequestFactory().get('/')
+        request.session = {}
+        with self.assertRaises(TypeError):
+            UserBasketStorage(request)
+
+    def test_login_merges_anonymous_basket(self):
+        deleted = self.knives[2]
+        self.client.force_login(self.user)
+        self.client.post(reverse('basket_add', args=[self.knives[0].pk]), {'count': 1})
+        self.client.logout()
+
+        self.fill_session({
+            str(self.knives[0].pk): {'count': 2, 'price': '1000.00'},
+            str(self.knives[1].pk): {'count': 1, 'price': '1001.00'},
+            str(deleted.pk): {'count': 1, 'price': '1000.00'},
+        })
+        deleted.delete()
+        # Через представление входа: Client.login() не выставляет request.user до сигнала
+        response = self.client.post(reverse('login'), {'username': 'buyer', 'password': 'password'})
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
+
+        # Количество суммируется, удалённый нож не переносится
+        self.assertEqual(self.stored_lines(), {self.knives[0].pk: 3, self.knives[1].pk: 1})
+        self.assertNotIn(settings.BASKET_SESSION_ID, self.client.session)
+
+    def test_database_storage_writes_only_changes(self):
+        self.client.force_login(self.user)
+        for knife in self.knives:
+            self.client.post(reverse('basket_add', args=[knife.pk]), {'count': 1})
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('basket_update'), {f'count_{self.knives[1].pk}': 5})
+        writes = [
+            query['sql'].split()[0] for query in queries.captured_queries
+            if 'basket_basketline' in query['sql'] and not query['sql'].startswith('SELECT')
+        ]
+        self.assertEqual(writes, ['UPDATE'])
+        self.assertEqual(self.stored_lines(), {self.knives[0].pk: 1, self.knives[1].pk: 5, self.knives[2].pk: 1})
+        self.client.get(reverse('basket_remove', args=[self.knives[0].pk]))
+        self.assertEqual(self.stored_lines(), {self.knives[1].pk: 5, self.knives[2].pk: 1})
+
+    @override_settings(BASKET_STORAGE='basket.storage.CacheBasketStorage')
+    def test_cache_storage_survives_new_session(self):
+        caches['default'].clear()
+        self.client.force_login(self.user)
+        self.client.post(reverse('basket_add', args=[self.knives[2].pk]), {'count': 4})
+        other = self.client_class()
+        other.force_login(self.user)
+        basket = other.get(reverse('basket_detail')).context['basket']
+        self.assertEqual(basket.basket, {str(self.knives[2].pk): {'count': 4, 'price': str(self.knives[2].price)}})
+        self.assertEqual(self.stored_lines(), {})
+
+
+def promotion(kind, value='0', **fields):
+    """Акция в виде строки load_promotions()"""
+    row = dict.fromkeys(PROMOTION_FIELDS)
+    row.update(id=1, name=kind, kind=kind, value=Decimal(value), **fields)
+    return row
+
+
+class PricingTests(SimpleTestCase):
+    """Расчёт скидок price_counts: Decimal, копейки половиной вверх"""
+    # knife_id -> (название, цена, бренд, категория, остаток)
+    rows = {
+        1: ('Шеф', Decimal('1000.00'), 1, 1, 10),
+        2: ('Сантоку', Decimal('333.33'), 2, 2, None),
+    }
+
+    def price(self, counts, *promotions):
+        return price_counts(counts, self.rows, list(promotions))
+
+    def test_percent(self):
+        priced = self.price({1: 3, 2: 3}, promotion(Promotion.PERCENT, '10'))
+        self.assertEqual([line.discount for line in priced.lines], [Decimal('300.00'), Decimal('100.00')])
+        self.assertEqual(priced.total, Decimal('3599.99'))
+
+    def test_fixed(self):
+        priced = self.price({1: 2, 2: 1}, promotion(Promotion.FIXED, '50', category_id=1),
+                            promotion(Promotion.FIXED, '500', brand_id=2))
+        # Скидка с единицы не больше её цены
+        self.assertEqual([line.discount for line in priced.lines], [Decimal('100.00'), Decimal('333.33')])
+
+    def test_n_for_m(self):
+        three_for_two = promotion(Promotion.N_FOR_M, buy_count=3, pay_count=2)
+        self.assertEqual(self.price({1: 7}, three_for_two).lines[0].discount, Decimal('2000.00'))
+        self.assertEqual(self.price({1: 2}, three_for_two).lines[0].discount, Decimal('0.00'))
+
+    def test_best_line_promotion_wins(self):
+        priced = self.price({1: 3}, promotion(Promotion.PERCENT, '20'),
+                            dict(promotion(Promotion.N_FOR_M, buy_count=3, pay_count=2), name='3 по цене 2'))
+        self.assertEqual((priced.lines[0].discount, priced.lines[0].promotion), (Decimal('1000.00'), '3 по цене 2'))
+
+    def test_basket_threshold(self):
+        basket_percent = promotion(Promotion.BASKET_PERCENT, '5', threshold=Decimal('2000.00'))
+        line_percent = promotion(Promotion.PERCENT, '10')
+        # Порог сравнивается с суммой после скидок на позиции: 1800 < 2000
+        self.assertEqual(self.price({1: 2}, basket_percent, line_percent).basket_discount, Decimal('0.00'))
+        priced = self.price({1: 3}, basket_percent, line_percent)
+        self.assertEqual((priced.basket_discount, priced.total), (Decimal('135.00'), Decimal('2565.00')))
+        fixed = promotion(Promotion.BASKET_FIXED, '5000', threshold=Decimal('100.00'))
+        self.assertEqual(self.price({2: 1}, fixed).total, Decimal('0.00'))
+
+    def test_schedule_and_missing_knives(self):
+        now = timezone.now()
+        later = promotion(Promotion.PERCENT, '50', starts_at=now + datetime.timedelta(hours=1))
+        priced = self.price({1: 1, 3: 1}, later)
+        self.assertEqual(priced.discount, Decimal('0.00'))
+        self.assertEqual(priced.missing, [3])
+
+
+class BasketOrderTotalTests(TestCase):
+    """Сумма на странице корзины совпадает с суммой оформленного заказа"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.knives = make_catalog(3)
+        cls.user = User.objects.create_user('buyer', 'buyer@example.com', 'password')
+        cls.customer = Customer.objects.create(user=cls.user, address='Адрес')
+        Promotion.objects.create(name='Бренд -15%', kind=Promotion.PERCENT, value=15, brand=cls.knives[0].publisher)
+        Promotion.objects.create(name='3 по цене 2', kind=Promotion.N_FOR_M, buy_count=3, pay_count=2)
+        Promotion.objects.create(name='От 3000', kind=Promotion.BASKET_FIXED, value=Decimal('99.99'),
+                                 threshold=3000)
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client.force_login(self.user)
+
+    def test_order_total_equals_basket_total(self):
+        for knife, count in ((self.knives[0], 2), (self.knives[1], 3)):
+            self.client.post(reverse('basket_add', args=[knife.pk]), {'count': count})
+        basket = self.client.get(reverse('basket_detail')).context['basket']
+        total, discount = basket.get_total_price(), basket.pricing().discount
+        self.assertGreater(discount, 0)
+
+        self.client.post(reverse('basket_buy'), {
+            'customer': self.customer.pk, 'status': 'new', 'shipping_address': 'Адрес',
+            'checkout_token': uuid.uuid4(),
+        })
+        order = Order.objects.get(customer=self.customer)
+        self.assertEqual((order.total_amount, order.discount_amount), (total, discount))
+
+    def test_promotion_change_resets_cached_total(self):
+        self.client.post(reverse('basket_add', args=[self.knives[0].pk]), {'count': 1})
+        before = self.client.get(reverse('basket_detail')).context['basket'].get_total_price()
+        with self.captureOnCommitCallbacks(execute=True):
+            Promotion.objects.filter(name='Бренд -15%').get().delete()
+        after = self.client.get(reverse('basket_detail')).context['basket'].get_total_price()
+        self.assertEqual(after - before, money(self.knives[0].price * 15 / 100))
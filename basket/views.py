@@ -1,28 +1,27 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
-from knifestore.models import Knife, Order, OrderItem, Customer
+from knifestore.models import Knife, Customer
 from .basket import Basket
+from .checkout import OutOfStock, EmptyBasket, place_order
+import uuid
 from django.utils import timezone
 from .forms import *
 
 @login_required
 def basket_update(request):
-    basket = request.session.get('basket', {})
+    basket = Basket(request)
 
-    for product_id in basket.keys():
+    counts = {}
+    for product_id in basket.basket.keys():
         key = f'count_{product_id}'
         if key in request.POST:
             try:
-                new_count = int(request.POST[key])
-                if new_count > 0:
-                    basket[product_id]['count'] = new_count
-                else:
-                    del basket[product_id]
+                counts[product_id] = int(request.POST[key])
             except ValueError:
                 continue  # Игнорируем ошибочные значения
 
-    request.session['basket'] = basket
+    basket.update_counts(counts)
     return redirect('basket_detail')
 
 @login_required
@@ -57,29 +56,40 @@ def basket_add(request, product_id):
         )
     return redirect('basket_detail')
 
+def checkout_basket(basket, customer, form):
+    """Оформить корзину через place_order; ошибки склада и пустой корзины — в форму"""
+    try:
+        place_order(
+            customer=customer,
+            lines=[(product_id, item['count']) for product_id, item in basket.basket.items()],
+            shipping_address=form.cleaned_data['shipping_address'],
+            status=form.cleaned_data['status'],
+            token=form.cleaned_data['checkout_token'],
+        )
+    except OutOfStock as error:
+        titles = Knife.objects.filter(pk__in=error.shortages).values_list('title', flat=True)
+        form.add_error(None, 'Недостаточно на складе: ' + ', '.join(titles))
+    except EmptyBasket:
+        form.add_error(None, 'Корзина пуста')
+    else:
+        basket.clear()
+        return True
+    return False
+
 @login_required
+@require_POST
 def basket_buy(request):
     basket = Basket(request)
-    if basket.__len__() <= 0:
-        return redirect('list_product_filter')
+
+    try:
+        customer = request.user.customer
+    except Customer.DoesNotExist:
+        return redirect('customer_create')
+
     form = OrderForm(request.POST)
-    if form.is_valid():
-        order = Order.objects.create(
-            customer = form.cleaned_data['customer'],
-            order_date = form.cleaned_data['order_date'],
-            status = form.cleaned_data['status'],
-            total_amount = form.cleaned_data['total_amount'],
-            shipping_address = form.cleaned_data['shipping_address']
-        )
-        order.price = basket.get_total_price()
-        for item in basket:
-            orderitem = OrderItem.objects.create(
-                knife = item['product'],
-                count = item['count'],
-                order = order
-            )
-        basket.clear()
-    return redirect('basket_detail')
+    if form.is_valid() and checkout_basket(basket, customer, form):
+        return redirect('user_orders')
+    return render(request, 'order/order_form.html', {'form_order': form, 'pricing': basket.pricing()})
 
 @login_required
 def open_order(request):
@@ -92,33 +102,15 @@ def open_order(request):
 
     if request.method == 'POST':
         form = OrderForm(request.POST)
-        if form.is_valid():
-            order = form.save(commit=False)
-            order.customer = customer
-            order.order_date = timezone.now()
-            order.total_amount = 0
-            order.save()
-
-            total = 0
-            for item in basket:
-                OrderItem.objects.create(
-                    order=order,
-                    knife=item['product'],
-                    quantity=item['count'],
-                    price=item['product'].price
-                )
-                total += item['count'] * item['product'].price
-
-            order.total_amount = total
-            order.save(update_fields=['total_amount'])
-
-            basket.clear()
+        if form.is_valid() and checkout_basket(basket, customer, form):
+            return redirect('user_orders')
 
     else:
         form = OrderForm(initial={
             'customer': customer.id,
             'status': 'new',
             'shipping_address': customer.address,
+            'checkout_token': uuid.uuid4(),
         })
 
-    return render(request, 'order/order_form.html', {'form_order': form})
\ No newline at end of file
+    return render(request, 'order/order_form.html', {'form_order': form, 'pricing': basket.pricing()})
\ No newline at end of file
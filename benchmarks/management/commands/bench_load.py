@@ -0,0 +1,296 @@
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+from benchmarks.scenarios import bench_user, summarize
+from dbpool import pool as dbpool
+from knifestore.models import Category, Knife
+
+MODES = ('wsgi', 'asgi')
+
+
+def default_paths(count=20):
+    """Страницы каталога и API по count ножей и категорий, равномерно по id"""
+    knife_ids = list(Knife.objects.order_by('pk').values_list('pk', flat=True))
+    category_ids = list(Category.objects.order_by('pk').values_list('pk', flat=True))
+    step = max(len(knife_ids) // count, 1)
+    paths = []
+    for number, knife_id in enumerate(knife_ids[::step][:count]):
+        paths += [
+            '/store/',
+            f'/knives/{knife_id}/',
+            f'/categories/{category_ids[number % len(category_ids)]}/',
+            '/api/knives/?format=json',
+            f'/api/knives/{knife_id}/?format=json',
+        ]
+    return paths
+
+
+def slow_database(latency):
+    """Задержка latency секунд на каждый SQL-запрос — сетевой RTT удалённой БД"""
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(latency)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(wrapper)
+
+    connection_created.connect(install, weak=False)
+    connection.close()
+
+
+def count_connects(latency=0.0):
+    """
+    Счётчик новых соединений с БД и задержка на каждое — установка
+    соединения с удалённым MySQL (TCP, TLS, аутентификация), которой у
+    локальной SQLite нет. Возвращает список-счётчик.
+    """
+    from django.db.backends.sqlite3.base import DatabaseWrapper
+
+    opened = [0]
+    original = DatabaseWrapper.get_new_connection
+
+    def get_new_connection(self, conn_params):
+        opened[0] += 1
+        if latency:
+            time.sleep(latency)
+        return original(self, conn_params)
+
+    DatabaseWrapper.get_new_connection = get_new_connection
+    return opened
+
+
+def run_wsgi(paths, cookie, threads):
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+
+    def request(path):
+        url = urlsplit(path)
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': url.path, 'QUERY_STRING': url.query,
+            'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': 'localhost', 'HTTP_COOKIE': cookie,
+            'wsgi.input': BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+            'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+        }
+        status = []
+        started = time.perf_counter()
+        body = application(environ, lambda code, headers: status.append(int(code[:3])))
+        try:
+            b''.join(body)
+        finally:
+            body.close()
+        return status[0], time.perf_counter() - started
+
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(request, paths[:threads]))  # прогрев
+        started = time.perf_counter()
+        results = list(executor.map(request, paths))
+    return results, time.perf_counter() - started
+
+
+def run_asgi(paths, cookie, concurrency):
+    from django.core.asgi import get_asgi_application
+
+    application = get_asgi_application()
+
+    async def request(path):
+        url = urlsplit(path)
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': url.path, 'raw_path': url.path.encode(),
+            'query_string': url.query.encode(), 'root_path': '',
+            'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode())],
+            'server': ('localhost', 80), 'client': ('127.0.0.1', 50000),
+        }
+        sent = False
+        disconnect = asyncio.Event()  # клиент не отключается до конца ответа
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        status = []
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+
+        started = time.perf_counter()
+        await application(scope, receive, send)
+        return status[0], time.perf_counter() - started
+
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited(path):
+            async with semaphore:
+                return await request(path)
+
+        await asyncio.gather(*[limited(path) for path in paths[:concurrency]])  # прогрев
+        started = time.perf_counter()
+        results = await asyncio.gather(*[limited(path) for path in paths])
+        return results, time.perf_counter() - started
+
+    return asyncio.run(run())
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузка на страницы каталога и чтение API: один и тот же набор запросов '
+        'через WSGI-обработчик в пуле потоков и через ASGI-обработчик (async-представления), '
+        'пропускная способность и задержки в JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=MODES, help='Внутренний: прогон одного режима в этом процессе')
+        parser.add_argument('--cookie', help='Внутренний: Cookie сессии бенчмарк-пользователя')
+        parser.add_argument('--servers', default=','.join(MODES),
+                            help='Обработчики через запятую: wsgi, asgi (по умолчанию оба)')
+        parser.add_argument('--db-modes', default=settings.DB_CONNECTION_MODE,
+                            help='Режимы соединений через запятую: request, persistent, pool')
+        parser.add_argument('--connect-latency-ms', type=float, default=0.0,
+                            help='Искусственная задержка установки соединения с БД, мс')
+        parser.add_argument('--requests', type=int, default=500, help='Число запросов на режим')
+        parser.add_argument('--concurrency', type=int, default=16,
+                            help='Одновременных запросов (потоков WSGI, задач ASGI)')
+        parser.add_argument('--db-latency-ms', type=float, default=0.0,
+                            help='Искусственная задержка каждого SQL-запроса, мс (удалённая БД)')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Путь запроса (можно несколько раз); по умолчанию каталог и /api/knives/')
+        parser.add_argument('--output', help='Записать JSON в файл, а не в stdout')
+
+    def handle(self, *args, mode=None, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Нагрузка идёт на копию SQLite-базы: DJANGO_SETTINGS_MODULE=benchmarks.settings')
+        if mode is not None:
+            result = self.run_mode(mode, options)
+            self.stdout.write(json.dumps(result))
+            return
+
+        source = connection.settings_dict['NAME']
+        if not os.path.exists(source):
+            raise CommandError(f'Нет базы {source}: выполните migrate и bench_seed')
+        with tempfile.TemporaryDirectory() as directory:
+            work = os.path.join(directory, 'bench.sqlite3')
+            shutil.copyfile(source, work)
+            # Вход пользователя обновляет last_login — тоже только в копии
+            connection.close()
+            connection.settings_dict['NAME'] = work
+            servers = [server for server in options['servers'].split(',') if server]
+            db_modes = [db_mode for db_mode in options['db_modes'].split(',') if db_mode]
+            unknown = set(servers) - set(MODES)
+            if unknown:
+                raise CommandError(f'Неизвестные обработчики: {", ".join(sorted(unknown))}')
+            try:
+                result = {
+                    'meta': {
+                        'requests': options['requests'],
+                        'concurrency': options['concurrency'],
+                        'db_latency_ms': options['db_latency_ms'],
+                        'connect_latency_ms': options['connect_latency_ms'],
+                    },
+                    'runs': {
+                        f'{server}/{db_mode}': self.spawn(server, db_mode, work, options)
+                        for db_mode in db_modes for server in servers
+                    },
+                }
+            finally:
+                connection.close()
+                connection.settings_dict['NAME'] = source
+        result['comparison'] = self.compare(result['runs'], servers, db_modes)
+
+        text = json.dumps(result, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(text + '\n')
+        else:
+            self.stdout.write(text)
+
+    def compare(self, runs, servers, db_modes):
+        """Отношения rps и p95: ASGI к WSGI при одном режиме соединений и режимы к первому"""
+        def ratio(run, base):
+            return {
+                'rps': round(run['rps'] / base['rps'], 3),
+                'p95': round(run['latency_ms']['p95'] / base['latency_ms']['p95'], 3),
+            }
+
+        comparison = {}
+        if set(MODES) <= set(servers):
+            for db_mode in db_modes:
+                comparison[f'asgi/{db_mode} vs wsgi/{db_mode}'] = ratio(runs[f'asgi/{db_mode}'], runs[f'wsgi/{db_mode}'])
+        for server in servers:
+            for db_mode in db_modes[1:]:
+                comparison[f'{server}/{db_mode} vs {server}/{db_modes[0]}'] = ratio(
+                    runs[f'{server}/{db_mode}'], runs[f'{server}/{db_modes[0]}'],
+                )
+        return comparison
+
+    def spawn(self, mode, db_mode, database, options):
+        """
+        Каждый прогон — в отдельном процессе: ASYNC_CATALOG_VIEWS читается при
+        загрузке URLconf, DB_CONNECTION_MODE — при загрузке настроек, а кэши и
+        соединения не должны переходить между прогонами.
+        """
+        from django.test import Client
+
+        client = Client()
+        client.force_login(bench_user())
+        cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        command = [
+            sys.executable, str(settings.BASE_DIR / 'manage.py'), 'bench_load', '--mode', mode, '--cookie', cookie,
+            '--requests', str(options['requests']), '--concurrency', str(options['concurrency']),
+            '--db-latency-ms', str(options['db_latency_ms']),
+            '--connect-latency-ms', str(options['connect_latency_ms']),
+        ]
+        for path in options['paths'] or ():
+            command += ['--path', path]
+        env = dict(
+            os.environ, BENCH_DB=database, BENCH_ASYNC='1' if mode == 'asgi' else '0', DB_CONNECTION_MODE=db_mode,
+        )
+        completed = subprocess.run(command, env=env, capture_output=True, text=True)
+        if completed.returncode:
+            raise CommandError(f'Прогон {mode}/{db_mode} завершился ошибкой:\n{completed.stderr}')
+        return json.loads(completed.stdout)
+
+    def run_mode(self, mode, options):
+        if mode == 'asgi' and not settings.ASYNC_CATALOG_VIEWS:
+            raise CommandError('Режим asgi требует BENCH_ASYNC=1')
+        if options['db_latency_ms']:
+            slow_database(options['db_latency_ms'] / 1000)
+        opened = count_connects(options['connect_latency_ms'] / 1000)
+        paths = options['paths'] or default_paths()
+        paths = [paths[number % len(paths)] for number in range(options['requests'])]
+        connection.close()
+
+        run = run_asgi if mode == 'asgi' else run_wsgi
+        results, elapsed = run(paths, options['cookie'] or '', options['concurrency'])
+        statuses = {}
+        for status, _ in results:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        return {
+            'rps': round(len(results) / elapsed, 1),
+            'latency_ms': summarize([duration for _, duration in results]),
+            'statuses': statuses,
+            'connections_opened': opened[0],
+            'pools': dbpool.stats(),
+        }
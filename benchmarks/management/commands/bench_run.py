@@ -0,0 +1,104 @@
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from benchmarks.scenarios import SCENARIOS, run_scenario
+from knifestore.models import Knife, OrderItem
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогнать сценарии бенчмарков на копии базы BENCH_DB и вывести JSON '
+        '(время и число SQL-запросов по сценариям)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*', help=f'Сценарии (по умолчанию все): {", ".join(SCENARIOS)}')
+        parser.add_argument('--repeat', type=int, help='Число замеров вместо значения сценария')
+        parser.add_argument('--output', help='Записать JSON в файл, а не в stdout')
+        parser.add_argument('--compare', help='JSON прошлого прогона: вывести изменение медианы')
+
+    def handle(self, *args, scenarios=(), repeat=None, output=None, compare=None, **options):
+        unknown = [name for name in scenarios if name not in SCENARIOS]
+        if unknown:
+            raise CommandError(f'Неизвестные сценарии: {", ".join(unknown)}')
+        if connection.vendor != 'sqlite':
+            raise CommandError('Бенчмарки работают с копией SQLite-базы: DJANGO_SETTINGS_MODULE=benchmarks.settings')
+
+        source = connection.settings_dict['NAME']
+        if not os.path.exists(source):
+            raise CommandError(f'Нет базы {source}: выполните migrate и bench_seed')
+        with tempfile.TemporaryDirectory() as directory:
+            # Сценарии пишут (оформление заказа) — каждый запуск начинается с одинаковой копии
+            connection.close()
+            work = os.path.join(directory, 'bench.sqlite3')
+            shutil.copyfile(source, work)
+            connection.settings_dict['NAME'] = work
+            try:
+                result = self.run_all(scenarios or list(SCENARIOS), repeat)
+            finally:
+                connection.close()
+                connection.settings_dict['NAME'] = source
+
+        text = json.dumps(result, ensure_ascii=False, indent=2)
+        if output:
+            with open(output, 'w', encoding='utf-8') as file:
+                file.write(text + '\n')
+            self.stderr.write(f'Результаты записаны в {output}')
+        else:
+            self.stdout.write(text)
+        if compare:
+            self.compare(compare, result)
+
+    def run_all(self, names, repeat):
+        result = {
+            'meta': {
+                'commit': git_commit(),
+                'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'sqlite': connection.Database.sqlite_version,
+                'knives': Knife.objects.count(),
+                'order_items': OrderItem.objects.count(),
+            },
+            'scenarios': {},
+        }
+        for name in names:
+            self.stderr.write(f'{name}...')
+            result['scenarios'][name] = run_scenario(SCENARIOS[name], repeat)
+        return result
+
+    def compare(self, path, result):
+        with open(path, encoding='utf-8') as file:
+            baseline = json.load(file)
+        self.stderr.write(f'Сравнение с {baseline["meta"].get("commit")} (медиана, мс; запросы):')
+        for name, current in result['scenarios'].items():
+            old = baseline['scenarios'].get(name)
+            if old is None:
+                self.stderr.write(f'  {name:<24} новый сценарий')
+                continue
+            before, after = old['wall_ms']['median'], current['wall_ms']['median']
+            change = (after - before) / before * 100 if before else 0
+            self.stderr.write(
+                f'  {name:<24} {before:>9.2f} -> {after:>9.2f}  {change:+6.1f}%   '
+                f'SQL {old["queries"]["max"]} -> {current["queries"]["max"]}'
+            )
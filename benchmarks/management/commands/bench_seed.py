@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.seed import Seeder
+from knifestore.models import Knife
+
+
+class Command(BaseCommand):
+    help = 'Заполнить базу бенчмарков детерминированными данными (по умолчанию 100k ножей, 1M позиций)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--knives', type=int, default=100_000)
+        parser.add_argument('--order-items', type=int, default=1_000_000)
+        parser.add_argument('--customers', type=int, default=5_000)
+        parser.add_argument('--seed', type=int, default=1, help='Зерно генератора: одинаковое зерно — одинаковые данные')
+
+    def handle(self, *args, knives, order_items, customers, seed, **options):
+        if Knife.objects.exists():
+            raise CommandError('База не пуста. Бенчмарки сидируются в свежую базу (BENCH_DB) после migrate.')
+        Seeder(knives, order_items, customers, seed, log=self.stdout.write).run()
@@ -0,0 +1,253 @@
+import statistics
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from basket.basket import Basket
+from basket.models import BasketLine, Promotion, StoredBasket
+from basket.pricing import price_basket
+from knifestore.models import Brand, Category, Knife, Stock
+from knifestore.pagination import encode_cursor
+
+SCENARIOS = {}
+
+
+def scenario(name, repeat=20):
+    """Регистрирует класс сценария под именем name"""
+    def register(cls):
+        cls.name = name
+        cls.repeat = repeat
+        SCENARIOS[name] = cls
+        return cls
+    return register
+
+
+class Scenario:
+    """
+    prepare() — один раз перед замерами, reset() — перед каждым прогоном
+    (вне замера), run() — замеряемая часть. Кэш очищается перед каждым
+    прогоном: меряется путь без попаданий в кэш страниц и фрагментов.
+    """
+    expected_status = 200
+
+    def prepare(self):
+        pass
+
+    def reset(self, iteration):
+        pass
+
+    def run(self, iteration):
+        raise NotImplementedError
+
+    def check(self, response):
+        if response.status_code != self.expected_status:
+            raise AssertionError(f'{self.name}: ответ {response.status_code}, ожидался {self.expected_status}')
+
+
+def bench_user():
+    return User.objects.get(username='bench')
+
+
+def deep_knife(ordering, fraction=0.9):
+    """Нож на глубине fraction каталога в порядке ordering (для курсора глубокой страницы)"""
+    position = int(Knife.objects.count() * fraction)
+    return Knife.objects.order_by(*ordering).only(*[name.lstrip('-') for name in ordering])[position]
+
+
+class KnifeListDeep(Scenario):
+    ordering = ('title', 'id')
+    sort = 'title'
+
+    def prepare(self):
+        self.client = Client()
+        knife = deep_knife(self.ordering)
+        cursor = encode_cursor({
+            'o': list(self.ordering), 'd': 'n',
+            'k': [str(getattr(knife, name.lstrip('-'))) for name in self.ordering],
+        })
+        self.url = f'/knife_list/?sort={self.sort}&cursor={cursor}'
+
+    def run(self, iteration):
+        self.check(self.client.get(self.url))
+
+
+@scenario('knife_list_deep_title')
+class KnifeListDeepTitle(KnifeListDeep):
+    pass
+
+
+@scenario('knife_list_deep_price')
+class KnifeListDeepPrice(KnifeListDeep):
+    ordering = ('-price', '-id')
+    sort = '-price'
+
+
+@scenario('knife_detail', repeat=50)
+class KnifeDetail(Scenario):
+    def prepare(self):
+        self.client = Client()
+        self.ids = list(Knife.objects.order_by('?').values_list('pk', flat=True)[:self.repeat])
+
+    def run(self, iteration):
+        self.check(self.client.get(f'/knives/{self.ids[iteration % len(self.ids)]}/'))
+
+
+@scenario('basket_iter_50', repeat=50)
+class BasketIter50(Scenario):
+    def prepare(self):
+        # Хранилище не нужно: меряется только Basket.__iter__ по готовым строкам
+        self.basket = Basket.__new__(Basket)
+        self.basket.basket = {
+            str(pk): {'count': 1 + pk % 3, 'price': str(price)}
+            for pk, price in Knife.objects.order_by('?').values_list('pk', 'price')[:50]
+        }
+
+    def reset(self, iteration):
+        self.basket._pricing = None
+
+    def run(self, iteration):
+        items = list(self.basket)
+        if len(items) != 50:
+            raise AssertionError(f'{self.name}: {len(items)} строк вместо 50')
+
+
+def bench_promotions():
+    """Акции всех видов для сценариев цен; создаются один раз, по имени"""
+    brand = Brand.objects.order_by('pk').first()
+    category = Category.objects.order_by('pk').first()
+    rules = [
+        {'name': 'bench: бренд −10%', 'kind': Promotion.PERCENT, 'value': Decimal('10'), 'brand': brand},
+        {'name': 'bench: категория −150 ₽', 'kind': Promotion.FIXED, 'value': Decimal('150'), 'category': category},
+        {'name': 'bench: 3 по цене 2', 'kind': Promotion.N_FOR_M, 'buy_count': 3, 'pay_count': 2},
+        {'name': 'bench: −5% от 50 000 ₽', 'kind': Promotion.BASKET_PERCENT, 'value': Decimal('5'),
+         'threshold': Decimal('50000')},
+    ]
+    for rule in rules:
+        Promotion.objects.get_or_create(name=rule.pop('name'), defaults=rule)
+
+
+@scenario('basket_pricing_100', repeat=50)
+class BasketPricing100(Scenario):
+    """Расчёт корзины из 100 позиций с акциями без кэша расчётов: один запрос к ножам и складу"""
+    lines = 100
+
+    def prepare(self):
+        bench_promotions()
+        self.basket = {
+            str(pk): {'count': 1 + pk % 4, 'price': str(price)}
+            for pk, price in Knife.objects.order_by('?').values_list('pk', 'price')[:self.lines]
+        }
+
+    def run(self, iteration):
+        priced = price_basket(self.basket)
+        if len(priced.lines) != self.lines:
+            raise AssertionError(f'{self.name}: {len(priced.lines)} строк вместо {self.lines}')
+
+
+@scenario('basket_pricing_100_cached', repeat=50)
+class BasketPricing100Cached(BasketPricing100):
+    """Та же корзина повторно: попадание в кэш по версии корзины, без SQL"""
+
+    def reset(self, iteration):
+        price_basket(self.basket)
+
+
+@scenario('checkout_open_order')
+class CheckoutOpenOrder(Scenario):
+    expected_status = 302
+    lines = 5
+
+    def prepare(self):
+        self.user = bench_user()
+        self.customer = self.user.customer
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.stocked = list(
+            Stock.objects.filter(quantity__gte=100).order_by('knife_id')
+            .values_list('knife_id', flat=True)[:self.lines * self.repeat * 2]
+        )
+        self.prices = dict(Knife.objects.filter(pk__in=self.stocked).values_list('pk', 'price'))
+
+    def reset(self, iteration):
+        basket, _ = StoredBasket.objects.get_or_create(user=self.user)
+        BasketLine.objects.filter(basket=basket).delete()
+        start = iteration * self.lines % max(len(self.stocked) - self.lines, 1)
+        BasketLine.objects.bulk_create([
+            BasketLine(basket=basket, knife_id=knife_id, count=1, price=Decimal(self.prices[knife_id]))
+            for knife_id in self.stocked[start:start + self.lines]
+        ])
+
+    def run(self, iteration):
+        self.check(self.client.post('/basket/create_order/', {
+            'customer': self.customer.pk,
+            'status': 'new',
+            'shipping_address': 'г. Москва, ул. Бенчмарк, 1',
+            'checkout_token': str(uuid.uuid4()),
+        }))
+
+
+@scenario('api_knives_list')
+class ApiKnivesList(Scenario):
+    url = '/api/knives/?format=json'
+
+    def prepare(self):
+        self.client = Client()
+        self.client.force_login(bench_user())
+
+    def run(self, iteration):
+        self.check(self.client.get(self.url))
+
+
+@scenario('api_knives_list_deep')
+class ApiKnivesListDeep(ApiKnivesList):
+    def prepare(self):
+        super().prepare()
+        # OFFSET-пагинация: последняя десятая часть каталога
+        self.url = f'/api/knives/?format=json&page={int(Knife.objects.count() * 0.9) // 20}'
+
+
+def summarize(timings):
+    timings = sorted(timings)
+    return {
+        'min': round(timings[0] * 1000, 3),
+        'median': round(statistics.median(timings) * 1000, 3),
+        'p95': round(timings[min(int(len(timings) * 0.95), len(timings) - 1)] * 1000, 3),
+        'mean': round(statistics.fmean(timings) * 1000, 3),
+    }
+
+
+def run_scenario(cls, repeat=None, warmup=2):
+    """
+    Прогнать сценарий: warmup прогонов без учёта, затем repeat замеров.
+
+    Возвращает {'repeat', 'wall_ms': {min, median, p95, mean}, 'queries': {min, max}}.
+    Запросы считаются CaptureQueriesContext — его накладные расходы одинаковы
+    во всех прогонах и коммитах, поэтому числа сравнимы между собой.
+    """
+    instance = cls()
+    repeat = repeat or cls.repeat
+    instance.repeat = repeat
+    instance.prepare()
+    cache = caches['default']
+    timings, queries = [], []
+    for iteration in range(warmup + repeat):
+        cache.clear()
+        instance.reset(iteration)
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            instance.run(iteration)
+            elapsed = time.perf_counter() - started
+        if iteration >= warmup:
+            timings.append(elapsed)
+            queries.append(len(captured))
+    return {
+        'repeat': repeat,
+        'wall_ms': summarize(timings),
+        'queries': {'min': min(queries), 'max': max(queries)},
+    }
@@ -0,0 +1,202 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from analytics.rollups import rebuild
+from knifestore import aggregates
+from knifestore.models import (
+    Brand, Category, Customer, Knife, Order, OrderItem, Series, Stock, StockMovement,
+)
+from knifestore.search import index_knives
+
+CATEGORIES = [
+    'Шефские', 'Сантоку', 'Овощные', 'Хлебные', 'Филейные', 'Тяпки', 'Универсальные', 'Гюто',
+    'Накири', 'Петти', 'Янагиба', 'Деба', 'Обвалочные', 'Томатные', 'Сырные', 'Стейковые',
+    'Наборы', 'Туристические', 'Складные', 'Подарочные',
+]
+COUNTRIES = ['Япония', 'Германия', 'Россия', 'США', 'Франция', 'Китай', 'Италия', 'Швеция']
+STEELS = ['VG-10', 'AUS-8', 'AUS-10', 'X50CrMoV15', 'SG2', 'Aogami #2', 'Shirogami #1', '440C', 'D2', 'M390']
+HANDLES = ['микарта', 'дерево', 'пластик', 'G10', 'карбон', 'сталь', 'пакка', 'кость']
+ADJECTIVES = [
+    'Классик', 'Про', 'Мастер', 'Экспресс', 'Урбан', 'Нордик', 'Самурай', 'Шеф', 'Ультра', 'Гранд',
+    'Оникс', 'Титан', 'Вектор', 'Кайдзен', 'Сакура', 'Фьорд', 'Алмаз', 'Бриз', 'Гефест', 'Дамаск',
+]
+FIRST_NAMES = ['Иван', 'Пётр', 'Анна', 'Мария', 'Кэндзи', 'Хироси', 'Ханс', 'Клаус', 'Жан', 'Люка']
+LAST_NAMES = [
+    'Соколов', 'Морозов', 'Танака', 'Ямада', 'Мюллер', 'Шмидт', 'Дюпон', 'Росси', 'Линд', 'Берг',
+    'Волков', 'Като', 'Вебер', 'Мартен', 'Бьянки', 'Нильсен', 'Орлов', 'Сато', 'Фишер', 'Лоран',
+]
+WORDS = (
+    'острый баланс рукоять клинок заточка сталь кухня профессиональный лёгкий прочный '
+    'нарезка мясо рыба овощи хлеб ручная ковка полировка гарантия подарок уход'
+).split()
+STATUS_WEIGHTS = [('new', 10), ('processing', 10), ('shipped', 15), ('delivered', 60), ('cancelled', 5)]
+
+
+class Seeder:
+    """
+    Детерминированный генератор каталога и истории заказов.
+
+    Всё пишется bulk_create в обход сигналов, поэтому в конце явно строятся
+    производные данные: поисковый индекс, агрегаты брендов и категорий,
+    журнал склада и сводки продаж — как после обычной работы магазина.
+    """
+
+    def __init__(self, knives=100_000, order_items=1_000_000, customers=5_000, seed=1, log=print):
+        self.knives = knives
+        self.order_items = order_items
+        self.customers = customers
+        self.random = random.Random(seed)
+        self.log = log
+        self.started = time.monotonic()
+
+    def step(self, message):
+        self.log(f'[{time.monotonic() - self.started:7.1f} с] {message}')
+
+    def run(self):
+        with transaction.atomic():
+            category_ids = self.seed_categories()
+            brands = self.seed_brands()
+            series_ids = self.seed_series()
+            knife_prices = self.seed_knives(category_ids, brands, series_ids)
+            self.seed_stock(list(knife_prices))
+            customer_ids = self.seed_customers()
+            self.seed_orders(customer_ids, knife_prices)
+        self.build_derived(list(knife_prices))
+        self.step('Готово')
+
+    def seed_categories(self):
+        categories = Category.objects.bulk_create(
+            [Category(name=name, description=f'Категория «{name}»') for name in CATEGORIES]
+        )
+        return [category.pk for category in categories]
+
+    def seed_brands(self):
+        brands = Brand.objects.bulk_create([
+            Brand(name=f'{self.random.choice(LAST_NAMES)} {number:02d}', country=self.random.choice(COUNTRIES),
+                  founded=self.random.randint(1850, 2020))
+            for number in range(60)
+        ])
+        return [(brand.pk, brand.name, brand.country) for brand in brands]
+
+    def seed_series(self):
+        series = Series.objects.bulk_create([
+            Series(first_name=first, last_name=last, country=self.random.choice(COUNTRIES))
+            for first in FIRST_NAMES for last in LAST_NAMES
+        ])
+        return [item.pk for item in series]
+
+    def price(self):
+        # Логнормальное распределение: много ножей до 5 тыс., длинный хвост до 50 тыс.
+        value = min(max(self.random.lognormvariate(8.3, 0.8), 300), 99_999)
+        return Decimal(int(value)).quantize(Decimal('1.00'))
+
+    def seed_knives(self, category_ids, brands, series_ids):
+        purposes = [code for code, _ in Knife.PURPOSE_CHOICES]
+        first_day = date(2000, 1, 1)
+        knives = []
+        for number in range(self.knives):
+            brand_id, brand_name, country = self.random.choice(brands)
+            purpose = self.random.choice(purposes)
+            knives.append(Knife(
+                title=f'{brand_name} {self.random.choice(ADJECTIVES)} {purpose.title()} {number:06d}',
+                description=' '.join(self.random.choices(WORDS, k=self.random.randint(12, 40))),
+                category_id=self.random.choice(category_ids),
+                publisher_id=brand_id,
+                min_players=1,
+                max_players=self.random.randint(1, 10),
+                play_time=self.random.randint(10, 120),
+                age_rating=self.random.randint(12, 18),
+                release_date=first_day + timedelta(days=self.random.randint(0, 9000)),
+                price=self.price(),
+                steel=self.random.choice(STEELS),
+                blade_length_mm=self.random.randint(80, 300),
+                purpose=purpose,
+                edge_angle_deg=self.random.randint(12, 20),
+                handle_material=self.random.choice(HANDLES),
+                manufacturer_country=country,
+            ))
+        knives = Knife.objects.bulk_create(knives, batch_size=2000)
+        self.step(f'Ножей: {len(knives)}')
+
+        through = Knife.designers.through
+        through.objects.bulk_create(
+            [through(knife_id=knife.pk, series_id=series_id)
+             for knife in knives
+             for series_id in self.random.sample(series_ids, self.random.randint(1, 2))],
+            batch_size=5000,
+        )
+        return {knife.pk: knife.price for knife in knives}
+
+    def seed_stock(self, knife_ids):
+        stocks, movements = [], []
+        for knife_id in knife_ids:
+            if self.random.random() < 0.1:
+                continue  # Часть каталога складом не учитывается
+            quantity = self.random.randint(0, 200)
+            stocks.append(Stock(knife_id=knife_id, quantity=quantity))
+            if quantity:
+                movements.append(StockMovement(
+                    knife_id=knife_id, kind=StockMovement.ADJUSTMENT, delta=quantity,
+                    balance_after=quantity, note='Начальный остаток',
+                ))
+        Stock.objects.bulk_create(stocks, batch_size=5000)
+        StockMovement.objects.bulk_create(movements, batch_size=5000)
+        self.step(f'Записей склада: {len(stocks)}')
+
+    def seed_customers(self):
+        users = User.objects.bulk_create(
+            [User(username=f'bench-customer-{number:05d}') for number in range(self.customers)], batch_size=2000,
+        )
+        customers = Customer.objects.bulk_create(
+            [Customer(user=user, phone=f'+7900{number:07d}', address=f'г. Москва, ул. Тестовая, {number}')
+             for number, user in enumerate(users)],
+            batch_size=2000,
+        )
+        # Пользователь сценариев бенчмарка (оформление, API)
+        bench = User.objects.create_superuser('bench', 'bench@example.com', 'bench')
+        Customer.objects.create(user=bench, address='г. Москва, ул. Бенчмарк, 1')
+        return [customer.pk for customer in customers]
+
+    def seed_orders(self, customer_ids, knife_prices):
+        statuses = [status for status, _ in STATUS_WEIGHTS]
+        weights = [weight for _, weight in STATUS_WEIGHTS]
+        knife_ids = list(knife_prices)
+        written = 0
+        while written < self.order_items:
+            # Пачками по ~50 тыс. позиций, чтобы не держать миллион объектов в памяти
+            lines, pending = [], 0
+            while pending < 50_000 and written + pending < self.order_items:
+                size = min(self.random.randint(1, 7), self.order_items - written - pending)
+                lines.append([(self.random.choice(knife_ids), self.random.randint(1, 3)) for _ in range(size)])
+                pending += size
+            orders = Order.objects.bulk_create([
+                Order(
+                    customer_id=self.random.choice(customer_ids),
+                    status=self.random.choices(statuses, weights)[0],
+                    shipping_address='г. Москва',
+                    total_amount=sum(knife_prices[knife_id] * count for knife_id, count in order_lines),
+                )
+                for order_lines in lines
+            ], batch_size=5000)
+            items = [
+                OrderItem(order_id=order.pk, knife_id=knife_id, quantity=count, price=knife_prices[knife_id])
+                for order, order_lines in zip(orders, lines)
+                for knife_id, count in order_lines
+            ]
+            OrderItem.objects.bulk_create(items, batch_size=5000)
+            written += len(items)
+            self.step(f'Позиций заказов: {written}')
+
+    def build_derived(self, knife_ids):
+        for start in range(0, len(knife_ids), 5000):
+            index_knives(knife_ids[start:start + 5000], batch_size=5000)
+        self.step('Поисковый индекс построен')
+        aggregates.refresh(Category, Category.objects.values_list('pk', flat=True))
+        aggregates.refresh(Brand, Brand.objects.values_list('pk', flat=True))
+        rebuild()
+        self.step('Агрегаты каталога и сводки продаж пересчитаны')
@@ -0,0 +1,52 @@
+"""
+Настройки для бенчмарков: on-disk SQLite вместо MySQL, без замеров monitoring.
+
+    DJANGO_SETTINGS_MODULE=benchmarks.settings python manage.py migrate
+    DJANGO_SETTINGS_MODULE=benchmarks.settings python manage.py bench_seed
+    DJANGO_SETTINGS_MODULE=benchmarks.settings python manage.py bench_run --output bench.json
+    DJANGO_SETTINGS_MODULE=benchmarks.settings python manage.py bench_load --db-latency-ms 2
+    DJANGO_SETTINGS_MODULE=benchmarks.settings python manage.py bench_load --db-modes request,persistent,pool --connect-latency-ms 5
+
+Путь к базе — BENCH_DB (по умолчанию benchmarks/bench.sqlite3). BENCH_REPLICA_DB —
+вторая SQLite-база (копия первой) в роли реплики для чтения (replicas).
+"""
+import os
+
+from myproject.settings import *  # noqa: F401,F403
+from myproject.settings import BASE_DIR, DB_CONNECTION_MODE, INSTALLED_APPS, TEMPLATES, connection_settings
+
+INSTALLED_APPS = INSTALLED_APPS + ['benchmarks']
+
+# Режим соединений — как в myproject.settings (DB_CONNECTION_MODE), поверх SQLite
+DATABASES = {
+    'default': connection_settings({
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('BENCH_DB', str(BASE_DIR / 'benchmarks' / 'bench.sqlite3')),
+    }, DB_CONNECTION_MODE),
+}
+REPLICA_DATABASES = []
+if os.environ.get('BENCH_REPLICA_DB'):
+    DATABASES['replica1'] = connection_settings({
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['BENCH_REPLICA_DB'],
+    }, DB_CONNECTION_MODE)
+    REPLICA_DATABASES = ['replica1']
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bench',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }
+}
+
+DEBUG = False
+TEMPLATES = [dict(TEMPLATES[0], OPTIONS=dict(TEMPLATES[0]['OPTIONS'], debug=DEBUG))]
+ALLOWED_HOSTS = ['testserver', 'localhost']
+# Быстрый хэшер: вход бенчмарк-пользователя не должен мерить PBKDF2
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+PERF_ENABLED = False
+QUERY_BUDGET_ENFORCE = False
+IMAGE_PIPELINE_ASYNC = False
+# bench_load: процесс ASGI-прогона включает async-представления каталога
+ASYNC_CATALOG_VIEWS = os.environ.get('BENCH_ASYNC') == '1'
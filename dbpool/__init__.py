@@ -0,0 +1,7 @@
+"""
+Пул соединений с БД для ASGI и пакетных воркеров.
+
+Подключается ENGINE = 'dbpool.backends.mysql' (или 'dbpool.backends.sqlite3'
+для разработки и бенчмарков) и ключом POOL в DATABASES; см.
+DB_CONNECTION_MODE в настройках.
+"""
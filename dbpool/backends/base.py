@@ -0,0 +1,70 @@
+from ..pool import ConnectionPool, get_pool
+
+POOL_DEFAULTS = {
+    'SIZE': 10,
+    'MAX_OVERFLOW': 5,
+    'TIMEOUT': 10.0,
+    'RECYCLE': 3600,
+    'PING_AFTER': 30.0,
+}
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    DatabaseWrapper, который берёт соединения из пула процесса и возвращает
+    их туда вместо закрытия.
+
+    Django «закрывает» соединение в конце запроса (CONN_MAX_AGE = 0) и в
+    close_old_connections() — здесь это возврат в пул, поэтому у каждого
+    потока, в том числе короткоживущих потоков ASGI, соединение занято только
+    на время запроса. Соединение, закрытое посреди транзакции или после
+    ошибки, в пул не возвращается.
+    """
+
+    def pool_settings(self):
+        return {**POOL_DEFAULTS, **self.settings_dict.get('POOL', {})}
+
+    @property
+    def pool(self):
+        return get_pool((self.alias, str(self.settings_dict['NAME'])), self.create_pool)
+
+    def create_pool(self):
+        options = self.pool_settings()
+        params = self.get_connection_params()
+        connect = super().get_new_connection
+        return ConnectionPool(
+            connect=lambda: connect(params),
+            ping=self.ping_connection,
+            close=lambda raw: raw.close(),
+            size=options['SIZE'],
+            max_overflow=options['MAX_OVERFLOW'],
+            timeout=options['TIMEOUT'],
+            recycle=options['RECYCLE'],
+            ping_after=options['PING_AFTER'],
+        )
+
+    def ping_connection(self, raw):
+        cursor = raw.cursor()
+        try:
+            cursor.execute('SELECT 1')
+            cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def get_new_connection(self, conn_params):
+        return self.pool.acquire()
+
+    def _close(self):
+        if self.connection is None:
+            return
+        raw = self.connection
+        reusable = not self.in_atomic_block and not (self.errors_occurred and not self.is_usable())
+        if reusable and not self.get_autocommit():
+            # Незавершённая транзакция не должна достаться следующему запросу;
+            # autocommit из настроек восстановит connect() при следующей выдаче
+            try:
+                raw.rollback()
+            except Exception:
+                reusable = False
+        with self.wrap_database_errors:
+            self.pool.release(raw, reusable=reusable)
@@ -0,0 +1,9 @@
+from django.db.backends.mysql import base
+
+from ..base import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    def ping_connection(self, raw):
+        # COM_PING без SQL; не переподключается сам — мёртвое соединение пул закроет
+        raw.ping()
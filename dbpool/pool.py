@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+from collections import deque
+
+from django.db import DatabaseError
+
+
+class PoolTimeout(DatabaseError):
+    """Свободное соединение не появилось за TIMEOUT секунд"""
+
+
+class PooledConnection:
+    __slots__ = ('raw', 'created_at', 'released_at')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.created_at = self.released_at = time.monotonic()
+
+
+class ConnectionPool:
+    """
+    Ограниченный пул DB-API соединений одного процесса.
+
+    Открыто не больше size + max_overflow соединений; сверх size они
+    закрываются при возврате. Если все заняты, acquire() ждёт до timeout
+    секунд и бросает PoolTimeout. Соединение старше recycle секунд
+    пересоздаётся, простоявшее дольше ping_after — проверяется ping() перед
+    выдачей (после перезапуска БД или wait_timeout MySQL пул не раздаёт
+    мёртвые соединения).
+    """
+
+    def __init__(self, connect, ping, close, size=10, max_overflow=0, timeout=10.0,
+                 recycle=3600, ping_after=30.0):
+        self.connect = connect
+        self.ping = ping
+        self.close = close
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+        self.pid = os.getpid()
+        self.idle = deque()
+        self.in_use = {}
+        self.opened = 0
+        self.lock = threading.Condition()
+        self.counters = {
+            'checkouts': 0, 'waits': 0, 'wait_time_ms': 0.0, 'timeouts': 0,
+            'created': 0, 'closed': 0, 'recycled': 0, 'failed_pings': 0,
+        }
+
+    @property
+    def limit(self):
+        return self.size + self.max_overflow
+
+    def acquire(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        with self.lock:
+            while not self.idle and self.opened >= self.limit:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.counters['timeouts'] += 1
+                    raise PoolTimeout(
+                        f'Нет свободного соединения за {self.timeout} с (открыто {self.opened} из {self.limit})'
+                    )
+                waited = True
+                self.lock.wait(remaining)
+            if waited:
+                self.counters['waits'] += 1
+                self.counters['wait_time_ms'] += (time.monotonic() - started) * 1000
+            self.counters['checkouts'] += 1
+            pooled = self.idle.pop() if self.idle else None
+            if pooled is None:
+                self.opened += 1
+        # Проверка и подключение — вне блокировки: они ходят в сеть
+        if pooled is not None:
+            pooled = self.check(pooled)
+        if pooled is None:
+            try:
+                pooled = PooledConnection(self.connect())
+            except BaseException:
+                with self.lock:
+                    self.opened -= 1
+                    self.lock.notify()
+                raise
+            with self.lock:
+                self.counters['created'] += 1
+        with self.lock:
+            self.in_use[id(pooled.raw)] = pooled
+        return pooled.raw
+
+    def check(self, pooled):
+        """Годное соединение или None (закрыто, место под новое остаётся за вызывающим)"""
+        now = time.monotonic()
+        reason = None
+        if self.recycle is not None and now - pooled.created_at >= self.recycle:
+            reason = 'recycled'
+        elif self.ping_after is not None and now - pooled.released_at >= self.ping_after:
+            try:
+                self.ping(pooled.raw)
+            except Exception:
+                reason = 'failed_pings'
+        if reason is None:
+            return pooled
+        self.discard(pooled.raw)
+        with self.lock:
+            self.counters[reason] += 1
+        return None
+
+    def release(self, raw, reusable=True):
+        with self.lock:
+            pooled = self.in_use.pop(id(raw), None)
+            if pooled is not None and reusable and self.opened <= self.size:
+                pooled.released_at = time.monotonic()
+                self.idle.append(pooled)
+                self.lock.notify()
+                return
+            self.opened -= 1
+            self.counters['closed'] += 1
+            self.lock.notify()
+        self.discard(raw)
+
+    def discard(self, raw):
+        try:
+            self.close(raw)
+        except Exception:
+            pass
+
+    def dispose(self):
+        with self.lock:
+            idle, self.idle = list(self.idle), deque()
+            self.opened -= len(idle)
+            self.counters['closed'] += len(idle)
+        for pooled in idle:
+            self.discard(pooled.raw)
+
+    def stats(self):
+        with self.lock:
+            return dict(
+                self.counters,
+                wait_time_ms=round(self.counters['wait_time_ms'], 1),
+                size=self.size,
+                max_overflow=self.max_overflow,
+                open=self.opened,
+                idle=len(self.idle),
+                in_use=len(self.in_use),
+            )
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, factory):
+    """Пул процесса по ключу (алиас, база); после fork пулы родителя не используются"""
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[key] = factory()
+        return pool
+
+
+def stats():
+    """{'алиас:база': счётчики} — пулы текущего процесса"""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {f'{alias}:{name}': pool.stats() for (alias, name), pool in pools.items() if pool.pid == os.getpid()}
+
+
+def dispose_all():
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.dispose()
@@ -0,0 +1,144 @@
+"""
+Пул соединений: сам ConnectionPool на поддельных соединениях и
+DatabaseWrapper dbpool.backends.sqlite3 на файле SQLite во временном
+каталоге (in-memory база пулом не обслуживается).
+"""
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.db import connections
+from django.db.backends.sqlite3 import base as sqlite_base
+from django.test import SimpleTestCase
+
+from .backends.sqlite3.base import DatabaseWrapper as PooledDatabaseWrapper
+from .pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.alive = True
+
+    def close(self):
+        self.closed = True
+
+
+def ping(raw):
+    if not raw.alive:
+        raise OSError('Соединение разорвано')
+
+
+def make_pool(**kwargs):
+    return ConnectionPool(connect=FakeConnection, ping=ping, close=FakeConnection.close, **kwargs)
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def test_timeout_when_exhausted(self):
+        pool = make_pool(size=1, max_overflow=0, timeout=0.05)
+        raw = pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+        pool.release(raw)
+        self.assertIs(pool.acquire(), raw)
+
+    def test_overflow_closed_on_release(self):
+        pool = make_pool(size=1, max_overflow=1, timeout=0.01)
+        first, overflow = pool.acquire(), pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        pool.release(overflow)
+        self.assertTrue(overflow.closed)
+        pool.release(first)
+        self.assertFalse(first.closed)
+        stats = pool.stats()
+        self.assertEqual((stats['open'], stats['idle'], stats['closed']), (1, 1, 1))
+
+    def test_failed_ping_replaces_connection(self):
+        pool = make_pool(size=1, ping_after=0)
+        dead = pool.acquire()
+        pool.release(dead)
+        dead.alive = False
+
+        fresh = pool.acquire()
+        self.assertIsNot(fresh, dead)
+        self.assertTrue(dead.closed)
+        stats = pool.stats()
+        self.assertEqual((stats['failed_pings'], stats['created'], stats['open']), (1, 2, 1))
+
+
+class PooledBackendTests(SimpleTestCase):
+    """Соединения Django-обёртки: возврат в пул вместо закрытия"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.settings_dict = dict(
+            connections['default'].settings_dict,
+            ENGINE='dbpool.backends.sqlite3',
+            NAME=str(Path(directory) / 'pool.sqlite3'),
+            CONN_MAX_AGE=0,
+            POOL={'SIZE': 2, 'MAX_OVERFLOW': 0, 'TIMEOUT': 1.0},
+        )
+
+    def make_wrapper(self, wrapper_class=PooledDatabaseWrapper):
+        # Свой алиас на тест — свой пул процесса
+        wrapper = wrapper_class(self.settings_dict, alias=f'pool_{self._testMethodName}')
+        self.addCleanup(wrapper.close)
+        if wrapper_class is PooledDatabaseWrapper:
+            self.addCleanup(wrapper.pool.dispose)
+        return wrapper
+
+    def query(self, wrapper):
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            return cursor.fetchone()
+
+    def test_close_returns_connection_to_pool(self):
+        wrapper = self.make_wrapper()
+        self.query(wrapper)
+        raw = wrapper.connection
+        wrapper.close()
+        self.assertEqual(wrapper.pool.stats()['idle'], 1)
+
+        self.query(wrapper)
+        self.assertIs(wrapper.connection, raw)
+
+    def test_close_inside_atomic_block_discards_connection(self):
+        wrapper = self.make_wrapper()
+        self.query(wrapper)
+        # Как transaction.atomic(): транзакция открыта, соединение закрывают посреди неё
+        wrapper.set_autocommit(False)
+        wrapper.in_atomic_block = True
+        wrapper.close()
+        wrapper.in_atomic_block = False
+        wrapper.connection = None
+
+        stats = wrapper.pool.stats()
+        self.assertEqual((stats['idle'], stats['open'], stats['closed']), (0, 0, 1))
+
+    def test_fewer_connections_and_faster_checkouts_than_request_mode(self):
+        cycles = 200
+
+        def run(wrapper):
+            # Соединения считаем на уровне драйвера
+            driver = sqlite_base.Database
+            with mock.patch.object(driver, 'connect', wraps=driver.connect) as connect:
+                started = time.perf_counter()
+                for _ in range(cycles):
+                    # Запрос при CONN_MAX_AGE = 0: соединение на запрос, закрытие в конце
+                    self.query(wrapper)
+                    wrapper.close()
+                return connect.call_count, time.perf_counter() - started
+
+        request_opened, request_time = run(self.make_wrapper(sqlite_base.DatabaseWrapper))
+        pooled_opened, pooled_time = run(self.make_wrapper())
+
+        self.assertEqual(request_opened, cycles)
+        self.assertEqual(pooled_opened, 1)
+        self.assertLess(pooled_time, request_time)
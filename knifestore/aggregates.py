@@ -0,0 +1,90 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Min, Q
+
+from .models import Brand, Category, Knife
+
+# Денормализованные колонки Brand/Category, которые ведёт этот модуль
+AGGREGATE_FIELDS = ['knife_count', 'min_price', 'avg_price', 'max_price', 'in_stock_count']
+EMPTY = {'knife_count': 0, 'min_price': None, 'avg_price': None, 'max_price': None, 'in_stock_count': 0}
+# Модель справочника -> FK ножа на неё
+OWNERS = {Category: 'category', Brand: 'publisher'}
+
+
+def compute(model, ids=None):
+    """{pk: значения агрегатов} одним GROUP BY по ножам; ids=None — по всем"""
+    field = OWNERS[model]
+    knives = Knife.objects.all() if ids is None else Knife.objects.filter(**{f'{field}__in': ids})
+    rows = (
+        knives.exclude(**{f'{field}__isnull': True})
+        .order_by()
+        .values(field)
+        .annotate(
+            knife_count=Count('pk'),
+            min_price=Min('price'),
+            avg_price=Avg('price'),
+            max_price=Max('price'),
+            in_stock_count=Count('pk', filter=Q(stock__quantity__gt=0)),
+        )
+    )
+    return {row.pop(field): row for row in rows}
+
+
+def quantize(values):
+    # Avg возвращает больше знаков, чем хранит колонка — сравниваем в точности хранения
+    values = dict(values)
+    if values['avg_price'] is not None:
+        values['avg_price'] = Decimal(str(values['avg_price'])).quantize(Decimal('0.01'))
+    return values
+
+
+def refresh(model, ids):
+    """Пересчитать агрегаты перечисленных строк model; возвращает изменённые pk"""
+    ids = {pk for pk in ids if pk}
+    if not ids:
+        return []
+    changed = []
+    with transaction.atomic():
+        # Сначала блокируем строки справочника (по pk — без взаимных блокировок),
+        # потом считаем: параллельный пересчёт тех же строк ждёт нашего коммита
+        # и не запишет поверх более старые значения
+        current = list(
+            model.objects.select_for_update().filter(pk__in=ids).order_by('pk').values('pk', *AGGREGATE_FIELDS)
+        )
+        fresh = compute(model, ids)
+        for row in current:
+            pk = row.pop('pk')
+            values = quantize(fresh.get(pk, EMPTY))
+            if row != values:
+                # update() мимо save(): сигналы справочника (переиндексация) здесь не нужны
+                model.objects.filter(pk=pk).update(**values)
+                changed.append(pk)
+    return changed
+
+
+def refresh_aggregates(category_ids=(), brand_ids=()):
+    """Пересчёт после изменения ножей или склада; (изменённые категории, изменённые бренды)"""
+    return refresh(Category, category_ids), refresh(Brand, brand_ids)
+
+
+def refresh_for_knives(knife_ids):
+    """Склад изменился у этих ножей — пересчитать их категории и бренды"""
+    owners = Knife.objects.filter(pk__in=list(knife_ids)).values_list('category_id', 'publisher_id')
+    category_ids, brand_ids = set(), set()
+    for category_id, brand_id in owners:
+        category_ids.add(category_id)
+        brand_ids.add(brand_id)
+    return refresh_aggregates(category_ids, brand_ids)
+
+
+def find_mismatches(model):
+    """[(pk, сохранённые, правильные), ...] для всех строк model"""
+    fresh = compute(model)
+    mismatches = []
+    for row in model.objects.order_by('pk').values('pk', *AGGREGATE_FIELDS).iterator():
+        pk = row.pop('pk')
+        values = quantize(fresh.get(pk, EMPTY))
+        if row != values:
+            mismatches.append((pk, row, values))
+    return mismatches
@@ -0,0 +1,94 @@
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from django.template.response import TemplateResponse
+from django.views import View
+
+from .conditional import not_modified, set_validators
+from .views import CategoryDetailView, KnifeDetailView, KnifeStoreView
+
+
+class AsyncCatalogPageView(View):
+    """
+    Async-вариант страницы каталога поверх синхронного представления base_view.
+
+    От base_view берутся шаблон, контекст, ETag (ConditionalGetMixin) и кэш
+    страницы (CatalogPageCacheMixin) — ключи и валидаторы те же, так что
+    WSGI- и ASGI-воркеры делят один кэш. Данные страницы читает
+    get_context_kwargs() без блокировки цикла событий; проверки кэша и
+    рендеринг (теги кэша фрагментов, request.user) синхронные и идут в
+    потоке запроса.
+    """
+    base_view = None
+    http_method_names = ['get', 'head', 'options']
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Бюджет SQL для отчёта /admin/perf/ — как у синхронного представления
+        cls.query_budget = getattr(cls.base_view, 'query_budget', None)
+
+    async def get(self, request, *args, **kwargs):
+        view = self.base_view()
+        view.setup(request, *args, **kwargs)
+        response, validators, key = await sync_to_async(self.lookup)(view)
+        if response is not None:
+            return response
+        context = await self.get_context_kwargs(view)
+        return await sync_to_async(self.render)(view, context, validators, key)
+
+    async def get_context_kwargs(self, view):
+        raise NotImplementedError
+
+    def lookup(self, view):
+        """(готовый ответ — 304 или страница из кэша, валидаторы, ключ кэша страницы)"""
+        request = view.request
+        validators = view.get_validators()
+        response = not_modified(request, validators)
+        if response is not None:
+            return response, validators, None
+        key, cached = view.get_cached_page(request)
+        if cached is not None:
+            return set_validators(request, cached, validators), validators, key
+        return None, validators, key
+
+    def render(self, view, context, validators, key):
+        request = view.request
+        response = TemplateResponse(request, view.get_template_names(), view.get_context_data(**context))
+        if key is not None:
+            response = view.store_page(key, request, response)
+        else:
+            response = view.finish_page(request, response.render())
+        return set_validators(request, response, validators)
+
+
+class AsyncKnifeStoreView(AsyncCatalogPageView):
+    base_view = KnifeStoreView
+
+    async def get_context_kwargs(self, view):
+        # Поиск ?q= ранжирует по индексу синхронно; страница читается async for
+        queryset = await sync_to_async(view.get_queryset)()
+        view.object_list = queryset
+        await view.aload_keyset_page(queryset, view.get_paginate_by(queryset))
+        return {}
+
+
+class AsyncKnifeDetailView(AsyncCatalogPageView):
+    base_view = KnifeDetailView
+
+    async def get_context_kwargs(self, view):
+        # Категория, бренд и склад приходят одним JOIN (select_related базового
+        # представления) — дешевле, чем отдельные запросы параллельно
+        view.object = await view.get_queryset().filter(pk=view.kwargs['pk']).afirst()
+        if view.object is None:
+            raise Http404('Нож не найден')
+        return {}
+
+
+class AsyncCategoryDetailView(AsyncCatalogPageView):
+    base_view = CategoryDetailView
+
+    async def get_context_kwargs(self, view):
+        # Список ножей остаётся ленивым: обычно его отдаёт кэш фрагмента
+        view.object = await view.get_queryset().filter(pk=view.kwargs['pk']).afirst()
+        if view.object is None:
+            raise Http404('Категория не найдена')
+        return {}
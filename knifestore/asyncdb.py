@@ -0,0 +1,40 @@
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+
+def parallel_enabled():
+    return getattr(settings, 'ASYNC_PARALLEL_QUERIES', True)
+
+
+def isolated(function):
+    """Чтение в потоке пула: своё соединение, закрытое по правилам CONN_MAX_AGE"""
+    @wraps(function)
+    def run():
+        try:
+            return function()
+        finally:
+            close_old_connections()
+    return run
+
+
+async def gather_reads(*functions):
+    """
+    Выполнить независимые синхронные чтения параллельно; результаты — в порядке аргументов.
+
+    Async-ORM Django (aget, async for) внутри одного запроса проходит через
+    один поток, поэтому asyncio.gather по нему запросы не распараллеливает.
+    Здесь каждое чтение идёт в отдельном потоке со своим соединением. Внутри
+    atomic() соединения других потоков не видят незакоммиченных изменений —
+    тогда, как и при ASYNC_PARALLEL_QUERIES = False, читаем по очереди в
+    потоке запроса.
+    """
+    in_transaction = await sync_to_async(lambda: connection.in_atomic_block)()
+    if not parallel_enabled() or in_transaction or len(functions) < 2:
+        return [await sync_to_async(function)() for function in functions]
+    return await asyncio.gather(
+        *[sync_to_async(isolated(function), thread_sensitive=False)() for function in functions]
+    )
@@ -0,0 +1,85 @@
+from django.db.models import Q
+
+from .cache import cache_timeout, catalog_cache, make_key, record
+from .models import Knife, Series
+
+MIN_TERM_LENGTH = 1
+MAX_TERM_LENGTH = 100
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+
+
+class AutocompleteSource:
+    """
+    Источник подсказок: префиксный поиск по индексированным колонкам.
+
+    istartswith даёт LIKE 'текст%' — на MySQL с регистронезависимой
+    сортировкой это диапазон по индексу, а не полный просмотр. Выдача
+    кэшируется по версии scope, так что правки модели сбрасывают подсказки.
+    """
+    name = None
+    model = None
+    scope = None
+
+    def filter(self, queryset, term):
+        raise NotImplementedError
+
+    def get_queryset(self):
+        return self.model._default_manager.all()
+
+    def label(self, obj):
+        return str(obj)
+
+    def search(self, term, limit=DEFAULT_LIMIT):
+        term = ' '.join(term.split())[:MAX_TERM_LENGTH]
+        if len(term) < MIN_TERM_LENGTH:
+            return []
+        limit = max(1, min(limit, MAX_LIMIT))
+        cache = catalog_cache()
+        key = make_key('autocomplete', self.name, [self.scope], f'{term.casefold()}|{limit}')
+        results = cache.get(key)
+        record('autocomplete', results is not None)
+        if results is None:
+            results = [
+                {'id': obj.pk, 'text': self.label(obj)}
+                for obj in self.filter(self.get_queryset(), term)[:limit]
+            ]
+            cache.set(key, results, cache_timeout())
+        return results
+
+
+class KnifeSource(AutocompleteSource):
+    name = 'knife'
+    model = Knife
+    scope = 'knife'
+
+    def get_queryset(self):
+        return Knife.objects.only('id', 'title')
+
+    def filter(self, queryset, term):
+        # Уникальный индекс по title: и поиск по префиксу, и порядок выдачи
+        return queryset.filter(title__istartswith=term).order_by('title')
+
+    def label(self, obj):
+        return obj.title
+
+
+class SeriesSource(AutocompleteSource):
+    name = 'series'
+    model = Series
+    scope = 'series'
+
+    def filter(self, queryset, term):
+        # «Фамилия [Имя]» — префиксы по индексу (last_name, first_name)
+        last_name, _, first_name = term.partition(' ')
+        condition = Q(last_name__istartswith=last_name)
+        if first_name:
+            condition &= Q(first_name__istartswith=first_name)
+        return queryset.filter(condition).order_by('last_name', 'first_name', 'pk')
+
+
+SOURCES = {source.name: source for source in (KnifeSource(), SeriesSource())}
+
+
+def autocomplete(name, term, limit=DEFAULT_LIMIT):
+    return SOURCES[name].search(term, limit)
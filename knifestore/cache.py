@@ -0,0 +1,138 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+KEY_PREFIX = 'catalog'
+
+
+def catalog_cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+
+def cache_timeout():
+    return getattr(settings, 'CATALOG_CACHE_TIMEOUT', 60 * 60)
+
+
+def scope_for(obj):
+    """Область версии: строка ('knife' — весь список) или объект модели ('knife:5')"""
+    if isinstance(obj, str):
+        return obj
+    return f'{obj._meta.model_name}:{obj.pk}'
+
+
+def _version_key(scope):
+    return f'{KEY_PREFIX}:v:{scope}'
+
+
+def _new_version():
+    # Версия из времени, а не счётчик с 1: после вытеснения ключа версии
+    # старые фрагменты не «воскреснут» с совпавшим номером
+    return time.time_ns()
+
+
+def get_versions(scopes):
+    cache = catalog_cache()
+    keys = {_version_key(scope): scope for scope in scopes}
+    found = cache.get_many(list(keys))
+    missing = {key: _new_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return [found[_version_key(scope)] for scope in scopes]
+
+
+def bump(*scopes):
+    """Инвалидировать всё, что закэшировано с этими областями"""
+    scopes = {scope_for(scope) for scope in scopes if scope}
+    if scopes:
+        catalog_cache().set_many({_version_key(scope): _new_version() for scope in scopes}, None)
+
+
+def make_key(kind, name, scopes, extra=''):
+    scopes = [scope_for(scope) for scope in scopes]
+    versions = get_versions(scopes)
+    digest = hashlib.md5(
+        '|'.join([extra] + [f'{scope}={version}' for scope, version in zip(scopes, versions)]).encode('utf-8'),
+        usedforsecurity=False,
+    ).hexdigest()
+    return f'{KEY_PREFIX}:{kind}:{name}:{digest}'
+
+
+def record(kind, hit):
+    """Счётчики попаданий/промахов хранятся в том же кэше — видны всем процессам"""
+    cache = catalog_cache()
+    key = f'{KEY_PREFIX}:stats:{kind}:{"hit" if hit else "miss"}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def cache_stats():
+    cache = catalog_cache()
+    stats = {}
+    for kind in ('page', 'fragment', 'autocomplete', 'pricing'):
+        hits = cache.get(f'{KEY_PREFIX}:stats:{kind}:hit', 0)
+        misses = cache.get(f'{KEY_PREFIX}:stats:{kind}:miss', 0)
+        total = hits + misses
+        stats[kind] = {'hits': hits, 'misses': misses, 'hit_ratio': round(hits / total, 4) if total else None}
+    return stats
+
+
+class CatalogPageCacheMixin:
+    """
+    Кэш целой страницы каталога для анонимных посетителей.
+
+    Ключ — путь с параметрами плюс версии областей из get_cache_scopes(),
+    поэтому сигналы сбрасывают ровно те страницы, чьи данные изменились.
+    Ответы с CSRF-токеном или cookie не кэшируются: они уникальны для клиента.
+    Поэтому формы таких страниц ({% csrf_token %} нельзя) помечаются
+    data-csrf-cookie и берут токен из cookie (_inc/_csrf_cookie_forms.html),
+    а finish_page ставит эту cookie каждому ответу — и из кэша тоже.
+    """
+    page_cache_scopes = ()
+
+    def get_cache_scopes(self):
+        return list(self.page_cache_scopes)
+
+    def page_is_cacheable(self, request):
+        return request.method in ('GET', 'HEAD') and not request.user.is_authenticated
+
+    def get_cached_page(self, request):
+        """(ключ, готовый ответ из кэша или None); ключ None — страницу не кэшируем"""
+        if not self.page_is_cacheable(request):
+            return None, None
+        key = make_key('page', type(self).__name__, self.get_cache_scopes(), request.get_full_path())
+        cached = catalog_cache().get(key)
+        record('page', cached is not None)
+        if cached is None:
+            return key, None
+        content, content_type = cached
+        return key, self.finish_page(request, HttpResponse(content, content_type=content_type))
+
+    def store_page(self, key, request, response):
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.render()
+        # get_token() помечает запрос CSRF_COOKIE_NEEDS_UPDATE — в HTML есть токен клиента
+        if response.status_code == 200 and not response.cookies \
+                and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE'):
+            catalog_cache().set(key, (response.content, response['Content-Type']), cache_timeout())
+        return self.finish_page(request, response)
+
+    def finish_page(self, request, response):
+        """Cookie csrftoken для форм data-csrf-cookie — уже после решения о кэшировании"""
+        get_token(request)
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        key, cached = self.get_cached_page(request)
+        if key is None:
+            return self.finish_page(request, super().dispatch(request, *args, **kwargs))
+        if cached is not None:
+            return cached
+        return self.store_page(key, request, super().dispatch(request, *args, **kwargs))
@@ -0,0 +1,321 @@
+import csv
+import json
+import time
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Brand, Category, Knife, Series
+from .signals import knives_bulk_changed
+
+# Собственные поля ножа, которые переносятся импортом/экспортом (фото — отдельно)
+KNIFE_FIELDS = [
+    'title', 'description', 'min_players', 'max_players', 'play_time', 'age_rating',
+    'release_date', 'price', 'steel', 'blade_length_mm', 'purpose', 'edge_angle_deg',
+    'handle_material', 'manufacturer_country',
+]
+# Связи по естественному ключу: категория и бренд — название, серии — «Фамилия Имя»
+RELATION_COLUMNS = ['category', 'brand', 'series']
+COLUMNS = KNIFE_FIELDS + RELATION_COLUMNS
+SERIES_SEPARATOR = ';'
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return 'jsonl' if str(path).endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def read_rows(stream, fmt):
+    """(номер строки, dict) по одной — файл целиком в память не читается"""
+    if fmt == 'jsonl':
+        for number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as error:
+                yield number, {'__error__': f'некорректный JSON: {error}'}
+                continue
+            yield number, row if isinstance(row, dict) else {'__error__': 'ожидался JSON-объект'}
+    else:
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def split_series(value):
+    if value is None:
+        return None
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()]
+    return [item.strip() for item in str(value).split(SERIES_SEPARATOR) if item.strip()]
+
+
+class NaturalKeyCache:
+    """
+    Кэш «естественный ключ -> pk» на время импорта.
+
+    Неизвестные ключи пакета догружаются одним запросом (resolve), поэтому
+    число запросов зависит от числа пакетов, а не строк.
+    """
+
+    def __init__(self, model, create_missing=False):
+        self.model = model
+        self.create_missing = create_missing
+        self.pks = {}
+        self.unknown = set()
+
+    def key_query(self, keys):
+        return Q(name__in=keys)
+
+    def key_of(self, obj):
+        return obj.name
+
+    def new_object(self, key):
+        return self.model(name=key)
+
+    def resolve(self, keys):
+        missing = {key for key in keys if key and key not in self.pks and key not in self.unknown}
+        if not missing:
+            return
+        for obj in self.model.objects.filter(self.key_query(missing)).order_by('pk'):
+            self.pks.setdefault(self.key_of(obj), obj.pk)
+        missing -= set(self.pks)
+        if missing and self.create_missing:
+            self.model.objects.bulk_create([self.new_object(key) for key in sorted(missing)], ignore_conflicts=True)
+            for obj in self.model.objects.filter(self.key_query(missing)):
+                self.pks.setdefault(self.key_of(obj), obj.pk)
+            missing -= set(self.pks)
+        self.unknown |= missing
+
+    def get(self, key):
+        return self.pks.get(key)
+
+
+class SeriesKeyCache(NaturalKeyCache):
+    def key_query(self, keys):
+        query = Q()
+        for key in keys:
+            last_name, _, first_name = key.partition(' ')
+            query |= Q(last_name=last_name, first_name=first_name)
+        return query
+
+    def key_of(self, obj):
+        return f'{obj.last_name} {obj.first_name}'
+
+    def new_object(self, key):
+        last_name, _, first_name = key.partition(' ')
+        return Series(last_name=last_name, first_name=first_name)
+
+
+class BatchResult:
+    def __init__(self, number):
+        self.number = number
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.rejected = []
+        self.seconds = 0.0
+
+    @property
+    def rate(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+class CatalogImporter:
+    """
+    Пакетный upsert ножей по уникальному названию.
+
+    Строки проверяются валидаторами полей Knife (field.clean) без запросов
+    к базе; связи разрешаются кэшами естественных ключей. Каждый пакет —
+    одна транзакция: upsert через bulk_create(update_conflicts=...), на
+    бэкендах без него — bulk_update + bulk_create; серии — пакетная
+    перезапись through-таблицы.
+    """
+
+    def __init__(self, batch_size=500, create_missing=False, dry_run=False):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.fields = {name: Knife._meta.get_field(name) for name in KNIFE_FIELDS}
+        # Проверка без записи не должна создавать и справочники
+        create_missing = create_missing and not dry_run
+        self.categories = NaturalKeyCache(Category, create_missing)
+        self.brands = NaturalKeyCache(Brand, create_missing)
+        self.series = SeriesKeyCache(Series, create_missing)
+
+    def clean_row(self, row):
+        """dict -> (значения полей, связи) или ValidationError со всеми ошибками строки"""
+        if '__error__' in row:
+            raise ValidationError(row['__error__'])
+        values, errors = {}, {}
+        for name, field in self.fields.items():
+            raw = row.get(name)
+            if isinstance(raw, str):
+                raw = raw.strip()
+            if raw in (None, '') and not field.empty_strings_allowed:
+                raw = None
+            elif raw is None:
+                raw = ''
+            try:
+                values[name] = field.clean(raw, None)
+            except ValidationError as error:
+                errors[name] = error.messages
+        if not errors and values['min_players'] > values['max_players']:
+            errors['max_players'] = ['Меньше минимальной партии']
+
+        relations = {
+            'category': (row.get('category') or '').strip() or None,
+            'brand': (row.get('brand') or '').strip() or None,
+            'series': split_series(row.get('series')),
+        }
+        if relations['category'] and self.categories.get(relations['category']) is None:
+            errors['category'] = [f'Неизвестная категория: {relations["category"]}']
+        if relations['brand'] and self.brands.get(relations['brand']) is None:
+            errors['brand'] = [f'Неизвестный бренд: {relations["brand"]}']
+        unknown_series = [key for key in relations['series'] or () if self.series.get(key) is None]
+        if unknown_series:
+            errors['series'] = [f'Неизвестные серии: {", ".join(unknown_series)}']
+        if errors:
+            raise ValidationError(errors)
+        return values, relations
+
+    def import_batch(self, number, rows):
+        started = time.monotonic()
+        result = BatchResult(number)
+        result.rows = len(rows)
+
+        self.categories.resolve({(row.get('category') or '').strip() for _, row in rows})
+        self.brands.resolve({(row.get('brand') or '').strip() for _, row in rows})
+        self.series.resolve({key for _, row in rows for key in split_series(row.get('series')) or ()})
+
+        cleaned = {}
+        for line, row in rows:
+            try:
+                values, relations = self.clean_row(row)
+            except ValidationError as error:
+                result.rejected.append((line, error.message_dict if hasattr(error, 'error_dict') else error.messages, row))
+                continue
+            # Повтор названия внутри пакета — побеждает последняя строка
+            cleaned[values['title']] = (values, relations)
+
+        if cleaned and not self.dry_run:
+            created, updated = self.write(cleaned)
+            result.created, result.updated = created, updated
+        result.seconds = time.monotonic() - started
+        return result
+
+    def build_knife(self, values, relations):
+        return Knife(
+            **values,
+            category_id=self.categories.get(relations['category']),
+            publisher_id=self.brands.get(relations['brand']),
+        )
+
+    @transaction.atomic
+    def write(self, cleaned):
+        existing, previous_category_ids, previous_brand_ids = {}, set(), set()
+        for title, pk, category_id, brand_id in Knife.objects.filter(title__in=list(cleaned)).values_list(
+                'title', 'pk', 'category_id', 'publisher_id'):
+            existing[title] = pk
+            previous_category_ids.add(category_id)
+            previous_brand_ids.add(brand_id)
+        update_fields = KNIFE_FIELDS[1:] + ['category', 'publisher', 'updated_at']
+        knives = [self.build_knife(*cleaned[title]) for title in cleaned]
+
+        if connection.features.supports_update_conflicts:
+            # INSERT ... ON CONFLICT (title) DO UPDATE: новые и существующие одним запросом
+            # на пакет; bulk_update с CASE по каждому полю в разы медленнее
+            upsert = {'update_conflicts': True, 'update_fields': update_fields}
+            if connection.features.supports_update_conflicts_with_target:
+                upsert['unique_fields'] = ['title']
+            Knife.objects.bulk_create(knives, batch_size=self.batch_size, **upsert)
+        else:
+            now = timezone.now()
+            to_update = []
+            for knife in knives:
+                if knife.title in existing:
+                    knife.pk = existing[knife.title]
+                    knife.updated_at = now
+                    to_update.append(knife)
+            Knife.objects.bulk_update(to_update, update_fields, batch_size=self.batch_size)
+            Knife.objects.bulk_create([knife for knife in knives if knife.pk is None], batch_size=self.batch_size)
+
+        created = len(cleaned) - len(existing)
+        # PK после upsert возвращают не все бэкенды (MySQL) — добираем одним запросом
+        existing.update(
+            Knife.objects.filter(title__in=[title for title in cleaned if title not in existing])
+            .values_list('title', 'pk')
+        )
+        self.write_series(cleaned, existing)
+        # Прежние категории и бренды тоже: у перенесённых ножей меняются их агрегаты
+        knives_bulk_changed(
+            existing.values(),
+            category_ids=[self.categories.get(relations['category']) for _, relations in cleaned.values()]
+            + list(previous_category_ids),
+            brand_ids=[self.brands.get(relations['brand']) for _, relations in cleaned.values()]
+            + list(previous_brand_ids),
+        )
+        return created, len(cleaned) - created
+
+    def write_series(self, cleaned, knife_pks):
+        """Серии перезаписываются только у строк, где колонка series задана"""
+        through = Knife.designers.through
+        knife_ids = [knife_pks[title] for title, (_, relations) in cleaned.items() if relations['series'] is not None]
+        if not knife_ids:
+            return
+        through.objects.filter(knife_id__in=knife_ids).delete()
+        through.objects.bulk_create([
+            through(knife_id=knife_pks[title], series_id=self.series.get(key))
+            for title, (_, relations) in cleaned.items() if relations['series'] is not None
+            for key in dict.fromkeys(relations['series'])
+        ], batch_size=self.batch_size)
+
+    def run(self, stream, fmt):
+        for number, rows in enumerate(batched(read_rows(stream, fmt), self.batch_size), 1):
+            yield self.import_batch(number, rows)
+
+
+def export_rows(queryset=None, chunk_size=1000):
+    """Строки каталога в формате импорта; ножи читаются порциями по chunk_size"""
+    queryset = queryset if queryset is not None else Knife.objects.all()
+    queryset = (
+        queryset.order_by('pk')
+        .select_related('category', 'publisher')
+        .prefetch_related('designers')
+        .only(*KNIFE_FIELDS, 'category__name', 'publisher__name')
+    )
+    for knife in queryset.iterator(chunk_size=chunk_size):
+        row = {name: getattr(knife, name) for name in KNIFE_FIELDS}
+        row['category'] = knife.category.name if knife.category else ''
+        row['brand'] = knife.publisher.name if knife.publisher else ''
+        row['series'] = [str(series) for series in knife.designers.all()]
+        yield row
+
+
+def write_rows(rows, stream, fmt):
+    count = 0
+    if fmt == 'jsonl':
+        for row in rows:
+            stream.write(json.dumps(row, ensure_ascii=False, default=str) + '\n')
+            count += 1
+        return count
+    writer = csv.DictWriter(stream, fieldnames=COLUMNS)
+    writer.writeheader()
+    for row in rows:
+        row['series'] = SERIES_SEPARATOR.join(row['series'])
+        writer.writerow(row)
+        count += 1
+    return count
@@ -0,0 +1,119 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .cache import get_versions, scope_for
+
+
+class Validators:
+    """ETag и Last-Modified ответа; exists = False — объекта нет, сравнивать нечего"""
+
+    def __init__(self, etag, last_modified=None, exists=True):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.exists = exists
+
+    @property
+    def timestamp(self):
+        return int(self.last_modified.timestamp()) if self.last_modified else None
+
+
+def queryset_state(queryset, field='updated_at'):
+    """max(field) и число строк одним агрегатом — сами строки не читаются"""
+    state = queryset.order_by().aggregate(last_modified=Max(field), count=Count('pk'))
+    return state['last_modified'], state['count']
+
+
+def compute_validators(parts, queryset=None, field='updated_at', scopes=()):
+    """
+    Валидаторы из дешёвого состояния данных.
+
+    parts — всё, от чего ещё зависит ответ (путь с параметрами, пользователь,
+    формат); queryset даёт max(updated_at) и число строк — только для
+    выборок по ключу, не для списков; scopes — версии областей кэша
+    каталога (O(1) на область, их поднимают сигналы при любой записи).
+    """
+    parts = [str(part) for part in parts]
+    last_modified = None
+    exists = True
+    if queryset is not None:
+        last_modified, count = queryset_state(queryset, field)
+        exists = bool(count)
+        parts += [last_modified.isoformat() if last_modified else '-', str(count)]
+    if scopes:
+        scopes = [scope_for(scope) for scope in scopes]
+        parts += [f'{scope}={version}' for scope, version in zip(scopes, get_versions(scopes))]
+    digest = hashlib.md5('|'.join(parts).encode('utf-8'), usedforsecurity=False).hexdigest()
+    return Validators(quote_etag(digest), last_modified, exists)
+
+
+def not_modified(request, validators):
+    """304 (или 412 для условных изменений), если клиентская копия актуальна"""
+    if not validators.exists:
+        return None
+    response = get_conditional_response(
+        request, etag=validators.etag, last_modified=validators.timestamp,
+    )
+    if response is not None:
+        set_validators(request, response, validators)
+    return response
+
+
+def set_validators(request, response, validators):
+    if response.status_code not in (200, 304) or not validators.exists:
+        return response
+    if not response.has_header('ETag'):
+        response['ETag'] = validators.etag
+    if validators.last_modified and not response.has_header('Last-Modified'):
+        response['Last-Modified'] = http_date(validators.timestamp)
+    # Кэш (браузер, CDN) хранит копию, но перед выдачей перепроверяет её
+    patch_cache_control(response, no_cache=True)
+    if request.user.is_authenticated:
+        patch_cache_control(response, private=True)
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Условный GET для страниц каталога: 304 до построения контекста и рендеринга.
+
+    Валидаторы считаются из версий областей get_conditional_scopes(), а у
+    страницы объекта — ещё и из его conditional_field (запрос по pk).
+    Списки — только версии: агрегат по всей таблице на каждый GET стоил бы
+    O(N) и обнулил бы выигрыш keyset-пагинации. conditional_field = None —
+    у модели нет даты изменения, только версии.
+    """
+    conditional_field = 'updated_at'
+    conditional_scopes = ()
+
+    def get_conditional_queryset(self):
+        pk_kwarg = getattr(self, 'pk_url_kwarg', None)
+        if self.conditional_field is None or pk_kwarg not in self.kwargs:
+            return None
+        return self.model._default_manager.filter(pk=self.kwargs[pk_kwarg])
+
+    def get_conditional_scopes(self):
+        return list(self.conditional_scopes)
+
+    def get_validators(self):
+        user = self.request.user
+        return compute_validators(
+            [self.request.get_full_path(), user.pk if user.is_authenticated else ''],
+            queryset=self.get_conditional_queryset(),
+            field=self.conditional_field,
+            scopes=self.get_conditional_scopes(),
+        )
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+
+        validators = self.get_validators()
+        response = not_modified(request, validators)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+            set_validators(request, response, validators)
+        return response
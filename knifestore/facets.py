@@ -0,0 +1,167 @@
+from django.core.exceptions import ValidationError
+from django.db.models import CharField, Count, F, Q, Value
+from django.db.models.functions import Cast
+
+from .models import Knife
+
+
+def parse_value(field, raw):
+    """
+    Значение из запроса -> значение колонки field; None, если оно ей не подходит.
+
+    Без этого ?brand=abc или ?price_min=NaN доходили бы до ORM и роняли
+    страницу: валидаторы поля отсекают и нечисла, и NaN/Infinity, и числа
+    за пределами диапазона колонки.
+    """
+    field = getattr(field, 'target_field', field)  # ForeignKey -> id связанной модели
+    try:
+        value = field.to_python(raw)
+        field.run_validators(value)
+    except ValidationError:
+        return None
+    return value
+
+
+class Facet:
+    """Описание одного фасета каталога: параметр запроса, колонка и подпись"""
+
+    def __init__(self, key, label, column, label_column=None, choices=None):
+        self.key = key
+        self.label = label
+        self.column = column
+        self.label_column = label_column
+        self.choices = dict(choices or ())
+
+    @property
+    def field(self):
+        return Knife._meta.get_field(self.column)
+
+    def parse(self, raw):
+        return parse_value(self.field, raw)
+
+    def option_label(self, value, label):
+        if self.label_column:
+            return label
+        return self.choices.get(value, value)
+
+
+FACETS = [
+    Facet('steel', 'Сталь', 'steel'),
+    Facet('purpose', 'Назначение', 'purpose', choices=Knife.PURPOSE_CHOICES),
+    Facet('handle_material', 'Материал рукояти', 'handle_material'),
+    Facet('edge_angle_deg', 'Угол заточки (°)', 'edge_angle_deg'),
+    Facet('brand', 'Бренд', 'publisher_id', label_column='publisher__name'),
+    Facet('category', 'Категория', 'category_id', label_column='category__name'),
+]
+
+# Диапазонные фильтры: (параметр от, параметр до, поле)
+RANGES = [
+    ('price_min', 'price_max', 'price'),
+    ('blade_min', 'blade_max', 'blade_length_mm'),
+]
+
+
+class CatalogFilter:
+    """
+    Фильтры каталога и подсчёт фасетов.
+
+    Выбранные значения приводятся к типу колонки; неподходящие
+    отбрасываются. Счётчики строятся одним запросом UNION ALL из GROUP BY
+    по колонке каждого фасета — строк в ответе столько, сколько вариантов
+    во всех фасетах, а не комбинаций (≈ ножей). Для каждого фасета
+    учитываются выбранные значения всех остальных фасетов, но не его
+    собственные — так рядом с отмеченной сталью видно, сколько ножей
+    добавит выбор ещё одной.
+    """
+
+    def __init__(self, params, facets=FACETS):
+        self.facets = facets
+        self.selected = {}
+        for facet in facets:
+            values = {facet.parse(value) for value in params.getlist(facet.key) if value}
+            values.discard(None)
+            if values:
+                self.selected[facet.key] = values
+
+        self.ranges = {}
+        for min_param, max_param, field in RANGES:
+            for param, lookup in ((min_param, 'gte'), (max_param, 'lte')):
+                raw = params.get(param)
+                if not raw:
+                    continue
+                value = parse_value(Knife._meta.get_field(field), raw)
+                if value is not None:
+                    self.ranges[param] = (f'{field}__{lookup}', value)
+
+    def is_active(self):
+        return bool(self.selected or self.ranges)
+
+    def range_q(self):
+        return Q(**dict(self.ranges.values()))
+
+    def facet_q(self, exclude=None):
+        q = Q()
+        for facet in self.facets:
+            if facet.key in self.selected and facet.key != exclude:
+                q &= Q(**{f'{facet.column}__in': self.selected[facet.key]})
+        return q
+
+    def apply(self, queryset):
+        return queryset.filter(self.range_q() & self.facet_q())
+
+    def facet_counts(self, queryset):
+        base = queryset.filter(self.range_q()).order_by()
+        parts = [
+            base.filter(self.facet_q(exclude=facet.key))
+            .exclude(**{f'{facet.column}__isnull': True})
+            .exclude(**{facet.column: ''} if isinstance(facet.field, CharField) else {})
+            .annotate(
+                facet_index=Value(index),
+                facet_value=Cast(facet.column, CharField()),
+                facet_label=F(facet.label_column) if facet.label_column else Value('', CharField()),
+            )
+            .values('facet_index', 'facet_value', 'facet_label')
+            .annotate(facet_count=Count('id'))
+            for index, facet in enumerate(self.facets)
+        ]
+        rows = parts[0].union(*parts[1:], all=True) if len(parts) > 1 else parts[0]
+
+        counts = {facet.key: {} for facet in self.facets}
+        for row in rows:
+            facet = self.facets[row['facet_index']]
+            value = facet.parse(row['facet_value'])
+            if value is None:
+                continue
+            counts[facet.key][value] = [facet.option_label(value, row['facet_label']), row['facet_count']]
+
+        result = []
+        for facet in self.facets:
+            selected = self.selected.get(facet.key, set())
+            options = [
+                {
+                    'value': value,
+                    'label': label,
+                    'count': count,
+                    'selected': value in selected,
+                }
+                for value, (label, count) in counts[facet.key].items()
+            ]
+            options.sort(key=lambda option: (-option['count'], str(option['label'])))
+            result.append({'key': facet.key, 'label': facet.label, 'options': options})
+        return result
+
+
+class FacetFilterMixin:
+    """Фильтрация ListView по фасетам с подсчётом количества для каждого значения"""
+
+    def apply_catalog_filter(self, queryset):
+        """Вызывается из get_queryset последним шагом, после остальных фильтров"""
+        self.catalog_filter = CatalogFilter(self.request.GET)
+        self.facet_base_queryset = queryset
+        return self.catalog_filter.apply(queryset)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['facets'] = self.catalog_filter.facet_counts(self.facet_base_queryset)
+        context['catalog_filter'] = self.catalog_filter
+        return context
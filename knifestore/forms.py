@@ -1,7 +1,9 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.models import User
+from django.utils.functional import cached_property
 from .models import *
+from .widgets import AutocompleteSelect, AutocompleteSelectMultiple, preload_labels
 
 class RegistrationForm(UserCreationForm):
     username = forms.CharField(
@@ -46,7 +48,8 @@ class KnifeForm(forms.ModelForm):
             'description': forms.Textarea(attrs={'rows': 4}),
             'category': forms.Select(attrs={'class': 'form-select'}),
             'publisher': forms.Select(attrs={'class': 'form-select'}),
-            'designers': forms.SelectMultiple(attrs={'class': 'form-select'}),
+            # Серий сотни — варианты подгружаются подсказками, в HTML только выбранные
+            'designers': AutocompleteSelectMultiple('series', attrs={'class': 'form-select'}),
             'release_date': forms.DateInput(attrs={'type': 'date'}),
         }
         labels = {
@@ -64,16 +67,25 @@ class OrderForm(forms.ModelForm):
             'shipping_address': forms.Textarea(attrs={'rows': 3, 'class': 'form-control'}),
         }
 
+class BaseOrderItemFormSet(forms.BaseInlineFormSet):
+    """Подписи выбранных ножей всех строк — одним запросом на формсет"""
+
+    @cached_property
+    def forms(self):
+        forms = super().forms
+        preload_labels(form['knife'] for form in forms)
+        return forms
+
+
 OrderItemFormSet = forms.inlineformset_factory(
     Order,
     OrderItem,
+    formset=BaseOrderItemFormSet,
     fields=('knife', 'quantity', 'price'),
     extra=1,
     widgets={
-        'knife': forms.Select(attrs={
-            'class': 'form-select',
-            'data-live-search': 'true'
-        }),
+        # Каталог целиком не рендерится: только выбранный нож, остальное — подсказки
+        'knife': AutocompleteSelect('knife', attrs={'class': 'form-select'}),
         'quantity': forms.NumberInput(attrs={
             'class': 'form-control',
             'min': 1
@@ -87,4 +99,38 @@ OrderItemFormSet = forms.inlineformset_factory(
     can_delete=True,
     validate_min=True,
     min_num=1
-)
\ No newline at end of file
+)
+class StockMovementForm(forms.Form):
+    """Движение склада вместо перезаписи остатка (см. inventory.apply_movements)"""
+    KIND_CHOICES = [
+        (StockMovement.RECEIPT, 'Поступление'),
+        (StockMovement.RETURN, 'Возврат'),
+        (StockMovement.ADJUSTMENT, 'Инвентаризация (фактический остаток)'),
+    ]
+    kind = forms.ChoiceField(
+        label='Операция',
+        choices=KIND_CHOICES,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    quantity = forms.IntegerField(
+        label='Количество',
+        min_value=0,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'min': 0})
+    )
+    reorder_level = forms.IntegerField(
+        label='Порог дозаказа',
+        min_value=0,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'min': 0})
+    )
+    note = forms.CharField(
+        label='Комментарий',
+        max_length=200,
+        required=False,
+        widget=forms.TextInput(attrs={'class': 'form-control'})
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('kind') != StockMovement.ADJUSTMENT and cleaned_data.get('quantity') == 0:
+            self.add_error('quantity', 'Для поступления и возврата количество должно быть больше нуля')
+        return cleaned_data
@@ -0,0 +1,169 @@
+import hashlib
+import io
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import cache
+from .models import Knife
+
+logger = logging.getLogger(__name__)
+
+# Ширины производных (px) и форматы: WebP для современных браузеров, JPEG — запасной
+VARIANT_WIDTHS = (320, 640, 1280)
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+DERIVED_ROOT = 'knives/derived'
+
+
+def variant_widths():
+    return tuple(getattr(settings, 'IMAGE_VARIANT_WIDTHS', VARIANT_WIDTHS))
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()[:20]
+
+
+def variant_path(image_hash, width, ext):
+    """Путь зависит только от содержимого: одинаковые файлы дают одни производные"""
+    return f'{DERIVED_ROOT}/{image_hash[:2]}/{image_hash}/{width}.{ext}'
+
+
+def plan_variants(original_width):
+    """
+    [(ширина в имени файла, фактическая ширина), ...] без увеличения.
+
+    Ширины больше оригинала схлопываются в одну производную шириной оригинала.
+    """
+    plan = []
+    for width in sorted(variant_widths()):
+        if width >= original_width:
+            plan.append((width, original_width))
+            break
+        plan.append((width, width))
+    return plan
+
+
+def render_variant(image, width, ext):
+    resized = image
+    if image.width > width:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.LANCZOS)
+    if ext == 'jpg' and resized.mode != 'RGB':
+        # У JPEG нет альфа-канала — подкладываем белый фон
+        background = Image.new('RGB', resized.size, 'white')
+        background.paste(resized, mask=resized.getchannel('A') if 'A' in resized.getbands() else None)
+        resized = background
+    buffer = io.BytesIO()
+    resized.save(buffer, **FORMATS[ext])
+    return buffer.getvalue()
+
+
+def build_variants(knife, force=False):
+    """
+    Сгенерировать производные для ножа и записать image_hash/image_width.
+
+    Повторный вызов для того же содержимого ничего не пересчитывает: пути
+    детерминированы, существующие файлы пропускаются (force — перезаписать).
+    """
+    if not knife.image:
+        return None
+    storage = knife.image.storage
+    with knife.image.open('rb') as source:
+        data = source.read()
+    image_hash = content_hash(data)
+
+    with Image.open(io.BytesIO(data)) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ('RGB', 'RGBA'):
+            transparent = 'A' in original.getbands() or 'transparency' in original.info
+            original = original.convert('RGBA' if transparent else 'RGB')
+        original_width = original.width
+        for name_width, width in plan_variants(original_width):
+            for ext in FORMATS:
+                path = variant_path(image_hash, name_width, ext)
+                if storage.exists(path):
+                    if not force:
+                        continue
+                    storage.delete(path)
+                storage.save(path, ContentFile(render_variant(original, width, ext)))
+
+    # update(), а не save(): сигналы ножа не должны снова ставить его в очередь
+    Knife.objects.filter(pk=knife.pk, image=knife.image.name).update(
+        image_hash=image_hash, image_width=original_width, updated_at=timezone.now(),
+    )
+    cache.bump('knife', f'knife:{knife.pk}', f'category:{knife.category_id}', f'brand:{knife.publisher_id}')
+    return image_hash
+
+
+def knife_variants(knife, ext):
+    """[(url, ширина), ...] готовых производных; пусто, пока воркер не отработал"""
+    if not knife.image_hash or not knife.image_width:
+        return []
+    storage = knife.image.storage
+    return [
+        (storage.url(variant_path(knife.image_hash, name_width, ext)), width)
+        for name_width, width in plan_variants(knife.image_width)
+    ]
+
+
+def process_knife(knife_id, force=False):
+    knife = Knife.objects.filter(pk=knife_id).first()
+    if knife is not None:
+        return build_variants(knife, force=force)
+    return None
+
+
+class ImageWorker:
+    """
+    Локальная очередь обработки изображений в фоновом потоке.
+
+    Поток-демон запускается при первой задаче; ошибки пишутся в лог и не
+    останавливают очередь. При IMAGE_PIPELINE_ASYNC = False задачи
+    выполняются сразу (тесты, management-команды).
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, knife_id):
+        if not getattr(settings, 'IMAGE_PIPELINE_ASYNC', True):
+            process_knife(knife_id)
+            return
+        self.queue.put(knife_id)
+        self._ensure_started()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='knife-images', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            knife_id = self.queue.get()
+            close_old_connections()
+            try:
+                process_knife(knife_id)
+            except Exception:
+                logger.exception('Не удалось обработать изображение ножа %s', knife_id)
+            finally:
+                close_old_connections()
+                self.queue.task_done()
+
+    def join(self):
+        """Дождаться опустошения очереди"""
+        self.queue.join()
+
+
+worker = ImageWorker()
@@ -0,0 +1,44 @@
+"""
+Сброс кэша каталога и пересчёт агрегатов после записи склада.
+
+Общие для signals и inventory: журнал склада пишет остатки через
+QuerySet.update() мимо сигналов, а сигналы Stock/Knife — через save().
+"""
+from django.db import transaction
+
+from . import aggregates, cache
+
+
+def bump_on_commit(*scopes):
+    scopes = [cache.scope_for(scope) for scope in scopes if scope]
+    if scopes:
+        transaction.on_commit(lambda: cache.bump(*scopes))
+
+
+def knife_scopes(knife_ids):
+    return [f'knife:{knife_id}' for knife_id in knife_ids]
+
+
+def stock_scopes(knife_ids):
+    # Точный остаток ножа (расчёт корзины basket.pricing); карточки и
+    # страницы каталога зависят только от «в наличии» — у них 'knife:<id>'
+    return [f'stock:{knife_id}' for knife_id in knife_ids]
+
+
+def stock_bulk_changed(knife_ids):
+    """
+    Склад ножей изменён в обход save() (списание при оформлении): пересчёт
+    «в наличии» у их категорий и брендов и сброс кэша карточек ножей и
+    изменившихся страниц.
+    """
+    knife_ids = list(knife_ids)
+    category_ids, brand_ids = aggregates.refresh_for_knives(knife_ids)
+    bump_on_commit(
+        # Карточка ножа показывает «в наличии / нет в наличии»
+        *knife_scopes(knife_ids),
+        *stock_scopes(knife_ids),
+        'category' if category_ids else None,
+        'brand' if brand_ids else None,
+        *[f'category:{pk}' for pk in category_ids],
+        *[f'brand:{pk}' for pk in brand_ids],
+    )
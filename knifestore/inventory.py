@@ -0,0 +1,186 @@
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .invalidation import bump_on_commit, stock_bulk_changed, stock_scopes
+from .models import LowStockAlert, Stock, StockMovement
+
+
+class InsufficientStock(Exception):
+    """shortages: {knife_id: (запрошено, доступно)}"""
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__(f'Недостаточно товара на складе: {sorted(shortages)}')
+
+
+def evaluate_alerts(rows):
+    """
+    Очередь дозаказа только для затронутых ножей: rows — [(knife_id, остаток, порог)].
+
+    Остаток не выше порога открывает оповещение (если открытого ещё нет),
+    остаток выше порога закрывает открытое. Таблица Stock целиком не читается.
+    """
+    rows = list(rows)
+    if not rows:
+        return
+    knife_ids = [knife_id for knife_id, _, _ in rows]
+    opened = set(
+        LowStockAlert.objects.filter(knife_id__in=knife_ids, resolved_at__isnull=True)
+        .values_list('knife_id', flat=True)
+    )
+    LowStockAlert.objects.bulk_create([
+        LowStockAlert(knife_id=knife_id, quantity=quantity, threshold=threshold)
+        for knife_id, quantity, threshold in rows
+        if quantity <= threshold and knife_id not in opened
+    ])
+    recovered = [knife_id for knife_id, quantity, threshold in rows if quantity > threshold and knife_id in opened]
+    if recovered:
+        LowStockAlert.objects.filter(knife_id__in=recovered, resolved_at__isnull=True).update(
+            resolved_at=timezone.now(),
+        )
+
+
+def apply_movements(changes, kind, order=None, user=None, note=''):
+    """
+    Провести движения {knife_id: изменение} одной транзакцией.
+
+    Строки Stock блокируются в порядке knife_id; расход списывается условным
+    UPDATE ... SET quantity = quantity + d WHERE quantity >= -d, поэтому
+    параллельные продажи и правки не затирают друг друга. На каждое движение
+    в журнал пишется строка с остатком после него. Ножи без записи Stock
+    складом не учитываются: расход по ним пропускается, приход создаёт запись.
+    Возвращает {knife_id: остаток после}.
+    """
+    changes = {int(knife_id): int(delta) for knife_id, delta in changes.items() if delta}
+    if not changes:
+        return {}
+    with transaction.atomic():
+        incoming = [knife_id for knife_id, delta in changes.items() if delta > 0]
+        existing = set(Stock.objects.filter(knife_id__in=incoming).values_list('knife_id', flat=True))
+        missing = [knife_id for knife_id in incoming if knife_id not in existing]
+        if missing:
+            Stock.objects.bulk_create(
+                [Stock(knife_id=knife_id, quantity=0) for knife_id in missing], ignore_conflicts=True,
+            )
+        before = dict(
+            Stock.objects.select_for_update()
+            .filter(knife_id__in=changes)
+            .order_by('knife_id')
+            .values_list('knife_id', 'quantity')
+        )
+        changes = {knife_id: delta for knife_id, delta in sorted(changes.items()) if knife_id in before}
+        shortages = {
+            knife_id: (-delta, before[knife_id])
+            for knife_id, delta in changes.items()
+            if before[knife_id] + delta < 0
+        }
+        if shortages:
+            raise InsufficientStock(shortages)
+
+        now = timezone.now()
+        for knife_id, delta in changes.items():
+            update = {'quantity': F('quantity') + delta}
+            if kind == StockMovement.RECEIPT:
+                update['last_restocked'] = now
+            updated = Stock.objects.filter(knife_id=knife_id, quantity__gte=max(-delta, 0)).update(**update)
+            if not updated:
+                # Строки уже заблокированы select_for_update выше, так что сюда не
+                # попасть; условный UPDATE — страховка, если блокировку уберут
+                raise InsufficientStock({knife_id: (-delta, 0)})
+
+        after = {
+            knife_id: (quantity, threshold)
+            for knife_id, quantity, threshold in Stock.objects.filter(knife_id__in=changes)
+            .values_list('knife_id', 'quantity', 'reorder_level')
+        }
+        StockMovement.objects.bulk_create([
+            StockMovement(
+                knife_id=knife_id, kind=kind, delta=delta, balance_after=after[knife_id][0],
+                order=order, user=user, note=note,
+            )
+            for knife_id, delta in changes.items()
+        ])
+        evaluate_alerts((knife_id, quantity, threshold) for knife_id, (quantity, threshold) in after.items())
+
+        # «В наличии» у категорий и брендов меняется только при переходе через ноль,
+        # точный остаток (предупреждение в корзине) — при любом движении
+        flipped = [knife_id for knife_id in changes if (before[knife_id] > 0) != (after[knife_id][0] > 0)]
+        if flipped:
+            stock_bulk_changed(flipped)
+        bump_on_commit(*stock_scopes(changes))
+    return {knife_id: quantity for knife_id, (quantity, _) in after.items()}
+
+
+def set_quantity(knife_id, quantity, user=None, note=''):
+    """Инвентаризация: фактический остаток -> корректировка на разницу под блокировкой"""
+    with transaction.atomic():
+        stock, _ = Stock.objects.select_for_update().get_or_create(knife_id=knife_id)
+        return apply_movements(
+            {knife_id: quantity - stock.quantity}, StockMovement.ADJUSTMENT, user=user, note=note,
+        ).get(knife_id, stock.quantity)
+
+
+def set_quantities(quantities, user=None, note=''):
+    """
+    set_quantity для пакета {knife_id: фактический остаток} одной транзакцией.
+
+    Записи Stock должны существовать; блокируются в порядке knife_id, как в
+    apply_movements. Возвращает {knife_id: остаток после}.
+    """
+    quantities = {int(knife_id): int(quantity) for knife_id, quantity in quantities.items()}
+    if not quantities:
+        return {}
+    with transaction.atomic():
+        current = dict(
+            Stock.objects.select_for_update()
+            .filter(knife_id__in=quantities)
+            .order_by('knife_id')
+            .values_list('knife_id', 'quantity')
+        )
+        result = dict(current)
+        result.update(apply_movements(
+            {knife_id: quantities[knife_id] - quantity for knife_id, quantity in current.items()},
+            StockMovement.ADJUSTMENT, user=user, note=note,
+        ))
+    return result
+
+
+def reconcile(batch_size=500, fix=False):
+    """
+    Сверить Stock.quantity с суммой журнала пакетами по batch_size записей.
+
+    Возвращает [(knife_id, остаток в Stock, сумма журнала), ...]; с fix=True
+    остаток приводится к журналу (пакет — одна транзакция под блокировкой).
+    """
+    mismatches = []
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            stocks = Stock.objects.filter(knife_id__gt=last_id).order_by('knife_id')
+            if fix:
+                stocks = stocks.select_for_update()
+            batch = list(stocks.values_list('knife_id', 'quantity', 'reorder_level')[:batch_size])
+            if not batch:
+                return mismatches
+            last_id = batch[-1][0]
+            ledger = dict(
+                StockMovement.objects.filter(knife_id__in=[row[0] for row in batch])
+                .order_by()
+                .values('knife_id')
+                .annotate(total=Sum('delta'))
+                .values_list('knife_id', 'total')
+            )
+            wrong = [
+                (knife_id, quantity, ledger.get(knife_id, 0), threshold)
+                for knife_id, quantity, threshold in batch
+                if quantity != ledger.get(knife_id, 0)
+            ]
+            mismatches.extend((knife_id, quantity, total) for knife_id, quantity, total, _ in wrong)
+            if fix and wrong:
+                for knife_id, _, total, _ in wrong:
+                    Stock.objects.filter(knife_id=knife_id).update(quantity=max(total, 0))
+                evaluate_alerts((knife_id, max(total, 0), threshold) for knife_id, _, total, threshold in wrong)
+                stock_bulk_changed([knife_id for knife_id, _, _, _ in wrong])
+        if len(batch) < batch_size:
+            return mismatches
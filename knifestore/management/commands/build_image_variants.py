@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from knifestore.images import process_knife
+from knifestore.models import Knife
+
+
+class Command(BaseCommand):
+    help = 'Построить миниатюры и WebP для фото ножей (по умолчанию — ещё не обработанных)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Обработать все ножи с фото')
+        parser.add_argument('--force', action='store_true', help='Перезаписать существующие файлы')
+
+    def handle(self, *args, all=False, force=False, **options):
+        knives = Knife.objects.exclude(image='').exclude(image__isnull=True)
+        if not (all or force):
+            knives = knives.filter(image_hash='')
+        ids = list(knives.order_by('pk').values_list('pk', flat=True))
+        done = failed = 0
+        for knife_id in ids:
+            try:
+                process_knife(knife_id, force=force)
+            except (OSError, ValueError) as error:
+                failed += 1
+                self.stderr.write(f'Нож {knife_id}: {error}')
+            else:
+                done += 1
+        self.stdout.write(self.style.SUCCESS(f'Готово: {done} обработано, {failed} с ошибками'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from knifestore.aggregates import find_mismatches, refresh
+from knifestore.cache import bump
+from knifestore.models import Brand, Category
+
+
+class Command(BaseCommand):
+    help = 'Сверить денормализованные агрегаты категорий и брендов с ножами и складом'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Исправить расхождения')
+
+    def handle(self, *args, fix=False, **options):
+        total = 0
+        for model in (Category, Brand):
+            mismatches = find_mismatches(model)
+            total += len(mismatches)
+            for pk, stored, expected in mismatches[:50]:
+                diff = ', '.join(
+                    f'{name}: {stored[name]} -> {expected[name]}' for name in stored if stored[name] != expected[name]
+                )
+                self.stdout.write(f'{model._meta.verbose_name} #{pk}: {diff}')
+            if len(mismatches) > 50:
+                self.stdout.write(f'... и ещё {len(mismatches) - 50}')
+            if fix and mismatches:
+                changed = refresh(model, [pk for pk, _, _ in mismatches])
+                scope = model._meta.model_name
+                bump(scope, *[f'{scope}:{pk}' for pk in changed])
+        if not total:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+        elif fix:
+            self.stdout.write(self.style.SUCCESS(f'Исправлено расхождений: {total}'))
+        else:
+            raise CommandError(f'Расхождений: {total}. Запустите с --fix')
@@ -0,0 +1,24 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from knifestore.catalog_io import detect_format, export_rows, write_rows
+
+
+class Command(BaseCommand):
+    help = 'Экспорт каталога ножей в CSV/JSONL (формат совместим с import_catalog)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help="Файл или '-' для stdout")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='По умолчанию — по расширению файла')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, path='-', format=None, chunk_size=1000, **options):
+        fmt = detect_format(path, format)
+        rows = export_rows(chunk_size=chunk_size)
+        if path == '-':
+            count = write_rows(rows, sys.stdout, fmt)
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as stream:
+                count = write_rows(rows, stream, fmt)
+        self.stderr.write(self.style.SUCCESS(f'Выгружено ножей: {count}'))
@@ -0,0 +1,67 @@
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from knifestore.catalog_io import COLUMNS, CatalogImporter, detect_format
+
+
+class Command(BaseCommand):
+    help = 'Импорт каталога ножей из CSV/JSONL пакетным upsert по названию'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Файл CSV/JSONL или '-' для stdin")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='По умолчанию — по расширению файла')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--create-missing', action='store_true',
+                            help='Создавать неизвестные категории, бренды и серии')
+        parser.add_argument('--dry-run', action='store_true', help='Только проверить строки, без записи')
+        parser.add_argument('--rejects', help='Сохранить отклонённые строки в JSONL-файл')
+
+    def handle(self, *args, path, format=None, batch_size=500, create_missing=False, dry_run=False,
+               rejects=None, **options):
+        fmt = detect_format(path, format)
+        importer = CatalogImporter(batch_size=batch_size, create_missing=create_missing, dry_run=dry_run)
+        if path == '-':
+            stream = sys.stdin
+        else:
+            try:
+                stream = open(path, encoding='utf-8-sig', newline='')
+            except OSError as error:
+                raise CommandError(error)
+        rejects_file = open(rejects, 'w', encoding='utf-8') if rejects else None
+
+        totals = {'rows': 0, 'created': 0, 'updated': 0, 'rejected': 0, 'seconds': 0.0}
+        try:
+            for result in importer.run(stream, fmt):
+                for line, errors, row in result.rejected:
+                    self.stderr.write(f'Строка {line}: {errors}')
+                    if rejects_file:
+                        rejects_file.write(json.dumps(
+                            {'line': line, 'errors': errors, 'row': {key: row.get(key) for key in COLUMNS}},
+                            ensure_ascii=False, default=str,
+                        ) + '\n')
+                self.stdout.write(
+                    f'Пакет {result.number}: {result.rows} строк, создано {result.created}, '
+                    f'обновлено {result.updated}, отклонено {len(result.rejected)}, '
+                    f'{result.rate:.0f} строк/с'
+                )
+                totals['rows'] += result.rows
+                totals['created'] += result.created
+                totals['updated'] += result.updated
+                totals['rejected'] += len(result.rejected)
+                totals['seconds'] += result.seconds
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if rejects_file:
+                rejects_file.close()
+
+        rate = totals['rows'] / totals['seconds'] if totals['seconds'] else 0
+        summary = (
+            f'Итого: {totals["rows"]} строк, создано {totals["created"]}, обновлено {totals["updated"]}, '
+            f'отклонено {totals["rejected"]}, {rate:.0f} строк/с'
+        )
+        if dry_run:
+            summary += ' (проверка без записи)'
+        self.stdout.write(self.style.SUCCESS(summary) if not totals['rejected'] else self.style.WARNING(summary))
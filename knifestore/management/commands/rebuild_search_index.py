@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from knifestore.models import Knife, SearchToken
+from knifestore.search import index_knives
+
+
+class Command(BaseCommand):
+    help = 'Полностью перестроить поисковый индекс каталога'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, batch_size, **options):
+        SearchToken.objects.all().delete()
+        ids = list(Knife.objects.order_by('pk').values_list('pk', flat=True))
+        tokens = 0
+        for start in range(0, len(ids), batch_size):
+            tokens += index_knives(ids[start:start + batch_size], batch_size=batch_size)
+            self.stdout.write(f'Проиндексировано {min(start + batch_size, len(ids))}/{len(ids)}')
+        self.stdout.write(self.style.SUCCESS(f'Готово: {len(ids)} ножей, {tokens} термов'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from knifestore.inventory import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Сверить остатки склада с суммой журнала движений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Привести остатки к журналу')
+        parser.add_argument('--batch-size', type=int, default=500, help='Записей склада за одну транзакцию')
+
+    def handle(self, *args, fix=False, batch_size=500, **options):
+        mismatches = reconcile(batch_size=batch_size, fix=fix)
+        for knife_id, quantity, total in mismatches[:50]:
+            self.stdout.write(f'Нож #{knife_id}: на складе {quantity}, по журналу {total}')
+        if len(mismatches) > 50:
+            self.stdout.write(f'... и ещё {len(mismatches) - 50}')
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+        elif fix:
+            self.stdout.write(self.style.SUCCESS(f'Исправлено расхождений: {len(mismatches)}'))
+        else:
+            raise CommandError(f'Расхождений: {len(mismatches)}. Запустите с --fix')
@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-18 19:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('knifestore', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='knife',
+            index=models.Index(fields=['steel', 'price'], name='knife_steel_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='knife',
+            index=models.Index(fields=['purpose', 'price'], name='knife_purpose_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='knife',
+            index=models.Index(fields=['handle_material', 'price'], name='knife_handle_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='knife',
+            index=models.Index(fields=['blade_length_mm', 'price'], name='knife_blade_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='knife',
+            index=models.Index(fields=['category', 'price'], name='knife_category_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='knife',
+            index=models.Index(fields=['publisher', 'price'], name='knife_publisher_price_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 19:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('knifestore', '0004_order_checkout_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='knife',
+            name='image_hash',
+            field=models.CharField(blank=True, editable=False, max_length=20, verbose_name='Хэш содержимого фото'),
+        ),
+        migrations.AddField(
+            model_name='knife',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='Ширина исходного фото'),
+        ),
+    ]
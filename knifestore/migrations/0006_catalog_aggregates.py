@@ -0,0 +1,91 @@
+# Generated by Django 5.2 on 2026-10-18 19:28
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, Max, Min, Q
+
+
+def fill_aggregates(apps, schema_editor):
+    # Начальные значения агрегатов; дальше их ведут сигналы (knifestore/aggregates.py)
+    Knife = apps.get_model('knifestore', 'Knife')
+    for model_name, field in (('Category', 'category'), ('Brand', 'publisher')):
+        model = apps.get_model('knifestore', model_name)
+        rows = (
+            Knife.objects.exclude(**{f'{field}__isnull': True})
+            .order_by()
+            .values(field)
+            .annotate(
+                knife_count=Count('pk'),
+                min_price=Min('price'),
+                avg_price=Avg('price'),
+                max_price=Max('price'),
+                in_stock_count=Count('pk', filter=Q(stock__quantity__gt=0)),
+            )
+        )
+        for row in rows:
+            pk = row.pop(field)
+            if row['avg_price'] is not None:
+                row['avg_price'] = Decimal(str(row['avg_price'])).quantize(Decimal('0.01'))
+            model.objects.filter(pk=pk).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('knifestore', '0005_knife_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='brand',
+            name='avg_price',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=10, null=True, verbose_name='Средняя цена'),
+        ),
+        migrations.AddField(
+            model_name='brand',
+            name='in_stock_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Ножей в наличии'),
+        ),
+        migrations.AddField(
+            model_name='brand',
+            name='knife_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество ножей'),
+        ),
+        migrations.AddField(
+            model_name='brand',
+            name='max_price',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=10, null=True, verbose_name='Максимальная цена'),
+        ),
+        migrations.AddField(
+            model_name='brand',
+            name='min_price',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=10, null=True, verbose_name='Минимальная цена'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='avg_price',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=10, null=True, verbose_name='Средняя цена'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='in_stock_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Ножей в наличии'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='knife_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество ножей'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='max_price',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=10, null=True, verbose_name='Максимальная цена'),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='min_price',
+            field=models.DecimalField(decimal_places=2, editable=False, max_digits=10, null=True, verbose_name='Минимальная цена'),
+        ),
+        migrations.RunPython(fill_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2 on 2026-10-18 19:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('knifestore', '0006_catalog_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stock',
+            name='reorder_level',
+            field=models.PositiveIntegerField(default=5, help_text='При остатке не выше порога нож попадает в очередь дозаказа', verbose_name='Порог дозаказа'),
+        ),
+        migrations.CreateModel(
+            name='LowStockAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(verbose_name='Остаток при срабатывании')),
+                ('threshold', models.PositiveIntegerField(verbose_name='Порог')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('resolved_at', models.DateTimeField(blank=True, null=True, verbose_name='Закрыто')),
+                ('knife', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='low_stock_alerts', to='knifestore.knife', verbose_name='Нож')),
+            ],
+            options={
+                'verbose_name': 'Низкий остаток',
+                'verbose_name_plural': 'Очередь дозаказа',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['resolved_at', 'knife'], name='low_stock_open_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('receipt', 'Поступление'), ('sale', 'Продажа'), ('return', 'Возврат'), ('adjustment', 'Корректировка')], max_length=20, verbose_name='Тип движения')),
+                ('delta', models.IntegerField(verbose_name='Изменение')),
+                ('balance_after', models.IntegerField(verbose_name='Остаток после')),
+                ('note', models.CharField(blank=True, max_length=200, verbose_name='Комментарий')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Время')),
+                ('knife', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='knifestore.knife', verbose_name='Нож')),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='knifestore.order', verbose_name='Заказ')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Движение склада',
+                'verbose_name_plural': 'Движения склада',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['knife', 'id'], name='stock_movement_knife_idx')],
+            },
+        ),
+    ]
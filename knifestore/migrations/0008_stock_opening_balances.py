@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+def opening_balances(apps, schema_editor):
+    # Журнал начинается с текущих остатков: сумма движений сразу равна Stock.quantity
+    Stock = apps.get_model('knifestore', 'Stock')
+    StockMovement = apps.get_model('knifestore', 'StockMovement')
+    LowStockAlert = apps.get_model('knifestore', 'LowStockAlert')
+    movements, alerts = [], []
+    for knife_id, quantity, reorder_level in Stock.objects.order_by('knife_id').values_list(
+            'knife_id', 'quantity', 'reorder_level').iterator():
+        if quantity:
+            movements.append(StockMovement(
+                knife_id=knife_id, kind='adjustment', delta=quantity, balance_after=quantity,
+                note='Начальный остаток',
+            ))
+        if quantity <= reorder_level:
+            alerts.append(LowStockAlert(knife_id=knife_id, quantity=quantity, threshold=reorder_level))
+    StockMovement.objects.bulk_create(movements, batch_size=1000)
+    LowStockAlert.objects.bulk_create(alerts, batch_size=1000)
+
+
+def remove_opening_balances(apps, schema_editor):
+    apps.get_model('knifestore', 'StockMovement').objects.filter(note='Начальный остаток').delete()
+    apps.get_model('knifestore', 'LowStockAlert').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('knifestore', '0007_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(opening_balances, remove_opening_balances),
+    ]
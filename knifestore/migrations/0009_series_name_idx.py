@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 19:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('knifestore', '0008_stock_opening_balances'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='series',
+            index=models.Index(fields=['last_name', 'first_name'], name='series_name_idx'),
+        ),
+    ]
@@ -15,6 +15,39 @@ class Category(models.Model):
         blank=True,
         help_text="Необязательное поле"
     )
+    # Агрегаты по ножам (knifestore/aggregates.py): ведутся сигналами Knife и Stock,
+    # сверка — команда check_catalog_aggregates
+    knife_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество ножей"
+    )
+    min_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        editable=False,
+        verbose_name="Минимальная цена"
+    )
+    avg_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        editable=False,
+        verbose_name="Средняя цена"
+    )
+    max_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        editable=False,
+        verbose_name="Максимальная цена"
+    )
+    in_stock_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Ножей в наличии"
+    )
     
     class Meta:
         verbose_name = "Категория"
@@ -44,6 +77,39 @@ class Brand(models.Model):
         null=True,
         blank=True
     )
+    # Агрегаты по ножам (knifestore/aggregates.py): ведутся сигналами Knife и Stock,
+    # сверка — команда check_catalog_aggregates
+    knife_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество ножей"
+    )
+    min_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        editable=False,
+        verbose_name="Минимальная цена"
+    )
+    avg_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        editable=False,
+        verbose_name="Средняя цена"
+    )
+    max_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        editable=False,
+        verbose_name="Максимальная цена"
+    )
+    in_stock_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Ножей в наличии"
+    )
     
     class Meta:
         verbose_name = "Бренд"
@@ -84,6 +150,10 @@ class Series(models.Model):
                 name='unique_designer'
             )
         ]
+        indexes = [
+            # Порядок списка и подсказки «Фамилия Имя» по префиксу
+            models.Index(fields=['last_name', 'first_name'], name='series_name_idx'),
+        ]
         
     def __str__(self):
         return f"{self.last_name} {self.first_name}"
@@ -187,6 +257,19 @@ class Knife(models.Model):
         null=True,
         blank=True
     )
+    # Заполняются воркером изображений (knifestore.images) после генерации производных
+    image_hash = models.CharField(
+        max_length=20,
+        blank=True,
+        editable=False,
+        verbose_name="Хэш содержимого фото"
+    )
+    image_width = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Ширина исходного фото"
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name="Дата создания записи"
@@ -204,6 +287,13 @@ class Knife(models.Model):
             models.Index(fields=['title'], name='knife_title_idx'),
             models.Index(fields=['price'], name='knife_price_idx'),
             models.Index(fields=['release_date'], name='knife_release_date_idx'),
+            # Составные индексы под фильтры каталога (фасет + сортировка по цене)
+            models.Index(fields=['steel', 'price'], name='knife_steel_price_idx'),
+            models.Index(fields=['purpose', 'price'], name='knife_purpose_price_idx'),
+            models.Index(fields=['handle_material', 'price'], name='knife_handle_price_idx'),
+            models.Index(fields=['blade_length_mm', 'price'], name='knife_blade_price_idx'),
+            models.Index(fields=['category', 'price'], name='knife_category_price_idx'),
+            models.Index(fields=['publisher', 'price'], name='knife_publisher_price_idx'),
         ]
         
     def __str__(self):
@@ -262,13 +352,17 @@ class Order(models.Model):
     order_date = models.DateTimeField(auto_now_add=True)  # Это поле было пропущено
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='new')
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Скидки акций при оформлении (basket.pricing): total_amount = сумма позиций - discount_amount
+    discount_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     shipping_address = models.TextField()
+    # Идемпотентный ключ оформления: повторная отправка формы не создаёт второй заказ
+    checkout_token = models.UUIDField(null=True, blank=True, unique=True, editable=False)
     
     def update_total(self):
-        self.total_amount = sum(
-            item.quantity * item.price 
-            for item in self.items.all()
-        )
+        total = self.items.aggregate(
+            total=models.Sum(models.F('quantity') * models.F('price'))
+        )['total']
+        self.total_amount = max((total or 0) - self.discount_amount, 0)
         self.save(update_fields=['total_amount'])
     
     def __str__(self):
@@ -299,6 +393,11 @@ class Stock(models.Model):
         auto_now=True,
         verbose_name="Последнее пополнение"
     )
+    reorder_level = models.PositiveIntegerField(
+        default=5,
+        verbose_name="Порог дозаказа",
+        help_text="При остатке не выше порога нож попадает в очередь дозаказа"
+    )
     
     class Meta:
         verbose_name = "Складской остаток"
@@ -306,4 +405,138 @@ class Stock(models.Model):
         ordering = ['-last_restocked']
         
     def __str__(self):
-        return f"{self.knife.title}: {self.quantity} шт."
\ No newline at end of file
+        return f"{self.knife.title}: {self.quantity} шт."
+
+
+class StockMovement(models.Model):
+    """Журнал движений склада: записи только добавляются, остаток — их сумма"""
+    RECEIPT = 'receipt'
+    SALE = 'sale'
+    RETURN = 'return'
+    ADJUSTMENT = 'adjustment'
+    KIND_CHOICES = [
+        (RECEIPT, 'Поступление'),
+        (SALE, 'Продажа'),
+        (RETURN, 'Возврат'),
+        (ADJUSTMENT, 'Корректировка'),
+    ]
+
+    knife = models.ForeignKey(
+        Knife,
+        on_delete=models.CASCADE,
+        related_name='stock_movements',
+        verbose_name="Нож"
+    )
+    kind = models.CharField(
+        max_length=20,
+        choices=KIND_CHOICES,
+        verbose_name="Тип движения"
+    )
+    delta = models.IntegerField(
+        verbose_name="Изменение"
+    )
+    balance_after = models.IntegerField(
+        verbose_name="Остаток после"
+    )
+    order = models.ForeignKey(
+        'Order',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='stock_movements',
+        verbose_name="Заказ"
+    )
+    user = models.ForeignKey(
+        'auth.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        verbose_name="Пользователь"
+    )
+    note = models.CharField(
+        max_length=200,
+        blank=True,
+        verbose_name="Комментарий"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Время"
+    )
+
+    class Meta:
+        verbose_name = "Движение склада"
+        verbose_name_plural = "Движения склада"
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['knife', 'id'], name='stock_movement_knife_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.delta:+d}: {self.knife_id}"
+
+
+class LowStockAlert(models.Model):
+    """Очередь дозаказа: открыта, пока остаток не выше порога"""
+    knife = models.ForeignKey(
+        Knife,
+        on_delete=models.CASCADE,
+        related_name='low_stock_alerts',
+        verbose_name="Нож"
+    )
+    quantity = models.IntegerField(
+        verbose_name="Остаток при срабатывании"
+    )
+    threshold = models.PositiveIntegerField(
+        verbose_name="Порог"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Создано"
+    )
+    resolved_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Закрыто"
+    )
+
+    class Meta:
+        verbose_name = "Низкий остаток"
+        verbose_name_plural = "Очередь дозаказа"
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['resolved_at', 'knife'], name='low_stock_open_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.knife_id}: {self.quantity} <= {self.threshold}"
+
+
+class SearchToken(models.Model):
+    """Инвертированный индекс полнотекстового поиска: терм -> нож"""
+    token = models.CharField(
+        max_length=64,
+        verbose_name="Терм"
+    )
+    knife = models.ForeignKey(
+        Knife,
+        on_delete=models.CASCADE,
+        related_name='search_tokens',
+        verbose_name="Нож"
+    )
+    weight = models.PositiveSmallIntegerField(
+        default=1,
+        verbose_name="Вес"
+    )
+
+    class Meta:
+        verbose_name = "Поисковый терм"
+        verbose_name_plural = "Поисковый индекс"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['token', 'knife'],
+                name='unique_search_token'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.token} -> {self.knife_id}"
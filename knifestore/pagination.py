@@ -0,0 +1,223 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+
+class InvalidCursor(Exception):
+    """Курсор не удалось разобрать или он не подходит к сортировке"""
+
+
+def encode_cursor(payload):
+    raw = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, binascii.Error, UnicodeError):
+        raise InvalidCursor(cursor)
+    if not isinstance(payload, dict) or payload.get('d') not in ('n', 'p'):
+        raise InvalidCursor(cursor)
+    return payload
+
+
+class KeysetPage:
+    """Страница keyset-пагинации: вместо номера хранит курсоры соседних страниц"""
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<KeysetPage {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Seek-пагинация по уникальному ключу сортировки, например ('title', 'id').
+
+    Страница N выбирается условием WHERE (price, id) > (:price, :id) и LIMIT,
+    поэтому её стоимость не зависит от глубины. Поля ключа должны быть NOT NULL,
+    а последнее поле — уникальным (обычно первичный ключ).
+    """
+
+    def __init__(self, queryset, per_page, ordering=('title', 'id'), with_count=True):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.with_count = with_count
+        self._fields = []
+        annotations = queryset.query.annotations
+        for name in self.ordering:
+            descending = name.startswith('-')
+            field_name = name.lstrip('-')
+            if field_name in annotations:
+                # Аннотация (например, ранг поиска) — значение берём с объекта по имени
+                field, attr = annotations[field_name].output_field, field_name
+            else:
+                try:
+                    field = queryset.model._meta.get_field(field_name)
+                except FieldDoesNotExist:
+                    raise ValueError(f'Неизвестное поле сортировки: {field_name}')
+                attr = field.attname
+            self._fields.append((field_name, field, attr, descending))
+
+    @property
+    def count(self):
+        """Общее число объектов; None в режиме без подсчёта"""
+        if not self.with_count:
+            return None
+        if not hasattr(self, '_count'):
+            self._count = self.queryset.count()
+        return self._count
+
+    def _values(self, obj):
+        return [str(getattr(obj, attr)) for _, _, attr, _ in self._fields]
+
+    def _seek(self, values, forward):
+        try:
+            values = [field.to_python(value) for (_, field, _, _), value in zip(self._fields, values)]
+        except ValidationError:
+            raise InvalidCursor(values)
+
+        condition = Q()
+        for index, (name, _, _, descending) in enumerate(self._fields):
+            lookup = 'lt' if descending == forward else 'gt'
+            branch = Q(**{f'{name}__{lookup}': values[index]})
+            for prev_index in range(index):
+                branch &= Q(**{self._fields[prev_index][0]: values[prev_index]})
+            condition |= branch
+        return condition
+
+    def _order_by(self, forward):
+        if forward:
+            return self.ordering
+        return tuple(name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering)
+
+    def _page_queryset(self, cursor):
+        """(queryset страницы с запасом в одну строку, направление)"""
+        forward = True
+        queryset = self.queryset
+        if cursor:
+            payload = decode_cursor(cursor)
+            values = payload.get('k')
+            if payload.get('o') != list(self.ordering) or not isinstance(values, list) \
+                    or len(values) != len(self._fields):
+                raise InvalidCursor(cursor)
+            forward = payload['d'] == 'n'
+            queryset = queryset.filter(self._seek(values, forward))
+        return queryset.order_by(*self._order_by(forward))[:self.per_page + 1], forward
+
+    def _make_page(self, rows, cursor, forward):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        # Идём вперёд: «назад» есть, если пришли по курсору; и наоборот
+        has_next = has_more if forward else bool(cursor)
+        has_previous = bool(cursor) if forward else has_more
+
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor({'o': list(self.ordering), 'd': 'n', 'k': self._values(rows[-1])})
+        if rows and has_previous:
+            previous_cursor = encode_cursor({'o': list(self.ordering), 'd': 'p', 'k': self._values(rows[0])})
+        return KeysetPage(rows, self, next_cursor, previous_cursor)
+
+    def page(self, cursor=None):
+        queryset, forward = self._page_queryset(cursor)
+        return self._make_page(list(queryset), cursor, forward)
+
+    async def apage(self, cursor=None):
+        """То же для async-представлений: строки читаются через async for"""
+        queryset, forward = self._page_queryset(cursor)
+        return self._make_page([obj async for obj in queryset], cursor, forward)
+
+
+class KeysetPaginationMixin:
+    """
+    Подмена стандартной OFFSET-пагинации ListView на keyset.
+
+    Сортировка выбирается параметром ?sort= из keyset_orderings, позиция —
+    непрозрачным курсором ?cursor=. При keyset_with_count = False COUNT(*)
+    не выполняется вовсе.
+    """
+    keyset_orderings = {
+        'title': ('title', 'id'),
+    }
+    keyset_default = 'title'
+    keyset_with_count = True
+    cursor_kwarg = 'cursor'
+    sort_kwarg = 'sort'
+
+    def get_keyset_key(self):
+        key = self.request.GET.get(self.sort_kwarg)
+        return key if key in self.keyset_orderings else self.keyset_default
+
+    def get_keyset_ordering(self):
+        return self.keyset_orderings[self.get_keyset_key()]
+
+    keyset_page = None
+
+    def get_keyset_paginator(self, queryset, page_size):
+        return KeysetPaginator(
+            queryset,
+            page_size,
+            ordering=self.get_keyset_ordering(),
+            with_count=self.keyset_with_count,
+        )
+
+    async def aload_keyset_page(self, queryset, page_size):
+        """Async-вариант представления выбирает страницу заранее; paginate_queryset её берёт готовой"""
+        try:
+            self.keyset_page = await self.get_keyset_paginator(queryset, page_size).apage(
+                self.request.GET.get(self.cursor_kwarg),
+            )
+        except InvalidCursor:
+            raise Http404('Некорректный курсор страницы')
+        return self.keyset_page
+
+    def paginate_queryset(self, queryset, page_size):
+        page = self.keyset_page
+        if page is None:
+            try:
+                page = self.get_keyset_paginator(queryset, page_size).page(self.request.GET.get(self.cursor_kwarg))
+            except InvalidCursor:
+                raise Http404('Некорректный курсор страницы')
+        return page.paginator, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Параметры фильтров без курсора — для ссылок «вперёд/назад»
+        query = self.request.GET.copy()
+        query.pop(self.cursor_kwarg, None)
+        context['query_string'] = query.urlencode()
+        context['sort'] = self.get_keyset_key()
+        return context
@@ -0,0 +1,75 @@
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Представление выполнило больше SQL-запросов, чем заявлено в query_budget"""
+
+
+def apply_query_plan(queryset, select_related=(), prefetch_related=(), only_fields=None, annotations=None):
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+    if annotations:
+        queryset = queryset.annotate(**annotations)
+    if only_fields:
+        queryset = queryset.only(*only_fields)
+    return queryset
+
+
+def format_queries(captured):
+    return '\n'.join(
+        f'{index}. {query["sql"]}' for index, query in enumerate(captured.captured_queries, 1)
+    )
+
+
+@contextmanager
+def assert_max_queries(budget, using='default', label='блок'):
+    """Для тестов: with assert_max_queries(5): client.get(url)"""
+    with CaptureQueriesContext(connections[using]) as captured:
+        yield captured
+    if len(captured) > budget:
+        raise QueryBudgetExceeded(
+            f'{label}: {len(captured)} запросов при бюджете {budget}\n{format_queries(captured)}'
+        )
+
+
+class QueryPlanMixin:
+    """
+    Декларативный план загрузки связей для ListView/DetailView.
+
+    Представление перечисляет нужные шаблону связи (select_related,
+    prefetch_related), агрегаты и поля (only_fields), а get_queryset
+    применяет их в одном месте. query_budget — сколько SQL-запросов
+    допускается на страницу вместе с рендерингом шаблона; при
+    QUERY_BUDGET_ENFORCE = True (в тестах) превышение роняет запрос.
+    """
+    select_related = ()
+    prefetch_related = ()
+    only_fields = None
+    annotations = None
+    query_budget = None
+
+    def get_queryset(self):
+        return apply_query_plan(
+            super().get_queryset(),
+            select_related=self.select_related,
+            prefetch_related=self.prefetch_related,
+            only_fields=self.only_fields,
+            annotations=self.annotations,
+        )
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.query_budget is None or not getattr(settings, 'QUERY_BUDGET_ENFORCE', False):
+            return super().dispatch(request, *args, **kwargs)
+
+        with assert_max_queries(self.query_budget, label=type(self).__name__):
+            response = super().dispatch(request, *args, **kwargs)
+            # TemplateResponse рендерится лениво — считаем и запросы шаблона
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        return response
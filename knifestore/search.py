@@ -0,0 +1,215 @@
+import re
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, ExpressionWrapper, F, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Length
+
+from .models import Knife, SearchToken
+
+# Вес терма зависит от поля, в котором он встретился
+FIELD_WEIGHTS = {
+    'title': 10,
+    'steel': 6,
+    'brand': 5,
+    'series': 4,
+    'handle_material': 3,
+    'description': 1,
+}
+
+# Множители совпадения (в десятых): точное, по префиксу, с опечаткой
+EXACT, PREFIX, FUZZY = 10, 6, 4
+
+MIN_TOKEN_LENGTH = 2
+MAX_TOKEN_LENGTH = 64
+MAX_QUERY_WORDS = 8
+SEARCH_LIMIT = 200
+
+# Полнота совпадения старше суммы весов: 8 слов * 32767 * EXACT < COVERAGE
+COVERAGE = 10 ** 7
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def normalize(text):
+    return (text or '').casefold().replace('ё', 'е')
+
+
+def tokenize(text):
+    return [
+        token[:MAX_TOKEN_LENGTH]
+        for token in TOKEN_RE.findall(normalize(text))
+        if len(token) >= MIN_TOKEN_LENGTH or token.isdigit()
+    ]
+
+
+def knife_documents(knife):
+    """Текстовые поля ножа для индексации (бренд и серии — через связи)"""
+    yield 'title', knife.title
+    yield 'steel', knife.steel
+    yield 'handle_material', knife.handle_material
+    yield 'description', knife.description
+    if knife.publisher:
+        yield 'brand', knife.publisher.name
+    for series in knife.designers.all():
+        yield 'series', f'{series.first_name} {series.last_name}'
+
+
+def knife_terms(knife):
+    terms = {}
+    for field, text in knife_documents(knife):
+        for token in tokenize(text):
+            terms[token] = min(terms.get(token, 0) + FIELD_WEIGHTS[field], 32767)
+    return terms
+
+
+def index_knives(knife_ids, batch_size=500):
+    """Переиндексировать указанные ножи; удалённые просто выпадают из индекса"""
+    knife_ids = list(knife_ids)
+    knives = (
+        Knife.objects.filter(pk__in=knife_ids)
+        .select_related('publisher')
+        .prefetch_related('designers')
+    )
+    tokens = [
+        SearchToken(knife=knife, token=token, weight=weight)
+        for knife in knives
+        for token, weight in knife_terms(knife).items()
+    ]
+    with transaction.atomic():
+        SearchToken.objects.filter(knife_id__in=knife_ids).delete()
+        SearchToken.objects.bulk_create(tokens, batch_size=batch_size)
+    return len(tokens)
+
+
+def edit_distance(a, b, limit):
+    """Расстояние Дамерау–Левенштейна (OSA) с отсечкой: больше limit — limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cost = 0 if ca == cb else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def typo_limit(token):
+    if len(token) < 4:
+        return 0
+    return 1 if len(token) < 8 else 2
+
+
+def expand_token(token):
+    """Термы индекса, подходящие под слово запроса, с множителем совпадения"""
+    matches = {}
+    limit = typo_limit(token)
+    condition = Q(token__startswith=token)
+    if limit:
+        # Опечатку ищем среди термов с тем же началом и близкой длины
+        condition |= Q(
+            token__startswith=token[:2],
+            token_length__range=(len(token) - limit, len(token) + limit),
+        )
+    candidates = SearchToken.objects.annotate(token_length=Length('token')).filter(condition)
+
+    for term in candidates.values_list('token', flat=True).distinct():
+        if term == token:
+            matches[term] = EXACT
+        elif term.startswith(token):
+            matches[term] = PREFIX
+        elif edit_distance(token, term, limit) <= limit:
+            matches[term] = FUZZY
+    return matches
+
+
+def word_score(expansion):
+    """Лучший вес ножа по одному слову запроса (коррелированный подзапрос)"""
+    multipliers = defaultdict(list)
+    for term, multiplier in expansion.items():
+        multipliers[multiplier].append(term)
+    score = Case(
+        *[
+            When(token__in=terms, then=F('weight') * multiplier)
+            for multiplier, terms in sorted(multipliers.items(), reverse=True)
+        ],
+        output_field=IntegerField(),
+    )
+    best = (
+        SearchToken.objects.filter(knife=OuterRef('pk'), token__in=list(expansion))
+        .annotate(score=score)
+        .order_by('-score')
+        .values('score')[:1]
+    )
+    return Coalesce(Subquery(best, output_field=IntegerField()), Value(0))
+
+
+def rank_queryset(queryset, query):
+    """
+    Отфильтровать queryset по запросу и добавить search_rank (меньше — лучше).
+
+    Ранжирование целиком в SQL, поэтому фильтры и срез страницы, наложенные
+    на queryset до или после, сужают уже ранжированный набор, а не топ
+    всего каталога. Ножи, совпавшие со всеми словами запроса, идут раньше
+    совпавших частично; внутри группы — по сумме весов полей.
+    """
+    words = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_WORDS]
+    expansions = [expansion for expansion in map(expand_token, words) if expansion]
+    if not expansions:
+        return queryset.none().annotate(search_rank=Value(0, output_field=IntegerField()))
+
+    all_terms = set().union(*expansions)
+    queryset = queryset.filter(
+        pk__in=SearchToken.objects.filter(token__in=all_terms).values('knife_id'),
+    ).alias(**{f'search_word_{number}': word_score(expansion) for number, expansion in enumerate(expansions)})
+
+    coverage = score = Value(0)
+    for number in range(len(expansions)):
+        word = F(f'search_word_{number}')
+        coverage = coverage + Case(When(**{f'search_word_{number}__gt': 0}, then=Value(1)), default=Value(0))
+        score = score + word
+    return queryset.annotate(search_rank=ExpressionWrapper(
+        -(coverage * COVERAGE + score), output_field=IntegerField(),
+    ))
+
+
+def search_knives(query, limit=SEARCH_LIMIT):
+    """Ранжированный поиск по всему каталогу: список (id ножа, search_rank) от лучшего"""
+    return list(
+        rank_queryset(Knife.objects.all(), query)
+        .order_by('search_rank', 'pk')
+        .values_list('pk', 'search_rank')[:limit]
+    )
+
+
+class KnifeSearchMixin:
+    """Поиск ?q= в каталоге; при поиске по умолчанию сортируем по релевантности"""
+    search_kwarg = 'q'
+
+    def get_search_query(self):
+        return self.request.GET.get(self.search_kwarg, '').strip()
+
+    def apply_search(self, queryset):
+        query = self.get_search_query()
+        if query:
+            queryset = rank_queryset(queryset, query)
+        return queryset
+
+    def get_keyset_key(self):
+        searching = bool(self.get_search_query())
+        if searching and self.request.GET.get(self.sort_kwarg) in (None, '', 'relevance'):
+            return 'relevance'
+        key = super().get_keyset_key()
+        return self.keyset_default if key == 'relevance' else key
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['search_query'] = self.get_search_query()
+        return context
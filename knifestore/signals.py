@@ -0,0 +1,184 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import aggregates, images, inventory
+from .invalidation import bump_on_commit, knife_scopes, stock_bulk_changed
+from .models import Brand, Category, Knife, LowStockAlert, Series, Stock, StockMovement
+from .search import index_knives
+
+
+def reindex_on_commit(knife_ids):
+    knife_ids = list(knife_ids)
+    if knife_ids:
+        transaction.on_commit(lambda: index_knives(knife_ids))
+
+
+def knives_bulk_changed(knife_ids, category_ids=(), brand_ids=(), series_ids=()):
+    """
+    Те же реакции, что у сигналов, для массовых записей в обход save()
+    (bulk_create, bulk_update, QuerySet.update): переиндексация и сброс кэша.
+    """
+    knife_ids = list(knife_ids)
+    reindex_on_commit(knife_ids)
+    bump_on_commit(
+        'knife',
+        *knife_scopes(knife_ids),
+        *[f'category:{pk}' for pk in set(category_ids) if pk],
+        *[f'brand:{pk}' for pk in set(brand_ids) if pk],
+        *[f'series:{pk}' for pk in set(series_ids) if pk],
+    )
+    aggregates.refresh_aggregates(category_ids, brand_ids)
+
+
+def relations_bulk_changed(instances):
+    """Массовое изменение брендов, категорий или серий — как их post_save, одним запросом"""
+    instances = list(instances)
+    if not instances:
+        return
+    scope = instances[0]._meta.model_name
+    lookup = {'brand': 'publisher', 'category': 'category', 'series': 'designers'}[scope]
+    knife_ids = list(
+        Knife.objects.filter(**{f'{lookup}__in': instances}).values_list('pk', flat=True).distinct()
+    )
+    if scope != 'category':
+        # Названия брендов и серий входят в поисковый индекс
+        reindex_on_commit(knife_ids)
+    bump_on_commit(scope, *instances, *knife_scopes(knife_ids))
+
+
+@receiver(pre_save, sender=Knife)
+def knife_remember_relations(sender, instance, raw=False, **kwargs):
+    # Старые категория и бренд: их страницы тоже нужно сбросить при переносе ножа
+    instance._previous_relations = ()
+    instance._image_changed = bool(instance.image)
+    instance._aggregates_changed = True
+    if not raw and instance.pk:
+        previous = Knife.objects.filter(pk=instance.pk).values_list(
+            'category_id', 'publisher_id', 'image', 'price',
+        ).first()
+        if previous:
+            instance._previous_relations = previous[:2]
+            instance._image_changed = (previous[2] or '') != (instance.image.name or '')
+            # Агрегаты категории и бренда зависят только от связи и цены
+            instance._aggregates_changed = (
+                previous[:2] != (instance.category_id, instance.publisher_id) or previous[3] != instance.price
+            )
+    if not raw and instance._image_changed:
+        # Производные старого фото больше не подходят — до конца обработки шаблоны берут оригинал
+        instance.image_hash = ''
+        instance.image_width = None
+
+
+def knife_relation_ids(instance):
+    category_ids = {instance.category_id}
+    brand_ids = {instance.publisher_id}
+    previous = getattr(instance, '_previous_relations', ())
+    if previous:
+        category_ids.add(previous[0])
+        brand_ids.add(previous[1])
+    return category_ids, brand_ids
+
+
+def knife_relation_scopes(instance):
+    category_ids, brand_ids = knife_relation_ids(instance)
+    return [f'category:{pk}' for pk in category_ids if pk] + [f'brand:{pk}' for pk in brand_ids if pk]
+
+
+@receiver(post_save, sender=Knife)
+def knife_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        reindex_on_commit([instance.pk])
+        bump_on_commit('knife', instance, *knife_relation_scopes(instance))
+        if getattr(instance, '_aggregates_changed', True):
+            aggregates.refresh_aggregates(*knife_relation_ids(instance))
+        if instance.image and getattr(instance, '_image_changed', False):
+            knife_id = instance.pk
+            transaction.on_commit(lambda: images.worker.enqueue(knife_id))
+
+
+@receiver(post_delete, sender=Knife)
+def knife_deleted(sender, instance, **kwargs):
+    bump_on_commit('knife', instance, *knife_relation_scopes(instance))
+    aggregates.refresh_aggregates(*knife_relation_ids(instance))
+
+
+@receiver(pre_save, sender=Stock)
+def stock_remember_quantity(sender, instance, raw=False, **kwargs):
+    instance._previous_quantity = 0
+    if not raw and instance.pk:
+        instance._previous_quantity = Stock.objects.filter(pk=instance.pk).values_list('quantity', flat=True).first() or 0
+
+
+@receiver(post_save, sender=Stock)
+def stock_saved(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    # Правка остатка через save() (админка, API): в журнал — корректировкой,
+    # чтобы сумма движений по-прежнему совпадала с остатком
+    delta = instance.quantity - getattr(instance, '_previous_quantity', 0)
+    if delta:
+        StockMovement.objects.create(
+            knife_id=instance.knife_id,
+            kind=StockMovement.ADJUSTMENT,
+            delta=delta,
+            balance_after=instance.quantity,
+            note='Новая запись склада' if created else 'Правка остатка',
+        )
+    inventory.evaluate_alerts([(instance.knife_id, instance.quantity, instance.reorder_level)])
+    # Остаток влияет на «в наличии» у категории и бренда ножа
+    stock_bulk_changed([instance.knife_id])
+
+
+@receiver(post_delete, sender=Stock)
+def stock_deleted(sender, instance, **kwargs):
+    # Нож больше не учитывается складом — и в очереди дозаказа ему не место
+    LowStockAlert.objects.filter(knife_id=instance.knife_id, resolved_at__isnull=True).update(resolved_at=timezone.now())
+    stock_bulk_changed([instance.knife_id])
+
+
+@receiver(m2m_changed, sender=Knife.designers.through)
+def knife_designers_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        knife_ids = [instance.pk]
+        series_scopes = [f'series:{pk}' for pk in pk_set or ()]
+    else:
+        # post_clear со стороны серии: pk_set пуст, затронуты все её ножи
+        knife_ids = list(pk_set) if pk_set else list(instance.knifes.values_list('pk', flat=True))
+        series_scopes = [instance]
+    reindex_on_commit(knife_ids)
+    bump_on_commit('knife', 'series', *series_scopes, *knife_scopes(knife_ids))
+
+
+# Для удаления используем pre_delete: после него связи ножей уже обнулены
+@receiver(post_save, sender=Brand)
+@receiver(pre_delete, sender=Brand)
+def brand_changed(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    knife_ids = [] if created else list(instance.knifes.values_list('pk', flat=True))
+    reindex_on_commit(knife_ids)
+    # Название бренда выводится на страницах его ножей
+    bump_on_commit('brand', instance, *knife_scopes(knife_ids))
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def category_changed(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    knife_ids = [] if created else list(instance.knifes.values_list('pk', flat=True))
+    bump_on_commit('category', instance, *knife_scopes(knife_ids))
+
+
+@receiver(post_save, sender=Series)
+@receiver(pre_delete, sender=Series)
+def series_changed(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    knife_ids = [] if created else list(instance.knifes.values_list('pk', flat=True))
+    reindex_on_commit(knife_ids)
+    bump_on_commit('series', instance, *knife_scopes(knife_ids))
@@ -0,0 +1,43 @@
+from django import template
+
+from knifestore.cache import cache_timeout, catalog_cache, make_key, record
+
+register = template.Library()
+
+
+class CatalogCacheNode(template.Node):
+    def __init__(self, nodelist, name, scopes):
+        self.nodelist = nodelist
+        self.name = name
+        self.scopes = scopes
+
+    def render(self, context):
+        scopes = [scope.resolve(context) for scope in self.scopes]
+        cache = catalog_cache()
+        key = make_key('fragment', self.name, [scope for scope in scopes if scope])
+        value = cache.get(key)
+        record('fragment', value is not None)
+        if value is None:
+            value = self.nodelist.render(context)
+            cache.set(key, value, cache_timeout())
+        return value
+
+
+@register.tag('catalog_cache')
+def do_catalog_cache(parser, token):
+    """
+    Кэш фрагмента шаблона с версиями каталога:
+
+        {% catalog_cache "knife_card" knife %} ... {% endcatalog_cache %}
+
+    Аргументы после имени — объекты моделей (версия конкретной записи) или
+    строки вроде "knife" (версия всего списка). Фрагмент сбрасывается, как
+    только сигнал поднимет версию любой из них.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' требует имя фрагмента")
+    name = bits[1].strip('"\'')
+    nodelist = parser.parse(('endcatalog_cache',))
+    parser.delete_first_token()
+    return CatalogCacheNode(nodelist, name, [parser.compile_filter(bit) for bit in bits[2:]])
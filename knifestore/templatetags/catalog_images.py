@@ -0,0 +1,41 @@
+from django import template
+from django.utils.html import format_html
+
+from knifestore.images import knife_variants
+
+register = template.Library()
+
+DEFAULT_SIZES = '(max-width: 576px) 100vw, (max-width: 992px) 50vw, 33vw'
+
+
+def srcset(variants):
+    return ', '.join(f'{url} {width}w' for url, width in variants)
+
+
+@register.simple_tag
+def knife_srcset(knife, ext='jpg'):
+    """Атрибут srcset из готовых производных: <img srcset="{% knife_srcset knife %}">"""
+    return srcset(knife_variants(knife, ext))
+
+
+@register.simple_tag
+def knife_picture(knife, css_class='', sizes=DEFAULT_SIZES):
+    """
+    <picture> с WebP и JPEG разных ширин; браузер сам выбирает файл по sizes.
+
+    Пока воркер не построил производные, выводится исходное фото.
+    """
+    if not knife.image:
+        return ''
+    jpeg = knife_variants(knife, 'jpg')
+    if not jpeg:
+        return format_html(
+            '<img src="{}" class="{}" alt="{}" loading="lazy">', knife.image.url, css_class, knife.title,
+        )
+    webp = knife_variants(knife, 'webp')
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" class="{}" alt="{}" loading="lazy" decoding="async"></picture>',
+        srcset(webp), sizes,
+        jpeg[0][0], srcset(jpeg), sizes, css_class, knife.title,
+    )
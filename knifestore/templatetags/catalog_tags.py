@@ -0,0 +1,40 @@
+from django import template
+from django.utils import timezone
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+BESTSELLER_PRICE = 3000
+
+
+def render_today(context):
+    """Текущая дата — одна на весь рендеринг страницы, а не на каждую строку"""
+    today = context.render_context.get('catalog_today')
+    if today is None:
+        today = context.render_context['catalog_today'] = timezone.localdate()
+    return today
+
+
+@register.simple_tag(takes_context=True)
+def knife_tags(context, knife):
+    """
+    Значки строки каталога: «Новинка» (дата выпуска ещё не наступила) и
+    «Бестселлер» (дешевле BESTSELLER_PRICE). Замена {% include %} на каждую
+    строку: без поиска шаблона и push контекста.
+    """
+    badges = []
+    if knife.release_date and knife.release_date > render_today(context):
+        badges.append(('bg-success', 'Новинка'))
+    if knife.price is not None and knife.price < BESTSELLER_PRICE:
+        badges.append(('bg-warning', 'Бестселлер'))
+    return format_html(
+        '<div class="knife-tags">{}</div>',
+        format_html_join('', '<span class="badge {}">{}</span>', badges),
+    )
+
+
+@register.simple_tag
+def category_badge(category):
+    if category is None:
+        return ''
+    return format_html('<span class="badge bg-info text-dark">{}</span>', category.name)
@@ -1,3 +1,577 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from basket.checkout import place_order
+
+from . import images
+from .aggregates import find_mismatches
+from .async_views import AsyncCategoryDetailView, AsyncKnifeDetailView, AsyncKnifeStoreView
+from .catalog_io import export_rows
+from .images import DERIVED_ROOT, build_variants, plan_variants, process_knife, variant_path
+from .inventory import reconcile, set_quantity
+from .models import Brand, Category, Customer, Knife, LowStockAlert, Series, Stock, StockMovement
+from .queryplan import assert_max_queries
+from .search import index_knives
+from .views import (
+    BrandDetailView, BrandListView, CategoryDetailView, CategoryListView, CustomerListView, KnifeDetailView,
+    KnifeListView, KnifeStoreView, OrderDetailView, OrderListView, StockListView,
+)
+
+
+def make_catalog(count, quantity=10):
+    """count ножей в двух категориях и двух брендах, у каждого склад quantity (через журнал)"""
+    categories = [Category.objects.create(name=f'Категория {number}') for number in range(2)]
+    brands = [Brand.objects.create(name=f'Бренд {number}', country='Япония') for number in range(2)]
+    series = Series.objects.create(first_name='Серия', last_name='Тестовая')
+    knives = []
+    for number in range(count):
+        knife = Knife.objects.create(
+            title=f'Нож {number:03}',
+            description='Описание',
+            category=categories[number % 2],
+            publisher=brands[number % 2],
+            min_players=1, max_players=2, play_time=10, age_rating=18,
+            release_date=datetime.date(2024, 1, 1),
+            price=Decimal('1000.00') + number,
+            steel=('VG-10', 'AUS-8')[number % 2],
+            blade_length_mm=180 + number % 3 * 30,
+            purpose=('CHEF', 'SANTOKU')[number % 2],
+            edge_angle_deg=15,
+            handle_material='Дерево',
+        )
+        knife.designers.add(series)
+        Stock.objects.create(knife=knife, quantity=quantity)
+        knives.append(knife)
+    return knives
+
+
+class StockLedgerTests(TestCase):
+    """Сумма журнала StockMovement совпадает с Stock.quantity после любого пути записи"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.knives = make_catalog(3)
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        cls.customer = Customer.objects.create(user=cls.admin)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def quantity(self, knife):
+        return Stock.objects.get(knife=knife).quantity
+
+    def assertReconciled(self):
+        self.assertEqual(reconcile(), [])
+
+    def test_checkout(self):
+        knife = self.knives[0]
+        place_order(self.customer, [(knife.pk, 7)], 'Адрес')
+        self.assertEqual(self.quantity(knife), 3)
+        self.assertTrue(StockMovement.objects.filter(knife=knife, kind=StockMovement.SALE, delta=-7).exists())
+        self.assertTrue(LowStockAlert.objects.filter(knife=knife, resolved_at__isnull=True).exists())
+        self.assertReconciled()
+
+    def test_stock_update_view(self):
+        stock = Stock.objects.get(knife=self.knives[1])
+        url = reverse('stock_update', args=[stock.pk])
+        for kind, quantity in ((StockMovement.RECEIPT, 5), (StockMovement.ADJUSTMENT, 2), (StockMovement.RETURN, 1)):
+            response = self.client.post(url, {'kind': kind, 'quantity': quantity, 'reorder_level': 5, 'note': ''})
+            self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.quantity(self.knives[1]), 3)
+        self.assertReconciled()
+
+    def test_bulk_api(self):
+        stocks = list(Stock.objects.filter(knife__in=self.knives[:2]).order_by('knife_id'))
+        response = self.client.patch(
+            '/api/stocks/bulk/',
+            json.dumps([{'id': stocks[0].pk, 'quantity': 0}, {'id': stocks[1].pk, 'quantity': 25}]),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([self.quantity(knife) for knife in self.knives[:2]], [0, 25])
+        self.assertTrue(LowStockAlert.objects.filter(knife=self.knives[0], resolved_at__isnull=True).exists())
+        self.assertEqual(Category.objects.get(pk=self.knives[0].category_id).in_stock_count, 1)
+        self.assertReconciled()
+
+        knife = Knife.objects.create(
+            title='Нож без склада', description='Описание', min_players=1, max_players=2, play_time=10,
+            age_rating=18, release_date=datetime.date(2024, 1, 1), price=Decimal('500.00'),
+            steel='VG-10', blade_length_mm=150, purpose='UTILITY', edge_angle_deg=15, handle_material='Пластик',
+        )
+        response = self.client.post(
+            '/api/stocks/bulk/', json.dumps([{'knife': knife.pk, 'quantity': 4}]), content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.quantity(knife), 4)
+        self.assertReconciled()
+
+
+class AggregateTests(TestCase):
+    """Колонки агрегатов Brand/Category совпадают с пересчётом с нуля после любых изменений"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.knives = make_catalog(6)
+
+    def assertAggregatesFresh(self):
+        self.assertEqual(find_mismatches(Category), [])
+        self.assertEqual(find_mismatches(Brand), [])
+
+    def test_knife_changes(self):
+        knife = self.knives[0]
+        self.assertEqual(Category.objects.get(pk=knife.category_id).knife_count, 3)
+        knife.price = Decimal('10.00')
+        knife.category = Category.objects.exclude(pk=knife.category_id).get()
+        knife.save()
+        self.assertAggregatesFresh()
+        self.assertEqual(Category.objects.get(pk=knife.category_id).min_price, Decimal('10.00'))
+
+    def test_stock_changes(self):
+        knife = self.knives[1]
+        set_quantity(knife.pk, 0, note='Тест')
+        self.assertAggregatesFresh()
+        self.assertEqual(Brand.objects.get(pk=knife.publisher_id).in_stock_count, 2)
+        Stock.objects.get(knife=self.knives[3]).delete()
+        self.assertAggregatesFresh()
+
+    def test_delete(self):
+        category_id = self.knives[2].category_id
+        Knife.objects.filter(category_id=category_id).first().delete()
+        self.knives[4].delete()
+        self.assertAggregatesFresh()
+        self.assertEqual(Category.objects.get(pk=category_id).knife_count, 1)
+
+
+class CatalogIOTests(TestCase):
+    """import_catalog восстанавливает каталог из выгрузки export_catalog без потерь"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.knives = make_catalog(5)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def run_command(self, *args):
+        stdout = io.StringIO()
+        call_command(*args, stdout=stdout, stderr=io.StringIO())
+        return stdout.getvalue()
+
+    def rows(self):
+        return sorted(export_rows(), key=lambda row: row['title'])
+
+    def test_round_trip(self):
+        before = self.rows()
+        for fmt in ('csv', 'jsonl'):
+            path = f'{self.directory}/catalog.{fmt}'
+            self.run_command('export_catalog', path)
+            Knife.objects.all().delete()
+            output = self.run_command('import_catalog', path, '--batch-size', '2')
+            self.assertIn('создано 5, обновлено 0, отклонено 0', output)
+            self.assertEqual(self.rows(), before, fmt)
+
+            # Повторный импорт обновляет те же ножи, дублей нет
+            output = self.run_command('import_catalog', path)
+            self.assertIn('создано 0, обновлено 5', output)
+            self.assertEqual(Knife.objects.count(), len(before))
+
+    def test_rejected_rows(self):
+        path = f'{self.directory}/catalog.jsonl'
+        self.run_command('export_catalog', path)
+        with open(path, encoding='utf-8') as stream:
+            rows = [json.loads(line) for line in stream]
+        rows[0].update(price='дорого')
+        rows[1].update(category='Нет такой')
+        rows[2].update(title='Новый нож', min_players=3, max_players=1)
+        rows[3].update(price='1.50')
+        with open(path, 'w', encoding='utf-8') as stream:
+            stream.writelines(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+
+        rejects = f'{self.directory}/rejects.jsonl'
+        output = self.run_command('import_catalog', path, '--rejects', rejects)
+        self.assertIn('создано 0, обновлено 2, отклонено 3', output)
+        with open(rejects, encoding='utf-8') as stream:
+            rejected = [json.loads(line) for line in stream]
+        self.assertEqual([row['line'] for row in rejected], [1, 2, 3])
+        self.assertEqual(set(rejected[0]['errors']), {'price'})
+        self.assertEqual(Knife.objects.get(title=rows[3]['title']).price, Decimal('1.50'))
+        self.assertFalse(Knife.objects.filter(title='Новый нож').exists())
+
+
+class CatalogCsrfTests(TestCase):
+    """Кэшируемые страницы каталога не хранят CSRF-токен одного клиента"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.knives = make_catalog(1)
+        cls.user = User.objects.create_user('buyer', 'buyer@example.com', 'password')
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_detail_form_for_authenticated_user_has_token(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('knife_detail', args=[self.knives[0].pk]))
+        self.assertContains(response, 'name="csrfmiddlewaretoken"')
+        self.assertNotContains(response, 'data-csrf-cookie')
+
+    def test_anonymous_pages_are_cached_without_token(self):
+        for url in (reverse('knife_detail', args=[self.knives[0].pk]), reverse('knife_store')):
+            first = self.client.get(url)
+            self.assertNotContains(first, 'csrfmiddlewaretoken" value')
+            self.assertIn('csrftoken', first.cookies)
+            # Второй клиент получает ту же страницу из кэша и свою cookie
+            second = self.client_class().get(url)
+            self.assertEqual(second.content, first.content)
+            self.assertIn('csrftoken', second.cookies)
+
+
+class AutocompleteTests(TestCase):
+    """Подсказки /autocomplete/<источник>/: префикс, лимит, сброс кэша при правках"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.knives = make_catalog(3)
+        cls.user = User.objects.create_user('buyer', 'buyer@example.com', 'password')
+
+    def setUp(self):
+        caches['default'].clear()
+        self.client.force_login(self.user)
+
+    def results(self, source, **params):
+        response = self.client.get(reverse('autocomplete', args=[source]), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_results(self):
+        # Кириллица в SQLite LIKE регистрозависима — запросы в регистре названий
+        self.assertEqual([row['text'] for row in self.results('knife', q='Нож 00')], ['Нож 000', 'Нож 001', 'Нож 002'])
+        self.assertEqual(len(self.results('knife', q='Нож', limit=2)), 2)
+        series = self.knives[0].designers.get()
+        self.assertEqual(self.results('series', q='Тест Сер'), [{'id': series.pk, 'text': 'Тестовая Серия'}])
+        self.assertEqual(self.results('knife', q=''), [])
+        self.assertEqual(self.client.get(reverse('autocomplete', args=['brand'])).status_code, 404)
+
+    def test_cache_invalidated_on_change(self):
+        self.assertEqual(len(self.results('knife', q='Нож')), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            knife = self.knives[0]
+            knife.title = 'Шеф'
+            knife.save()
+        self.assertEqual(len(self.results('knife', q='Нож')), 2)
+        self.assertEqual([row['id'] for row in self.results('knife', q='Шеф')], [knife.pk])
+
+    def test_login_required(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('autocomplete', args=['knife']), {'q': 'нож'}).status_code, 302)
+
+
+class AsyncPageTests(TestCase):
+    """ASGI-страницы каталога отдают те же байты и ETag, что синхронные"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.knives = make_catalog(14)
+
+    def request(self, factory, path, headers=None):
+        request = factory.get(path, headers=headers)
+        request.user = AnonymousUser()
+        return request
+
+    def render_uncached(self, view_class, path, kwargs):
+        """Синхронный ответ; страницу из кэша убираем, чтобы async-вариант рендерил сам"""
+        response = view_class.as_view()(self.request(RequestFactory(), path), **kwargs).render()
+        # Версии областей остаются прежними — ETag сравним
+        view = view_class()
+        request = self.request(RequestFactory(), path)
+        view.setup(request, **kwargs)
+        key, _ = view.get_cached_page(request)
+        caches['default'].delete(key)
+        return response
+
+    async def test_pages_match_sync_views(self):
+        knife = self.knives[0]
+        pages = [
+            (KnifeStoreView, AsyncKnifeStoreView, reverse('knife_store'), {}),
+            (KnifeStoreView, AsyncKnifeStoreView, reverse('knife_store') + '?q=%D0%BD%D0%BE%D0%B6&sort=-price', {}),
+            (KnifeDetailView, AsyncKnifeDetailView, reverse('knife_detail', args=[knife.pk]), {'pk': knife.pk}),
+            (CategoryDetailView, AsyncCategoryDetailView, reverse('category_detail', args=[knife.category_id]),
+             {'pk': knife.category_id}),
+        ]
+        for sync_view, async_view, path, kwargs in pages:
+            expected = await sync_to_async(self.render_uncached)(sync_view, path, kwargs)
+            response = await async_view.as_view()(self.request(AsyncRequestFactory(), path), **kwargs)
+            self.assertEqual(response.status_code, 200, path)
+            self.assertEqual(response.content, expected.content, path)
+            self.assertEqual(response['ETag'], expected['ETag'], path)
+
+            conditional = self.request(AsyncRequestFactory(), path, headers={'If-None-Match': expected['ETag']})
+            self.assertEqual((await async_view.as_view()(conditional, **kwargs)).status_code, 304, path)
+
+
+class CatalogTagsTests(TestCase):
+    """Значки строки каталога из simple_tag — те же, что давали {% include %}-партиалы"""
+    template = Template('{% load catalog_tags %}{% knife_tags knife %}|{% category_badge knife.category %}')
+
+    def render(self, **fields):
+        return self.template.render(Context({'knife': Knife(**fields)}))
+
+    def test_badges(self):
+        tomorrow = timezone.localdate() + datetime.timedelta(days=1)
+        self.assertEqual(
+            self.render(release_date=tomorrow, price=Decimal('2999.99'), category=Category(name='Шефы')),
+            '<div class="knife-tags"><span class="badge bg-success">Новинка</span>'
+            '<span class="badge bg-warning">Бестселлер</span></div>'
+            '|<span class="badge bg-info text-dark">Шефы</span>',
+        )
+        self.assertEqual(
+            self.render(release_date=datetime.date(2020, 1, 1), price=Decimal('3000.00')),
+            '<div class="knife-tags"></div>|',
+        )
+        self.assertEqual(self.render(category=Category(name='<b>')).split('|')[1],
+                         '<span class="badge bg-info text-dark">&lt;b&gt;</span>')
+
+    def test_knife_list_renders_badges(self):
+        make_catalog(2)
+        response = self.client.get(reverse('knife_list'))
+        self.assertContains(response, 'Бестселлер', count=2)
+        self.assertContains(response, '<span class="badge bg-info text-dark">Категория 0</span>', count=1)
+
+
+@override_settings(QUERY_BUDGET_ENFORCE=True)
+class QueryBudgetTests(TestCase):
+    """
+    Страницы каталога, заказов, покупателей и склада укладываются в свой
+    query_budget на 15 ножах и трёх заказах.
+
+    QUERY_BUDGET_ENFORCE роняет запрос по счёту внутри представления, а
+    assert_max_queries — по всему запросу вместе с middleware. Кэш
+    страниц и фрагментов очищается: считается холодный рендеринг.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.knives = make_catalog(15)
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        # Заказы нескольких покупателей по нескольку позиций — N+1 был бы виден
+        cls.orders = []
+        for number in range(3):
+            user = User.objects.create_user(f'buyer{number}', f'buyer{number}@example.com', 'password')
+            customer = Customer.objects.create(user=user, address='Адрес')
+            lines = [(knife.pk, 1) for knife in cls.knives[number::3]]
+            cls.orders.append(place_order(customer, lines, 'Адрес').order)
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def assertWithinBudget(self, view, url, **params):
+        with assert_max_queries(view.query_budget, label=url):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_knife_list(self):
+        response = self.assertWithinBudget(KnifeListView, reverse('knife_list'))
+        self.assertEqual(len(response.context['knifes']), KnifeListView.paginate_by)
+        self.assertWithinBudget(KnifeListView, reverse('knife_list'), steel='VG-10', price_max='2000', sort='-price')
+        self.assertWithinBudget(KnifeListView, reverse('knife_list'), q='нож')
+
+    def test_knife_list_next_page(self):
+        first = self.client.get(reverse('knife_list'))
+        cursor = first.context['page_obj'].next_cursor
+        self.assertTrue(cursor)
+        second = self.assertWithinBudget(KnifeListView, reverse('knife_list'), cursor=cursor)
+        self.assertEqual(len(second.context['knifes']), len(self.knives) - KnifeListView.paginate_by)
+
+    def test_store(self):
+        self.assertWithinBudget(KnifeStoreView, reverse('knife_store'))
+
+    def test_knife_detail(self):
+        self.assertWithinBudget(KnifeDetailView, reverse('knife_detail', args=[self.knives[0].pk]))
+
+    def test_category_pages(self):
+        self.assertWithinBudget(CategoryListView, reverse('category_list'))
+        self.assertWithinBudget(CategoryDetailView, reverse('category_detail', args=[self.knives[0].category_id]))
+
+    def test_brand_pages(self):
+        self.assertWithinBudget(BrandListView, reverse('brand_list'))
+        self.assertWithinBudget(BrandDetailView, reverse('brand_detail', args=[self.knives[0].publisher_id]))
+
+    def test_staff_pages(self):
+        # Сессия и пользователь входят в счёт assert_max_queries
+        self.client.force_login(self.admin)
+        response = self.assertWithinBudget(OrderListView, reverse('order_list'))
+        self.assertEqual(len(response.context['orders']), len(self.orders))
+        response = self.assertWithinBudget(OrderDetailView, reverse('order_detail', args=[self.orders[0].pk]))
+        self.assertEqual(len(response.context['items']), 5)
+        self.assertWithinBudget(CustomerListView, reverse('customer_list'))
+        response = self.assertWithinBudget(StockListView, reverse('stock_list'))
+        self.assertEqual(len(response.context['stock_list']), len(self.knives))
+
+
+class FacetTests(TestCase):
+    """Счётчик варианта фасета равен числу ножей, которое покажет выбор этого варианта"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.knives = make_catalog(9)
+
+    def get(self, **params):
+        response = self.client.get(reverse('knife_list'), params)
+        self.assertEqual(response.status_code, 200)
+        facets = {
+            facet['key']: {option['value']: option for option in facet['options']}
+            for facet in response.context['facets']
+        }
+        return [knife.pk for knife in response.context['knifes']], facets
+
+    def test_counts_match_filtered_results(self):
+        params = {'steel': 'VG-10', 'blade_max': '210'}
+        results, facets = self.get(**params)
+        self.assertEqual(sorted(results), sorted(
+            Knife.objects.filter(steel='VG-10', blade_length_mm__lte=210).values_list('pk', flat=True)
+        ))
+
+        for key, options in facets.items():
+            for value, option in options.items():
+                # Выбор варианта своего фасета заменяет уже выбранный, а не добавляется к нему
+                filtered, _ = self.get(**{**params, key: value})
+                self.assertEqual(option['count'], len(filtered), (key, value))
+        self.assertTrue(facets['steel']['VG-10']['selected'])
+        self.assertEqual(set(facets['steel']), {'VG-10', 'AUS-8'})
+
+    def test_invalid_values_are_ignored(self):
+        results, _ = self.get(edge_angle_deg='острый', brand='x', price_min='дёшево')
+        self.assertEqual(len(results), len(self.knives))
+
+
+class SearchTests(TestCase):
+    """Поиск ?q= ранжирует уже отфильтрованный каталог, а не топ всего индекса"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.knives = make_catalog(30)
+        Knife.objects.filter(pk__in=[knife.pk for knife in cls.knives[::3]]).update(description='Дамасская сталь')
+        Knife.objects.filter(pk=cls.knives[6].pk).update(title='Сталь 006')
+        index_knives(knife.pk for knife in cls.knives)
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def titles(self, **params):
+        response = self.client.get(reverse('knife_list'), params)
+        return [knife.title for knife in response.context['knifes']]
+
+    def test_filters_apply_before_ranking(self):
+        category = self.knives[0].category_id
+        expected = [knife for knife in self.knives[::3] if knife.category_id == category]
+        titles = self.titles(q='сталь', category=category)
+        self.assertEqual(len(titles), len(expected))
+        # Совпадение в названии весит больше, чем в описании
+        self.assertEqual(titles[0], 'Сталь 006')
+        # VG-10 только у ножей первой категории
+        self.assertEqual(len(self.titles(q='сталь', steel='VG-10', sort='price')), len(expected))
+
+    def test_typos_and_prefixes(self):
+        self.assertEqual(len(self.titles(q='стал')), KnifeListView.paginate_by)
+        self.assertIn('Сталь 006', self.titles(q='дамаская сталь'))
+        self.assertEqual(self.titles(q='несуществующее'), [])
+
+
+@override_settings(IMAGE_PIPELINE_ASYNC=False, IMAGE_VARIANT_WIDTHS=(320, 640, 1280))
+class ImagePipelineTests(TestCase):
+    """Производные фото: без увеличения, по хэшу содержимого, <picture> после обработки"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.knives = make_catalog(2)
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        media = override_settings(MEDIA_ROOT=directory, MEDIA_URL='/media/')
+        media.enable()
+        self.addCleanup(media.disable)
+        self.storage = Knife._meta.get_field('image').storage
+
+    def upload(self, knife, width=800, height=400, mode='RGBA'):
+        buffer = io.BytesIO()
+        Image.new(mode, (width, height), (200, 30, 30, 128) if mode == 'RGBA' else 'red').save(buffer, 'PNG')
+        with self.captureOnCommitCallbacks(execute=True):
+            knife.image.save('photo.png', ContentFile(buffer.getvalue()))
+        knife.refresh_from_db()
+        return knife
+
+    def test_variants_are_not_upscaled(self):
+        knife = self.upload(self.knives[0])
+        self.assertEqual(knife.image_width, 800)
+        self.assertEqual(plan_variants(800), [(320, 320), (640, 640), (1280, 800)])
+        for name_width, width in plan_variants(800):
+            with self.storage.open(variant_path(knife.image_hash, name_width, 'jpg')) as file:
+                jpeg = Image.open(file)
+                self.assertEqual((jpeg.format, jpeg.mode, jpeg.width), ('JPEG', 'RGB', width))
+            with self.storage.open(variant_path(knife.image_hash, name_width, 'webp')) as file:
+                self.assertEqual(Image.open(file).size, (width, width // 2))
+
+    def test_same_content_shares_variants(self):
+        first = self.upload(self.knives[0])
+        with mock.patch.object(FileSystemStorage, 'save', autospec=True, side_effect=FileSystemStorage.save) as save:
+            second = self.upload(self.knives[1])
+            # Сохраняется только сам оригинал, производные уже есть
+            self.assertEqual(save.call_count, 1)
+            self.assertEqual(build_variants(second), first.image_hash)
+            self.assertEqual(save.call_count, 1)
+        self.assertEqual(second.image_hash, first.image_hash)
+
+    def test_new_photo_resets_variants(self):
+        knife = self.upload(self.knives[0], mode='RGB')
+        old_hash = knife.image_hash
+        with mock.patch.object(images.worker, 'enqueue') as enqueue:
+            knife = self.upload(knife, width=300)
+        enqueue.assert_called_once_with(knife.pk)
+        self.assertEqual((knife.image_hash, knife.image_width), ('', None))
+        self.assertNotEqual(process_knife(knife.pk), old_hash)
+
+    def test_picture_tag(self):
+        template = Template('{% load catalog_images %}{% knife_picture knife %}')
+        knife = self.knives[0]
+        self.assertEqual(template.render(Context({'knife': knife})), '')
+
+        with mock.patch.object(images.worker, 'enqueue'):
+            knife = self.upload(knife)
+        html = template.render(Context({'knife': knife}))
+        self.assertTrue(html.startswith(f'<img src="{knife.image.url}"'))
+
+        build_variants(knife)
+        knife.refresh_from_db()
+        html = template.render(Context({'knife': knife}))
+        base = f'/media/{DERIVED_ROOT}/{knife.image_hash[:2]}/{knife.image_hash}'
+        self.assertIn(f'srcset="{base}/320.webp 320w, {base}/640.webp 640w, {base}/1280.webp 800w"', html)
+        self.assertIn(f'<img src="{base}/320.jpg"', html)
+
+    def test_backfill_command(self):
+        with mock.patch.object(images.worker, 'enqueue'):
+            knife = self.upload(self.knives[0])
+        stdout = io.StringIO()
+        call_command('build_image_variants', stdout=stdout)
+        knife.refresh_from_db()
+        self.assertEqual(knife.image_width, 800)
+        self.assertIn('1 обработано', stdout.getvalue())
@@ -1,6 +1,18 @@
 from django.contrib import admin
 from django.urls import path, include
+from django.conf import settings
 from .views import *
+from .async_views import AsyncCategoryDetailView, AsyncKnifeDetailView, AsyncKnifeStoreView
+
+# Под ASGI страницы чтения каталога обслуживают async-варианты (ASYNC_CATALOG_VIEWS)
+if getattr(settings, 'ASYNC_CATALOG_VIEWS', False):
+    knife_store_view = AsyncKnifeStoreView.as_view()
+    knife_detail_view = AsyncKnifeDetailView.as_view()
+    category_detail_view = AsyncCategoryDetailView.as_view()
+else:
+    knife_store_view = KnifeStoreView.as_view()
+    knife_detail_view = KnifeDetailView.as_view()
+    category_detail_view = CategoryDetailView.as_view()
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -8,17 +20,19 @@ urlpatterns = [
     path('auth/register/', user_registration, name='register'),
     path('logout/', user_logout, name='logout'),
     path('', home, name='home'),
+    path('cache/stats/', catalog_cache_stats, name='catalog_cache_stats'),
+    path('autocomplete/<str:source>/', autocomplete_view, name='autocomplete'),
 
     path('knife_list/', KnifeListView.as_view(), name='knife_list'),
     path('knives/create//', KnifeCreateView.as_view(), name='knife_create'),
-    path('knives/<int:pk>/', KnifeDetailView.as_view(), name='knife_detail'),
+    path('knives/<int:pk>/', knife_detail_view, name='knife_detail'),
     path('knives/<int:pk>/update/', KnifeUpdateView.as_view(), name='knife_update'),
     path('knives/<int:pk>/delete/', KnifeDeleteView.as_view(), name='knife_delete'),
-    path('store/', KnifeStoreView.as_view(), name='knife_store'),
+    path('store/', knife_store_view, name='knife_store'),
 
     path('category_list/', CategoryListView.as_view(), name='category_list'),
     path('categories/create/', CategoryCreateView.as_view(), name='category_create'),
-    path('categories/<int:pk>/', CategoryDetailView.as_view(), name='category_detail'),
+    path('categories/<int:pk>/', category_detail_view, name='category_detail'),
     path('categories/<int:pk>/update/', CategoryUpdateView.as_view(), name='category_update'),
     path('categories/<int:pk>/delete/', CategoryDeleteView.as_view(), name='category_delete'),
 
@@ -57,4 +71,5 @@ urlpatterns = [
     path('stock/create/', StockCreateView.as_view(), name='stock_create'),
     path('stock/<int:pk>/update/', StockUpdateView.as_view(), name='stock_update'),
     path('stock/<int:pk>/delete/', StockDeleteView.as_view(), name='stock_delete'),
+    path('stock/alerts/', LowStockAlertListView.as_view(), name='low_stock_list'),
 ]
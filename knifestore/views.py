@@ -7,12 +7,38 @@ from .models import *
 from .forms import *
 from django.contrib.auth.decorators import login_required
 from basket.forms import BasketAddProductForm
+from .pagination import KeysetPaginationMixin
+from .facets import FacetFilterMixin
+from .search import KnifeSearchMixin
+from .queryplan import QueryPlanMixin
+from .cache import CatalogPageCacheMixin, cache_stats
+from .conditional import ConditionalGetMixin
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, JsonResponse
+from django.db import transaction
+from django.db.models import Count, Prefetch
+from django.views.generic.detail import SingleObjectMixin
+from .inventory import apply_movements, evaluate_alerts, set_quantity
+from .autocomplete import DEFAULT_LIMIT, SOURCES, autocomplete
+
+# Ключи сортировки каталога совпадают с индексами knife_*_idx; id делает ключ уникальным
+CATALOG_ORDERINGS = {
+    'title': ('title', 'id'),
+    'price': ('price', 'id'),
+    '-price': ('-price', '-id'),
+    'release_date': ('release_date', 'id'),
+    '-release_date': ('-release_date', '-id'),
+    # Доступна только при поиске ?q= (search_rank добавляет KnifeSearchMixin)
+    'relevance': ('search_rank', 'id'),
+}
 
 
 @login_required
 def user_orders(request):
     customer = request.user.customer
-    orders = Order.objects.filter(customer=customer).order_by('-order_date')
+    orders = Order.objects.filter(customer=customer).order_by('-order_date').only(
+        'id', 'order_date', 'total_amount', 'status',
+    )
     return render(request, 'orders/user_orders.html', {'orders': orders})
 
 def user_login(request):
@@ -51,17 +77,56 @@ def user_logout(request):
 def home(request):
     return render(request, 'home.html')
 
-class KnifeStoreView(ListView):
+@staff_member_required
+def catalog_cache_stats(request):
+    return JsonResponse(cache_stats())
+
+
+@login_required
+def autocomplete_view(request, source):
+    """Подсказки для виджетов выбора: ?q= — префикс, ?limit= — до 50 вариантов"""
+    if source not in SOURCES:
+        raise Http404('Неизвестный источник подсказок')
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        limit = DEFAULT_LIMIT
+    return JsonResponse({'results': autocomplete(source, request.GET.get('q', ''), limit)})
+
+
+class KnifeStoreView(ConditionalGetMixin, CatalogPageCacheMixin, QueryPlanMixin, KnifeSearchMixin, KeysetPaginationMixin, ListView):
     model = Knife
     template_name = 'store/knife_store.html'
     context_object_name = 'knifes'
+    paginate_by = 12
+    only_fields = [
+        'id', 'title', 'description', 'price', 'release_date', 'image', 'image_hash', 'image_width',
+    ]
+    query_budget = 6
+    page_cache_scopes = ['knife']
+    conditional_scopes = ['knife']
+    keyset_orderings = CATALOG_ORDERINGS
+    keyset_with_count = False
+
+    def get_queryset(self):
+        return self.apply_search(super().get_queryset())
 
-class KnifeListView(ListView):
+class KnifeListView(ConditionalGetMixin, QueryPlanMixin, KnifeSearchMixin, KeysetPaginationMixin, FacetFilterMixin, ListView):
     model = Knife
     template_name = 'knife_list.html'
     context_object_name = 'knifes'
     paginate_by = 10
+    select_related = ['category', 'publisher']
+    only_fields = [
+        'id', 'title', 'price', 'release_date', 'min_players', 'max_players', 'play_time',
+        'category__name', 'publisher__name',
+    ]
+    query_budget = 8
+    # Подписи фасетов — названия брендов и категорий
+    conditional_scopes = ['knife', 'brand', 'category']
     ordering = ['title']
+    keyset_orderings = CATALOG_ORDERINGS
+    keyset_with_count = False
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -81,27 +146,40 @@ class KnifeListView(ListView):
         if players:
             queryset = queryset.filter(min_players__lte=players, max_players__gte=players)
         
-        return queryset
+        queryset = self.apply_search(queryset)
+        return self.apply_catalog_filter(queryset)
 
-class KnifeDetailView(DetailView):
+class KnifeDetailView(ConditionalGetMixin, CatalogPageCacheMixin, QueryPlanMixin, DetailView):
     model = Knife
     template_name = 'knife_detail.html'
+    select_related = ['category', 'publisher', 'stock']
+    query_budget = 4
+
+    def get_cache_scopes(self):
+        return [f"knife:{self.kwargs['pk']}"]
+
+    def get_conditional_scopes(self):
+        # Версия ножа меняется и при переименовании его бренда или категории
+        return self.get_cache_scopes()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['form_basket'] = BasketAddProductForm()
+        if 'stock' not in context:
+            # Нож без записи склада — None (складом не учитывается)
+            context['stock'] = getattr(self.object, 'stock', None)
         return context
         
     
 class KnifeCreateView(CreateView):
     model = Knife
-    fields = '__all__'
+    form_class = KnifeForm
     template_name = 'knife_form.html'
     success_url = reverse_lazy('knife_list')
 
 class KnifeUpdateView(UpdateView):
     model = Knife
-    fields = '__all__'
+    form_class = KnifeForm
     template_name = 'knife_form.html'
     success_url = reverse_lazy('knife_list')
 
@@ -110,24 +188,39 @@ class KnifeDeleteView(DeleteView):
     template_name = 'knife_confirm_delete.html'
     success_url = reverse_lazy('knife_list')
     
-class CategoryListView(ListView):
+class CategoryListView(ConditionalGetMixin, QueryPlanMixin, ListView):
     model = Category
     template_name = 'category_list.html'
     context_object_name = 'categories'
     paginate_by = 10
+    ordering = ['name']
+    # knife_count — денормализованная колонка (aggregates.py), без GROUP BY по ножам
+    query_budget = 4
+    conditional_field = None
+    conditional_scopes = ['category', 'knife']
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['total_categories'] = Category.objects.count()
+        context['total_categories'] = context['paginator'].count
         return context
 
-class CategoryDetailView(DetailView):
+class CategoryDetailView(ConditionalGetMixin, CatalogPageCacheMixin, QueryPlanMixin, DetailView):
     model = Category
     template_name = 'category_detail.html'
+    query_budget = 4
+
+    conditional_field = None
+
+    def get_cache_scopes(self):
+        return [f"category:{self.kwargs['pk']}"]
+
+    def get_conditional_scopes(self):
+        return self.get_cache_scopes()
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['knifes'] = self.object.knifes.all()  # Используем related_name из модели Knife
+        if 'knifes' not in context:
+            context['knifes'] = self.object.knifes.only('id', 'title', 'category')  # Используем related_name из модели Knife
         return context
 
 class CategoryCreateView(CreateView):
@@ -147,24 +240,39 @@ class CategoryDeleteView(DeleteView):
     template_name = 'category_confirm_delete.html'
     success_url = reverse_lazy('category_list')
 
-class BrandListView(ListView):
+class BrandListView(ConditionalGetMixin, QueryPlanMixin, ListView):
     model = Brand
     template_name = 'brands/brand_list.html'
     context_object_name = 'publishers'
     paginate_by = 10
+    ordering = ['name']
+    query_budget = 4
+    conditional_field = None
+    conditional_scopes = ['brand', 'knife']
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['total_publishers'] = Brand.objects.count()
+        context['total_publishers'] = context['paginator'].count
         return context
 
-class BrandDetailView(DetailView):
+class BrandDetailView(ConditionalGetMixin, CatalogPageCacheMixin, QueryPlanMixin, DetailView):
     model = Brand
     template_name = 'brands/brand_detail.html'
+    query_budget = 4
+
+    conditional_field = None
+
+    def get_cache_scopes(self):
+        return [f"brand:{self.kwargs['pk']}"]
+
+    def get_conditional_scopes(self):
+        return self.get_cache_scopes()
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['knifes'] = Knife.objects.filter(publisher=self.object)
+        context['knifes'] = Knife.objects.filter(publisher=self.object).only(
+            'id', 'title', 'description', 'image', 'image_hash', 'image_width',
+        )
         return context
 
 class BrandCreateView(CreateView):
@@ -189,15 +297,22 @@ class BrandDeleteView(DeleteView):
         context['knifes'] = self.object.knifes.all()
         return context
     
-class SeriesListView(ListView):
+class SeriesListView(QueryPlanMixin, ListView):
     model = Series
     template_name = 'series/series_list.html'
     paginate_by = 15
     context_object_name = 'series_list'
+    ordering = ['last_name', 'first_name']
+    annotations = {'knife_count': Count('knifes')}
+    query_budget = 4
 
-class SeriesDetailView(DetailView):
+class SeriesDetailView(QueryPlanMixin, DetailView):
     model = Series
     template_name = 'series/series_detail.html'
+    prefetch_related = [Prefetch('knifes', queryset=Knife.objects.only(
+        'id', 'title', 'description', 'image', 'image_hash', 'image_width',
+    ))]
+    query_budget = 4
 
 class SeriesCreateView(CreateView):
     model = Series
@@ -216,16 +331,20 @@ class SeriesDeleteView(DeleteView):
     template_name = 'series/series_confirm_delete.html'
     success_url = reverse_lazy('series_list')
 
-class CustomerListView(ListView):
+class CustomerListView(QueryPlanMixin, ListView):
     model = Customer
     template_name = 'customers/customer_list.html'
     context_object_name = 'customers'
     paginate_by = 15
     ordering = ['-registration_date']
+    select_related = ['user']
+    query_budget = 4
 
-class CustomerDetailView(DetailView):
+class CustomerDetailView(QueryPlanMixin, DetailView):
     model = Customer
     template_name = 'customers/customer_detail.html'
+    select_related = ['user']
+    query_budget = 4
 
 class CustomerCreateView(CreateView):
     model = Customer
@@ -244,16 +363,23 @@ class CustomerDeleteView(DeleteView):
     template_name = 'customers/customer_confirm_delete.html'
     success_url = reverse_lazy('customer_list')
 
-class OrderListView(ListView):
+class OrderListView(QueryPlanMixin, ListView):
     model = Order
     template_name = 'orders/order_list.html'
     context_object_name = 'orders'
     paginate_by = 10
     ordering = ['-order_date']
+    select_related = ['customer__user']
+    query_budget = 4
 
-class OrderDetailView(DetailView):
+class OrderDetailView(QueryPlanMixin, DetailView):
     model = Order
     template_name = 'orders/order_detail.html'
+    select_related = ['customer__user']
+    prefetch_related = [Prefetch('items', queryset=OrderItem.objects.select_related('knife').only(
+        'id', 'order_id', 'quantity', 'price', 'knife__title',
+    ))]
+    query_budget = 4
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -322,18 +448,21 @@ class OrderDeleteView(DeleteView):
     template_name = 'orders/order_confirm_delete.html'
     success_url = reverse_lazy('order_list')
 
-class OrderItemListView(ListView):
+class OrderItemListView(QueryPlanMixin, ListView):
     model = OrderItem
     template_name = 'order_items/orderitem_list.html'
     context_object_name = 'items'
     paginate_by = 20
+    ordering = ['-id']
+    select_related = ['knife']
+    only_fields = ['id', 'order_id', 'quantity', 'price', 'knife__title']
+    query_budget = 4
 
-    def get_queryset(self):
-        return OrderItem.objects.all().select_related('order', 'knife')
-
-class OrderItemDetailView(DetailView):
+class OrderItemDetailView(QueryPlanMixin, DetailView):
     model = OrderItem
     template_name = 'order_items/orderitem_detail.html'
+    select_related = ['order__customer__user', 'knife']
+    query_budget = 4
 
 class OrderItemCreateView(CreateView):
     model = OrderItem
@@ -352,14 +481,17 @@ class OrderItemDeleteView(DeleteView):
     template_name = 'order_items/orderitem_confirm_delete.html'
     success_url = reverse_lazy('orderitem_list')
 
-class StockListView(ListView):
+class StockListView(QueryPlanMixin, ListView):
     model = Stock
     template_name = 'stock/stock_list.html'
     context_object_name = 'stock_list'
+    select_related = ['knife']
+    only_fields = ['id', 'quantity', 'reorder_level', 'last_restocked', 'knife__title']
+    query_budget = 4
 
 class StockCreateView(CreateView):
     model = Stock
-    fields = ['knife', 'quantity']
+    fields = ['knife', 'quantity', 'reorder_level']
     template_name = 'stock/stock_form.html'
     success_url = reverse_lazy('stock_list')
 
@@ -368,13 +500,69 @@ class StockCreateView(CreateView):
         form.fields['knife'].queryset = Knife.objects.exclude(stock__isnull=False)
         return form
 
-class StockUpdateView(UpdateView):
+    def form_valid(self, form):
+        # Начальный остаток проходит через журнал как поступление
+        quantity = form.cleaned_data['quantity']
+        with transaction.atomic():
+            form.instance.quantity = 0
+            self.object = form.save()
+            apply_movements(
+                {self.object.knife_id: quantity}, StockMovement.RECEIPT,
+                user=self.request.user, note='Постановка на учёт',
+            )
+        return redirect(self.get_success_url())
+
+class StockUpdateView(SingleObjectMixin, FormView):
+    """Приход, возврат или инвентаризация вместо перезаписи остатка"""
     model = Stock
-    fields = ['quantity']
-    template_name = 'stock/stock_form.html'
+    form_class = StockMovementForm
+    template_name = 'stock/stock_movement_form.html'
     success_url = reverse_lazy('stock_list')
 
+    def dispatch(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return Stock.objects.select_related('knife')
+
+    def get_initial(self):
+        return {'kind': StockMovement.RECEIPT, 'reorder_level': self.object.reorder_level}
+
+    def get_context_data(self, **kwargs):
+        kwargs['movements'] = (
+            StockMovement.objects.filter(knife_id=self.object.knife_id)
+            .select_related('order', 'user')[:20]
+        )
+        return super().get_context_data(**kwargs)
+
+    def form_valid(self, form):
+        data = form.cleaned_data
+        user = self.request.user
+        knife_id = self.object.knife_id
+        with transaction.atomic():
+            if data['kind'] == StockMovement.ADJUSTMENT:
+                set_quantity(knife_id, data['quantity'], user=user, note=data['note'])
+            else:
+                apply_movements({knife_id: data['quantity']}, data['kind'], user=user, note=data['note'])
+            if data['reorder_level'] != self.object.reorder_level:
+                Stock.objects.filter(pk=self.object.pk).update(reorder_level=data['reorder_level'])
+                quantity = Stock.objects.filter(pk=self.object.pk).values_list('quantity', flat=True).get()
+                evaluate_alerts([(knife_id, quantity, data['reorder_level'])])
+        return super().form_valid(form)
+
 class StockDeleteView(DeleteView):
     model = Stock
     template_name = 'stock/stock_confirm_delete.html'
-    success_url = reverse_lazy('stock_list')
\ No newline at end of file
+    success_url = reverse_lazy('stock_list')
+
+class LowStockAlertListView(QueryPlanMixin, ListView):
+    """Очередь дозаказа: открытые оповещения, старые сверху"""
+    model = LowStockAlert
+    template_name = 'stock/low_stock_list.html'
+    context_object_name = 'alerts'
+    select_related = ['knife']
+    query_budget = 4
+
+    def get_queryset(self):
+        return super().get_queryset().filter(resolved_at__isnull=True).order_by('created_at', 'id')
@@ -0,0 +1,78 @@
+from django import forms
+from django.urls import reverse
+
+
+class AutocompleteMixin:
+    """
+    Выбор объекта через подсказки вместо полного <select>.
+
+    В HTML попадают только выбранные значения (одним запросом по pk), а
+    варианты подгружает скрипт _inc/_autocomplete.html из эндпоинта
+    knifestore.autocomplete. labels — заранее известные подписи {pk: текст}
+    (preload_labels для формсетов), тогда запрос не нужен вовсе.
+    """
+
+    def __init__(self, source, attrs=None):
+        self.source = source
+        self.labels = None
+        super().__init__(attrs)
+
+    def __deepcopy__(self, memo):
+        copy = super().__deepcopy__(memo)
+        copy.labels = None
+        return copy
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs.setdefault('class', 'form-select')
+        attrs['data-autocomplete-url'] = reverse('autocomplete', args=[self.source])
+        return attrs
+
+    def selected_values(self, value):
+        return [str(item) for item in value if item not in (None, '')]
+
+    def optgroups(self, name, value, attrs=None):
+        values = self.selected_values(value)
+        labels = self.labels if self.labels is not None else self.load_labels(values)
+        options = []
+        if not self.allow_multiple_selected:
+            options.append(self.create_option(name, '', '---------', not values, 0))
+        for pk in values:
+            if pk in labels:
+                options.append(self.create_option(name, pk, labels[pk], True, len(options)))
+        return [(None, options, 0)]
+
+    def load_labels(self, values):
+        queryset = getattr(self.choices, 'queryset', None)
+        if queryset is None or not values:
+            return {}
+        try:
+            objects = queryset.filter(pk__in=values)
+            return {str(obj.pk): self.choices.field.label_from_instance(obj) for obj in objects}
+        except (TypeError, ValueError):
+            return {}
+
+
+class AutocompleteSelect(AutocompleteMixin, forms.Select):
+    pass
+
+
+class AutocompleteSelectMultiple(AutocompleteMixin, forms.SelectMultiple):
+    pass
+
+
+def preload_labels(bound_fields):
+    """
+    Подписи выбранных значений для всех строк формсета одним запросом —
+    вместо запроса на каждую строку при рендеринге.
+    """
+    bound_fields = list(bound_fields)
+    if not bound_fields:
+        return
+    values = set()
+    for bound in bound_fields:
+        value = bound.value()
+        values.update(bound.field.widget.selected_values(value if isinstance(value, (list, tuple)) else [value]))
+    labels = bound_fields[0].field.widget.load_labels(sorted(values))
+    for bound in bound_fields:
+        bound.field.widget.labels = labels
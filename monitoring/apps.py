@@ -0,0 +1,17 @@
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class MonitoringConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'monitoring'
+    verbose_name = 'Производительность'
+
+    def ready(self):
+        if getattr(settings, 'PERF_ENABLED', False):
+            from django.db.backends.signals import connection_created
+
+            from .middleware import install_execute_wrapper, install_template_profiler, install_template_timer
+            install_template_timer()
+            install_template_profiler()
+            connection_created.connect(install_execute_wrapper, dispatch_uid='monitoring_execute_wrapper')
@@ -0,0 +1,76 @@
+# Логарифмические корзины в духе HdrHistogram: значения до SUB_BUCKETS
+# хранятся точно, дальше корзина — 4 старших бита значения (ошибка до 1/8).
+# Числа запросов попадают в точные корзины, микросекунды и байты — в ~300
+# корзин на весь диапазон int, поэтому гистограмма не растёт с трафиком.
+SUB_BUCKETS = 16
+HALF = SUB_BUCKETS // 2
+
+
+def bucket_of(value):
+    value = max(int(value), 0)
+    if value < SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - 4
+    return SUB_BUCKETS + (shift - 1) * HALF + (value >> shift) - HALF
+
+
+def bucket_bounds(index):
+    """[нижняя, верхняя] граница значений корзины"""
+    if index < SUB_BUCKETS:
+        return index, index
+    shift, step = divmod(index - SUB_BUCKETS, HALF)
+    shift += 1
+    low = (step + HALF) << shift
+    return low, low + (1 << shift) - 1
+
+
+class Histogram:
+    """Счётчики по корзинам плюс count/sum/max; сливается с другими сложением"""
+    __slots__ = ('buckets', 'count', 'total', 'max')
+
+    def __init__(self, buckets=None, count=0, total=0, max=0):
+        self.buckets = dict(buckets or {})
+        self.count = count
+        self.total = total
+        self.max = max
+
+    def add(self, value):
+        value = max(int(value), 0)
+        index = bucket_of(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        return self
+
+    def percentile(self, percent):
+        """Середина корзины, в которую попал перцентиль (не больше max)"""
+        if not self.count:
+            return None
+        rank = max(self.count * percent / 100, 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                low, high = bucket_bounds(index)
+                return min((low + high) // 2, self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def to_dict(self):
+        return {'buckets': self.buckets, 'count': self.count, 'total': self.total, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['buckets'], data['count'], data['total'], data['max'])
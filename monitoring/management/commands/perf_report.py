@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+
+from monitoring import store
+
+COLUMNS = [
+    ('view', 'Маршрут'),
+    ('count', 'n'),
+    ('latency_p50', 'p50'),
+    ('latency_p95', 'p95'),
+    ('latency_p99', 'p99'),
+    ('queries_p95', 'SQL p95'),
+    ('queries_max', 'SQL max'),
+    ('budget', 'бюджет'),
+    ('db_p95', 'БД p95'),
+    ('template_p95', 'шабл. p95'),
+    ('size_p95', 'байт p95'),
+]
+
+
+class Command(BaseCommand):
+    help = 'Перцентили времени ответа, SQL и рендеринга по представлениям (из шардов в кэше)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sort', choices=list(store.SORT_KEYS), default='p95', help='Порядок строк')
+        parser.add_argument('--limit', type=int, default=30, help='Сколько представлений показать')
+        parser.add_argument('--slow', type=int, default=10, help='Сколько медленных запросов показать')
+        parser.add_argument('--templates', action='store_true',
+                            help='Профиль шаблонов: собственное время по шаблонам для каждого представления')
+        parser.add_argument('--reset', action='store_true', help='Начать замеры заново (после отчёта)')
+
+    def handle(self, *args, sort='p95', limit=30, slow=10, reset=False, templates=False, **options):
+        views, slow_queries, shards = store.snapshot()
+        rows = store.report_rows(views, sort)[:limit]
+        self.stdout.write(f'Шардов: {shards}, доля замеряемых запросов: {store.sample_rate()}; время в мс')
+        table = [[title for _, title in COLUMNS]] + [
+            ['—' if row[key] is None else str(row[key]) for key, _ in COLUMNS] for row in rows
+        ]
+        widths = [max(len(line[index]) for line in table) for index in range(len(COLUMNS))]
+        for number, line in enumerate(table):
+            text = '  '.join(cell.ljust(width) if index == 0 else cell.rjust(width)
+                             for index, (cell, width) in enumerate(zip(line, widths)))
+            if number and rows[number - 1]['over_budget']:
+                text = self.style.WARNING(text)
+            self.stdout.write(text)
+
+        if templates:
+            for view, rows in store.template_rows().items():
+                self.stdout.write('')
+                self.stdout.write(f'{view}: шаблон, рендерингов, полное, собственное мс, доля %')
+                for row in rows:
+                    self.stdout.write(f'  {row["template"]:<40} {row["renders"]:>7} {row["total_ms"]:>8} '
+                                      f'{row["self_ms"]:>8} {row["self_share"]:>6}')
+
+        for pool in store.pool_snapshot():
+            self.stdout.write('')
+            line = (f'Пул {pool["pool"]}: открыто {pool["open"]} из {pool["size"]}+{pool["max_overflow"]}, '
+                    f'выдач {pool["checkouts"]}, ожиданий {pool["waits"]} ({pool["wait_time_ms"]} мс), '
+                    f'таймаутов {pool["timeouts"]}')
+            self.stdout.write(self.style.WARNING(line) if pool['timeouts'] else line)
+
+        for query in slow_queries[:slow]:
+            self.stdout.write('')
+            self.stdout.write(f'{query["duration_us"] / 1000:.1f} мс  {query["view"]}  {query["at"]}')
+            self.stdout.write(f'  {query["sql"][:500]}')
+            for frame in query['stack']:
+                self.stdout.write(f'    {frame}')
+
+        if reset:
+            store.reset()
+            self.stdout.write(self.style.SUCCESS('Замеры сброшены'))
@@ -0,0 +1,275 @@
+import logging
+import os
+import traceback
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from . import store
+
+logger = logging.getLogger('monitoring.slow_queries')
+
+# Замер текущего запроса; ContextVar, а не threading.local — корректен и в async
+current = ContextVar('perf_request', default=None)
+
+MONITORING_DIR = os.path.dirname(os.path.abspath(__file__))
+STACK_DEPTH = 6
+SQL_LIMIT = 2000
+
+
+def slow_query_threshold():
+    return getattr(settings, 'PERF_SLOW_QUERY_MS', 100) * 1000
+
+
+def project_stack():
+    """Кадры стека из кода проекта (без Django, библиотек и самого monitoring)"""
+    base = str(settings.BASE_DIR)
+    frames = [
+        f'{os.path.relpath(frame.filename, base)}:{frame.lineno} in {frame.name}'
+        for frame in traceback.extract_stack()
+        if frame.filename.startswith(base)
+        and 'site-packages' not in frame.filename
+        and not frame.filename.startswith(MONITORING_DIR)
+    ]
+    return frames[-STACK_DEPTH:]
+
+
+class RequestRecorder:
+    """Счётчики одного запроса; сам же служит execute_wrapper для соединений"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        # Профиль шаблонов: имя -> [рендерингов, полное время, собственное время]
+        self.templates = {}
+        self.template_frames = []
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = perf_counter() - start
+            self.queries += 1
+            self.db_time += duration
+            if duration * 1_000_000 >= slow_query_threshold():
+                self.slow_query(sql, duration, context)
+
+    def time_template(self, name, render, renders=1):
+        """
+        Выполнить render() как кадр шаблона name. Собственное время — без
+        вложенных кадров (include, inclusion-теги, блоки других шаблонов);
+        полное — только у внешнего кадра этого шаблона, чтобы рекурсия и
+        блоки наследника внутри родителя не считались дважды.
+        """
+        frame = [name, 0.0]
+        outermost = all(entry[0] != name for entry in self.template_frames)
+        self.template_frames.append(frame)
+        start = perf_counter()
+        try:
+            return render()
+        finally:
+            elapsed = perf_counter() - start
+            self.template_frames.pop()
+            if self.template_frames:
+                self.template_frames[-1][1] += elapsed
+            stats = self.templates.get(name)
+            if stats is None:
+                stats = self.templates[name] = [0, 0.0, 0.0]
+            stats[0] += renders
+            if outermost:
+                stats[1] += elapsed
+            stats[2] += elapsed - frame[1]
+
+    def slow_query(self, sql, duration, context):
+        entry = {
+            'at': timezone.now().isoformat(),
+            'alias': context['connection'].alias,
+            'duration_us': int(duration * 1_000_000),
+            'sql': sql[:SQL_LIMIT],
+            'stack': project_stack(),
+        }
+        self.slow.append(entry)
+        logger.warning('Медленный запрос %.1f мс: %s\n%s',
+                       duration * 1000, entry['sql'], '\n'.join(entry['stack']))
+
+
+def view_identity(request):
+    """(имя маршрута, query_budget представления) по resolver_match"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<unresolved>', None
+    view_class = getattr(match.func, 'view_class', None) or getattr(match.func, 'cls', None)
+    return match.view_name or match._func_path, getattr(view_class, 'query_budget', None)
+
+
+def response_size(response):
+    if response.streaming:
+        return None
+    return len(response.content)
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    """
+    Постоянная обёртка соединения (ставится по connection_created): запрос
+    считается в замер current. ContextVar копируется в потоки sync_to_async,
+    поэтому учитываются и чтения async-представлений в пуле потоков.
+    """
+    recorder = current.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install_execute_wrapper(sender, connection, **kwargs):
+    if execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(execute_wrapper)
+
+
+class PerfMiddleware:
+    """
+    Замеры представлений: время ответа, число и время SQL (execute_wrapper),
+    время рендеринга шаблонов и размер ответа — по имени маршрута.
+
+    Замеряется доля PERF_SAMPLE_RATE запросов; для остальных обёртка
+    соединения ничего не делает. Числа копятся в гистограммах потока
+    (monitoring.store) и раз в PERF_FLUSH_INTERVAL секунд сбрасываются в
+    кэш, откуда их читают perf_report и страница /admin/perf/. Работает и
+    под WSGI, и под ASGI. Для стриминговых ответов время включает только
+    построение ответа, без отдачи тела.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not store.enabled() or not store.sampled():
+            return self.get_response(request)
+
+        recorder = RequestRecorder()
+        token = current.set(recorder)
+        start = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        self.record(request, response, recorder, perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if not store.enabled() or not store.sampled():
+            return await self.get_response(request)
+
+        recorder = RequestRecorder()
+        token = current.set(recorder)
+        start = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        # Сброс шарда обращается к кэшу — не в цикле событий
+        await sync_to_async(self.record)(request, response, recorder, perf_counter() - start)
+        return response
+
+    def record(self, request, response, recorder, latency):
+        view, budget = view_identity(request)
+        store.record(view, budget, {
+            'latency': latency * 1_000_000,
+            'queries': recorder.queries,
+            'db_time': recorder.db_time * 1_000_000,
+            'template_time': recorder.template_time * 1_000_000,
+            'size': response_size(response),
+        }, recorder.slow, {
+            name: [renders, int(total * 1_000_000), int(own * 1_000_000)]
+            for name, (renders, total, own) in recorder.templates.items()
+        })
+        store.flush()
+
+
+def install_template_timer():
+    """
+    Обернуть рендеринг шаблонов Django-бэкенда: время внешнего render()
+    прибавляется к замеру текущего запроса (вложенные render() не
+    считаются дважды). Вне замеряемого запроса обёртка ничего не делает.
+    """
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'perf_timed', False):
+        return
+    original = Template.render
+
+    @wraps(original)
+    def render(self, context=None, request=None):
+        recorder = current.get()
+        if recorder is None:
+            return original(self, context, request)
+        recorder.template_depth += 1
+        start = perf_counter()
+        try:
+            return original(self, context, request)
+        finally:
+            recorder.template_depth -= 1
+            if not recorder.template_depth:
+                recorder.template_time += perf_counter() - start
+
+    render.perf_timed = True
+    Template.render = render
+
+
+def template_name(template):
+    origin = template.origin
+    return getattr(origin, 'template_name', None) or template.name or '<строка>'
+
+
+def install_template_profiler():
+    """
+    Время по отдельным шаблонам для отчёта: каждый Template._render
+    (страница, {% include %}, родитель {% extends %}, inclusion-теги) и
+    каждый {% block %} — на счёт шаблона, где блок написан. Так цикл
+    каталога в {% block content %} списка ножей попадает в knife_list.html,
+    а не в base.html. Вне замеряемого запроса обёртки ничего не делают.
+    """
+    from django.template.base import Template
+    from django.template.loader_tags import BLOCK_CONTEXT_KEY, BlockNode
+
+    if getattr(Template._render, 'perf_profiled', False):
+        return
+    original_render = Template._render
+    original_block = BlockNode.render
+
+    @wraps(original_render)
+    def _render(self, context):
+        recorder = current.get()
+        if recorder is None:
+            return original_render(self, context)
+        return recorder.time_template(template_name(self), lambda: original_render(self, context))
+
+    @wraps(original_block)
+    def render_block(self, context):
+        recorder = current.get()
+        if recorder is None:
+            return original_block(self, context)
+        # Отрисуется последнее переопределение блока — его шаблон и считаем
+        block_context = context.render_context.get(BLOCK_CONTEXT_KEY)
+        block = block_context.get_block(self.name) if block_context is not None else None
+        origin = getattr(block or self, 'origin', None)
+        name = getattr(origin, 'template_name', None) or '<строка>'
+        return recorder.time_template(name, lambda: original_block(self, context), renders=0)
+
+    _render.perf_profiled = True
+    Template._render = _render
+    BlockNode.render = render_block
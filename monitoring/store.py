@@ -0,0 +1,283 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import caches
+
+from dbpool.pool import stats as pool_stats
+
+from .histogram import Histogram
+
+KEY_PREFIX = 'perf'
+# Метрика -> единица хранения; время пишется в микросекундах целыми
+METRICS = {
+    'latency': 'us',
+    'queries': 'count',
+    'db_time': 'us',
+    'template_time': 'us',
+    'size': 'bytes',
+}
+# Запись шарда живёт сутки после последнего сброса: шарды умерших воркеров уходят сами
+SHARD_TIMEOUT = 60 * 60 * 24
+SLOW_LOG_SIZE = 50
+
+_local = threading.local()
+
+
+def perf_cache():
+    return caches[getattr(settings, 'PERF_CACHE_ALIAS', 'default')]
+
+
+def enabled():
+    return getattr(settings, 'PERF_ENABLED', False)
+
+
+def sample_rate():
+    return float(getattr(settings, 'PERF_SAMPLE_RATE', 1.0))
+
+
+def sampled():
+    rate = sample_rate()
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def flush_interval():
+    return getattr(settings, 'PERF_FLUSH_INTERVAL', 10)
+
+
+class Shard:
+    """
+    Гистограммы одного потока одного процесса.
+
+    Пишет в шард только его поток, поэтому на горячем пути нет ни
+    блокировок, ни обращений к кэшу. Раз в PERF_FLUSH_INTERVAL секунд поток
+    целиком перезаписывает свой ключ в кэше — у каждого ключа один писатель,
+    а отчёт складывает все шарды.
+    """
+
+    def __init__(self):
+        self.id = f'{os.getpid()}-{threading.get_ident()}'
+        self.epoch = None
+        self.flushed_at = time.monotonic()
+        self.reset()
+
+    def reset(self):
+        self.views = {}
+        self.templates = {}
+        self.slow = deque(maxlen=SLOW_LOG_SIZE)
+
+    def dump(self):
+        return {
+            'views': {
+                view: {
+                    'budget': entry['budget'],
+                    'metrics': {metric: hist.to_dict() for metric, hist in entry['metrics'].items()},
+                }
+                for view, entry in self.views.items()
+            },
+            'templates': self.templates,
+            'slow': list(self.slow),
+            # Пулы соединений общие на процесс: в отчёте берётся самый свежий снимок процесса
+            'pools': {f'{os.getpid()}:{key}': stats for key, stats in pool_stats().items()},
+            'at': time.time(),
+        }
+
+
+def get_shard():
+    shard = getattr(_local, 'shard', None)
+    if shard is None:
+        shard = _local.shard = Shard()
+    return shard
+
+
+def record(view, budget, values, slow=(), templates=None):
+    """
+    values: {метрика: целое значение}; None — метрика не снята (стриминговый ответ).
+    templates: {шаблон: [рендерингов, полное мкс, собственное мкс]} за запрос.
+    """
+    shard = get_shard()
+    entry = shard.views.get(view)
+    if entry is None:
+        entry = shard.views[view] = {'budget': budget, 'metrics': {}}
+    for metric, value in values.items():
+        if value is None:
+            continue
+        hist = entry['metrics'].get(metric)
+        if hist is None:
+            hist = entry['metrics'][metric] = Histogram()
+        hist.add(value)
+    if templates:
+        profile = shard.templates.get(view)
+        if profile is None:
+            profile = shard.templates[view] = {'requests': 0, 'templates': {}}
+        profile['requests'] += 1
+        for name, stats in templates.items():
+            total = profile['templates'].setdefault(name, [0, 0, 0])
+            for index, value in enumerate(stats):
+                total[index] += value
+    for query in slow:
+        shard.slow.append(dict(query, view=view))
+
+
+def _epoch_key():
+    return f'{KEY_PREFIX}:epoch'
+
+
+def _index_key(epoch):
+    return f'{KEY_PREFIX}:{epoch}:shards'
+
+
+def _shard_key(epoch, shard_id):
+    return f'{KEY_PREFIX}:{epoch}:shard:{shard_id}'
+
+
+def current_epoch():
+    """Эпоха сбрасывается perf_report --reset; данные прошлых эпох не читаются"""
+    cache = perf_cache()
+    epoch = cache.get(_epoch_key())
+    if epoch is None:
+        epoch = time.time_ns()
+        if not cache.add(_epoch_key(), epoch, None):
+            epoch = cache.get(_epoch_key(), epoch)
+    return epoch
+
+
+def flush(force=False):
+    """Переписать шард текущего потока в кэш, если подошёл срок (или force)"""
+    shard = get_shard()
+    now = time.monotonic()
+    if not force and now - shard.flushed_at < flush_interval():
+        return
+    shard.flushed_at = now
+    cache = perf_cache()
+    epoch = current_epoch()
+    if shard.epoch != epoch:
+        if shard.epoch is not None:
+            shard.reset()
+        shard.epoch = epoch
+    cache.set(_shard_key(epoch, shard.id), shard.dump(), SHARD_TIMEOUT)
+    # Индекс шардов — общий ключ; потерянное при гонке добавление чинит следующий сброс
+    index = cache.get(_index_key(epoch)) or set()
+    if shard.id not in index:
+        cache.set(_index_key(epoch), index | {shard.id}, None)
+
+
+def reset():
+    perf_cache().set(_epoch_key(), time.time_ns(), None)
+
+
+def load_shards():
+    flush(force=True)
+    cache = perf_cache()
+    epoch = current_epoch()
+    index = cache.get(_index_key(epoch)) or set()
+    return cache.get_many([_shard_key(epoch, shard_id) for shard_id in index])
+
+
+def snapshot():
+    """Слить все шарды: ({view: {'budget', 'metrics': {метрика: Histogram}}}, медленные запросы)"""
+    blobs = load_shards()
+    views, slow = {}, []
+    for blob in blobs.values():
+        for view, data in blob['views'].items():
+            entry = views.setdefault(view, {'budget': data['budget'], 'metrics': {}})
+            if data['budget'] is not None:
+                entry['budget'] = data['budget']
+            for metric, hist in data['metrics'].items():
+                entry['metrics'].setdefault(metric, Histogram()).merge(Histogram.from_dict(hist))
+        slow.extend(blob['slow'])
+    slow.sort(key=lambda query: query['duration_us'], reverse=True)
+    return views, slow, len(blobs)
+
+
+def pool_snapshot():
+    """Счётчики пулов соединений dbpool по процессам: [{'pool': 'pid:алиас:база', ...}]"""
+    latest = {}
+    for blob in load_shards().values():
+        for key, stats in blob.get('pools', {}).items():
+            if key not in latest or blob['at'] > latest[key][0]:
+                latest[key] = blob['at'], stats
+    return [dict(stats, pool=key) for key, (_, stats) in sorted(latest.items())]
+
+
+def template_rows(limit=10):
+    """
+    Профиль шаблонов по представлениям: {view: [строки по убыванию
+    собственного времени]}; время в мс в среднем на замеренный запрос.
+    """
+    merged = {}
+    for blob in load_shards().values():
+        for view, profile in blob.get('templates', {}).items():
+            entry = merged.setdefault(view, {'requests': 0, 'templates': {}})
+            entry['requests'] += profile['requests']
+            for name, stats in profile['templates'].items():
+                total = entry['templates'].setdefault(name, [0, 0, 0])
+                for index, value in enumerate(stats):
+                    total[index] += value
+    report = {}
+    for view, entry in sorted(merged.items()):
+        requests = entry['requests']
+        own_total = sum(stats[2] for stats in entry['templates'].values()) or 1
+        rows = [
+            {
+                'template': name,
+                'renders': round(renders / requests, 1),
+                'total_ms': to_ms(total / requests),
+                'self_ms': to_ms(own / requests),
+                'self_share': round(own / own_total * 100, 1),
+            }
+            for name, (renders, total, own) in entry['templates'].items()
+        ]
+        rows.sort(key=lambda row: row['self_ms'], reverse=True)
+        report[view] = rows[:limit]
+    return report
+
+
+def to_ms(value):
+    return None if value is None else round(value / 1000, 1)
+
+
+SORT_KEYS = {
+    'p50': lambda row: row['latency_p50'] or 0,
+    'p95': lambda row: row['latency_p95'] or 0,
+    'p99': lambda row: row['latency_p99'] or 0,
+    'count': lambda row: row['count'],
+    'queries': lambda row: row['queries_p95'] or 0,
+    'db': lambda row: row['db_p95'] or 0,
+    'template': lambda row: row['template_p95'] or 0,
+    'size': lambda row: row['size_p95'] or 0,
+}
+
+
+def report_rows(views, sort='p95'):
+    """Строки отчёта по представлениям: перцентили в мс, запросы и бюджет QueryPlanMixin"""
+    rows = []
+    for view, entry in views.items():
+        metrics = entry['metrics']
+        latency = metrics.get('latency', Histogram())
+        queries = metrics.get('queries', Histogram())
+        db_time = metrics.get('db_time', Histogram())
+        template_time = metrics.get('template_time', Histogram())
+        size = metrics.get('size', Histogram())
+        budget = entry['budget']
+        rows.append({
+            'view': view,
+            'count': latency.count,
+            'latency_p50': to_ms(latency.percentile(50)),
+            'latency_p95': to_ms(latency.percentile(95)),
+            'latency_p99': to_ms(latency.percentile(99)),
+            'latency_max': to_ms(latency.max if latency.count else None),
+            'queries_p50': queries.percentile(50),
+            'queries_p95': queries.percentile(95),
+            'queries_max': queries.max if queries.count else None,
+            'db_p95': to_ms(db_time.percentile(95)),
+            'template_p95': to_ms(template_time.percentile(95)),
+            'size_p95': size.percentile(95),
+            'budget': budget,
+            'over_budget': budget is not None and queries.count > 0 and queries.max > budget,
+        })
+    rows.sort(key=SORT_KEYS.get(sort, SORT_KEYS['p95']), reverse=True)
+    return rows
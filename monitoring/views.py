@@ -0,0 +1,25 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.shortcuts import render
+
+from . import store
+
+
+@staff_member_required
+def perf_report(request):
+    """p50/p95/p99 по представлениям и журнал медленных запросов из всех шардов"""
+    sort = request.GET.get('sort', 'p95')
+    if sort not in store.SORT_KEYS:
+        sort = 'p95'
+    views, slow, shards = store.snapshot()
+    return render(request, 'monitoring/perf_report.html', context={
+        'title': 'Производительность представлений',
+        'rows': store.report_rows(views, sort),
+        'slow': slow[:20],
+        'shards': shards,
+        'sort': sort,
+        'sort_keys': list(store.SORT_KEYS),
+        'enabled': store.enabled(),
+        'sample_rate': store.sample_rate(),
+        'pools': store.pool_snapshot(),
+        'templates': store.template_rows(),
+    })
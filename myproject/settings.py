@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -23,7 +24,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-b89%h&z^kb6qf-urqr&bqs(g)ce)8b-g$+mgt(!f=s=uijg%ea'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1'
 
 ALLOWED_HOSTS = []
 
@@ -39,11 +40,16 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'basket',
     'knifestore',
+    'analytics',
+    'monitoring',
+    'replicas',
     'api_project',
     'rest_framework',
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.PerfMiddleware',
+    'replicas.middleware.PrimaryPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,17 +61,28 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'myproject.urls'
 
+# Шаблоны читаются и разбираются один раз на процесс (cached.Loader); при
+# разработке autoreload сбрасывает кэш, когда файл шаблона меняется. debug
+# (позиции ошибок в шаблонах) — только при DEBUG: без DJANGO_DEBUG=0 в
+# продакшене рендеринг медленнее. Горячие фрагменты каталога — теги
+# (knifestore.templatetags.catalog_tags), а не {% include %} на строку.
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
+            'debug': DEBUG,
         },
     },
 ]
@@ -87,6 +104,95 @@ DATABASES = {
     }
 }
 
+# Управление соединениями (DB_CONNECTION_MODE):
+#   persistent — соединение потока переживает запросы (CONN_MAX_AGE) и
+#                проверяется перед повторным использованием; для WSGI-воркеров
+#                с постоянным пулом потоков
+#   pool       — ограниченный пул процесса (dbpool): соединение берётся на
+#                запрос и возвращается; для ASGI, где sync-код идёт в
+#                короткоживущих потоках и постоянные соединения копились бы
+#   request    — новое соединение на каждый запрос
+# Размер пула: SIZE постоянных + MAX_OVERFLOW временных на процесс; не больше
+# max_connections MySQL / число процессов. Счётчики — на /admin/perf/.
+DB_CONNECTION_MODE = os.environ.get('DB_CONNECTION_MODE', 'persistent')
+DB_POOL = {
+    'SIZE': int(os.environ.get('DB_POOL_SIZE', 10)),
+    'MAX_OVERFLOW': int(os.environ.get('DB_POOL_MAX_OVERFLOW', 5)),
+    'TIMEOUT': 10.0,
+    'RECYCLE': 3600,
+    'PING_AFTER': 30.0,
+}
+
+
+def connection_settings(database, mode):
+    """DATABASES[...] для режима DB_CONNECTION_MODE (используют и benchmarks.settings)"""
+    database = dict(database)
+    if mode == 'persistent':
+        database.update(CONN_MAX_AGE=600, CONN_HEALTH_CHECKS=True)
+    elif mode == 'pool':
+        database.update(
+            ENGINE='dbpool.backends.' + database['ENGINE'].rsplit('.', 1)[1],
+            CONN_MAX_AGE=0,
+            POOL=DB_POOL,
+        )
+    elif mode == 'request':
+        database.update(CONN_MAX_AGE=0)
+    else:
+        raise ValueError(f'DB_CONNECTION_MODE: неизвестный режим {mode!r}')
+    return database
+
+
+DATABASES['default'] = connection_settings(DATABASES['default'], DB_CONNECTION_MODE)
+
+# Реплики для чтения (replicas): DB_REPLICA_HOSTS="host1,host2" — алиасы
+# replica1, replica2 с теми же параметрами, что и default. Роутер отправляет
+# на них чтения REPLICA_READ_MODELS внутри HTTP-запросов; реплика с
+# отставанием больше REPLICA_MAX_LAG секунд (проверка раз в
+# REPLICA_LAG_CHECK_INTERVAL) не используется. После записи клиент
+# REPLICA_PIN_SECONDS секунд читает с основной базы, а после изменения
+# REPLICA_FRESH_MODELS — все клиенты (отметка в кэше REPLICA_CACHE_ALIAS).
+# В тестах реплики зеркалят default (TEST MIRROR).
+DB_REPLICA_HOSTS = [host for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if host]
+REPLICA_DATABASES = []
+for number, host in enumerate(DB_REPLICA_HOSTS, 1):
+    DATABASES[f'replica{number}'] = dict(DATABASES['default'], HOST=host, TEST={'MIRROR': 'default'})
+    REPLICA_DATABASES.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['replicas.router.ReplicaRouter']
+REPLICA_FRESH_MODELS = [
+    'knifestore.category', 'knifestore.brand', 'knifestore.series', 'knifestore.knife', 'knifestore.searchtoken',
+]
+REPLICA_READ_MODELS = REPLICA_FRESH_MODELS + ['analytics']
+REPLICA_MAX_LAG = 5
+REPLICA_LAG_CHECK_INTERVAL = 5
+REPLICA_PIN_SECONDS = REPLICA_MAX_LAG
+REPLICA_PIN_COOKIE = 'primary_until'
+REPLICA_CACHE_ALIAS = 'default'
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# По умолчанию — локальная память процесса. Для нескольких воркеров задайте
+# CACHE_URL (redis://...), чтобы кэш и его версии были общими.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'knifestore',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+
+if os.environ.get('CACHE_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['CACHE_URL'],
+    }
+
+# Кэш страниц и фрагментов каталога (knifestore.cache)
+CATALOG_CACHE_ALIAS = 'default'
+CATALOG_CACHE_TIMEOUT = 60 * 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -146,4 +252,49 @@ BASKET_SESSION_ID = 'basket'
 REST_FRAMEWORK = {
     'DATETIME_FORMAT': '%Y-%m-%d %H:%M:%S.%f%z'
 
-}
\ No newline at end of file
+}
+
+# Проверка бюджета SQL-запросов представлений (QueryPlanMixin.query_budget).
+# Включается в тестах, чтобы N+1 ронял страницу, а не тихо замедлял её.
+QUERY_BUDGET_ENFORCE = False
+
+# Хранилище корзины: SessionBasketStorage (в сессии), DatabaseBasketStorage
+# (StoredBasket/BasketLine, общая для всех устройств пользователя) или
+# CacheBasketStorage (кэш BASKET_CACHE_ALIAS).
+BASKET_STORAGE = 'basket.storage.DatabaseBasketStorage'
+BASKET_CACHE_ALIAS = 'default'
+BASKET_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
+# Производные фото ножей (knifestore.images): ширины миниатюр в px. Обработка
+# идёт в фоновом потоке; False — синхронно в запросе (тесты, отладка).
+IMAGE_VARIANT_WIDTHS = (320, 640, 1280)
+IMAGE_PIPELINE_ASYNC = True
+
+# Пакетные эндпоинты API (/api/<ресурс>/bulk/): максимум объектов в одном
+# запросе. Размер тела дополнительно ограничен DATA_UPLOAD_MAX_MEMORY_SIZE.
+BULK_MAX_ITEMS = 1000
+
+# Списки API через скомпилированный план сериализатора (values() вместо
+# экземпляров модели). False — обычный путь DRF для всех представлений.
+API_COMPILED_SERIALIZERS = True
+
+# Аналитика продаж: статусы заказов, которые не считаются выручкой
+ANALYTICS_EXCLUDED_STATUSES = ['cancelled']
+
+# Замеры представлений (monitoring.middleware.PerfMiddleware): доля
+# замеряемых запросов, порог медленного SQL для журнала со стеком и как часто
+# поток сбрасывает свои гистограммы в кэш PERF_CACHE_ALIAS. Для отчёта по
+# всем воркерам кэш должен быть общим (CACHE_URL).
+PERF_ENABLED = True
+PERF_SAMPLE_RATE = 0.1
+PERF_SLOW_QUERY_MS = 100
+PERF_FLUSH_INTERVAL = 10
+PERF_CACHE_ALIAS = 'default'
+
+# Async-варианты страниц каталога (/store/, нож, категория) и чтения
+# /api/knives/ — для запуска под ASGI (myproject.asgi). Под WSGI держать
+# False: async-представление там выполняется через async_to_sync.
+# ASYNC_PARALLEL_QUERIES — независимые чтения страницы одновременно, каждое
+# в своём потоке со своим соединением (до N соединений на запрос).
+ASYNC_CATALOG_VIEWS = False
+ASYNC_PARALLEL_QUERIES = True
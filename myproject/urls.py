@@ -20,9 +20,11 @@ from django.conf import settings
 from django.conf.urls.static import static
 
 urlpatterns = [
+    path('admin/perf/', include('monitoring.urls')),
     path('admin/', admin.site.urls),
     path('', include('knifestore.urls')),
     path('basket/', include('basket.urls')),
+    path('analytics/', include('analytics.urls')),
     path('api/', include('api_project.urls')),
 ]
 
@@ -0,0 +1,7 @@
+"""
+Чтение каталога и отчётов с реплик БД.
+
+Алиасы реплик — REPLICA_DATABASES, маршрутизация — replicas.router.ReplicaRouter
+в DATABASE_ROUTERS, закрепление за основной базой после записи —
+replicas.middleware.PrimaryPinMiddleware.
+"""
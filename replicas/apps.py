@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class ReplicasConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'replicas'
+    verbose_name = 'Реплики БД'
@@ -0,0 +1,74 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+# Статусы MySQL 8.0.22+ и более ранних версий
+MYSQL_STATUS = (
+    ('SHOW REPLICA STATUS', 'Seconds_Behind_Source'),
+    ('SHOW SLAVE STATUS', 'Seconds_Behind_Master'),
+)
+
+_checked = {}
+_lock = threading.Lock()
+
+
+def max_lag():
+    return getattr(settings, 'REPLICA_MAX_LAG', 5)
+
+
+def check_interval():
+    return getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 5)
+
+
+def probe(alias):
+    """
+    Отставание реплики в секундах прямо сейчас; None — неизвестно (реплика
+    недоступна или репликация остановлена), такую реплику не используем.
+    Для SQLite и других баз без статуса репликации — 0, если база отвечает.
+    """
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor != 'mysql':
+                cursor.execute('SELECT 1')
+                return 0.0
+            for statement, column in MYSQL_STATUS:
+                try:
+                    cursor.execute(statement)
+                except DatabaseError:
+                    continue
+                row = cursor.fetchone()
+                if row is None:
+                    return None  # сервер не реплика
+                value = row[[item[0] for item in cursor.description].index(column)]
+                return None if value is None else float(value)
+            return None
+    except DatabaseError:
+        connection.close()
+        return None
+
+
+def replica_lag(alias):
+    """Отставание с кэшем в процессе на REPLICA_LAG_CHECK_INTERVAL секунд"""
+    now = time.monotonic()
+    with _lock:
+        checked = _checked.get(alias)
+    if checked is not None and now - checked[0] < check_interval():
+        return checked[1]
+    lag = probe(alias)
+    with _lock:
+        _checked[alias] = now, lag
+    return lag
+
+
+def is_healthy(alias):
+    lag = replica_lag(alias)
+    return lag is not None and lag <= max_lag()
+
+
+def forget():
+    """Сбросить замеры — следующий выбор реплики проверит их заново"""
+    with _lock:
+        _checked.clear()
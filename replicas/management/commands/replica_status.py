@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from replicas.lag import max_lag, probe
+from replicas.router import replica_aliases
+
+
+class Command(BaseCommand):
+    help = 'Отставание реплик REPLICA_DATABASES и какие из них принимают чтения'
+
+    def handle(self, *args, **options):
+        aliases = replica_aliases()
+        if not aliases:
+            self.stdout.write('Реплики не настроены (REPLICA_DATABASES пуст): все чтения — с основной базы')
+            return
+        healthy = 0
+        for alias in aliases:
+            lag = probe(alias)
+            if lag is None:
+                self.stdout.write(self.style.ERROR(f'{alias}: недоступна или репликация остановлена'))
+            elif lag > max_lag():
+                self.stdout.write(self.style.WARNING(f'{alias}: отстаёт на {lag:g} с (допустимо {max_lag()} с)'))
+            else:
+                healthy += 1
+                self.stdout.write(self.style.SUCCESS(f'{alias}: отставание {lag:g} с'))
+        if not healthy:
+            raise CommandError('Нет пригодных реплик: чтения идут с основной базы')
@@ -0,0 +1,72 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .lag import max_lag
+from .router import RequestState, current
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def pin_cookie():
+    return getattr(settings, 'REPLICA_PIN_COOKIE', 'primary_until')
+
+
+def pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', max_lag())
+
+
+class PrimaryPinMiddleware:
+    """
+    Состояние маршрутизации реплик на время запроса (replicas.router).
+
+    Небезопасные методы читают с основной базы целиком. Если запрос что-то
+    записал, клиент получает cookie и следующие REPLICA_PIN_SECONDS секунд
+    тоже читает с основной базы: после basket_add или open_order редирект
+    покажет свою же запись, даже если реплика отстаёт. Работает и под
+    WSGI, и под ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        state = self.start(request)
+        token = current.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        state = self.start(request)
+        token = current.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(state, response)
+
+    def start(self, request):
+        try:
+            pinned_until = float(request.COOKIES.get(pin_cookie(), 0))
+        except ValueError:
+            pinned_until = 0
+        return RequestState(pinned=request.method not in SAFE_METHODS or pinned_until > time.time())
+
+    def finish(self, state, response):
+        if state.wrote:
+            seconds = pin_seconds()
+            response.set_cookie(
+                pin_cookie(), f'{time.time() + seconds:.3f}', max_age=seconds, httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,124 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .lag import is_healthy, max_lag
+
+WRITE_KEY = 'replicas:fresh_write'
+
+# Состояние текущего запроса (ставит PrimaryPinMiddleware). Объект, а не
+# значения в ContextVar: потоки sync_to_async получают копию контекста, и
+# отметка о записи из них должна быть видна middleware.
+current = ContextVar('replica_request', default=None)
+forced = ContextVar('replica_forced_primary', default=False)
+
+
+class RequestState:
+    __slots__ = ('pinned', 'wrote', 'replica', 'fresh_write')
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+        self.replica = None
+        self.fresh_write = None
+
+
+def replica_aliases():
+    return list(getattr(settings, 'REPLICA_DATABASES', ()))
+
+
+def model_label(model):
+    # Промежуточная таблица M2M маршрутизируется вместе со своей моделью
+    opts = model._meta.auto_created._meta if model._meta.auto_created else model._meta
+    return opts.label_lower
+
+
+def matches(model, labels):
+    label = model_label(model)
+    return label in labels or label.partition('.')[0] in labels
+
+
+def write_cache():
+    return caches[getattr(settings, 'REPLICA_CACHE_ALIAS', 'default')]
+
+
+@contextmanager
+def use_primary():
+    """Все чтения внутри блока — с основной базы (например, перед записью по прочитанному)"""
+    token = forced.set(True)
+    try:
+        yield
+    finally:
+        forced.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Чтения моделей REPLICA_READ_MODELS (каталог, таблицы отчётов) — с
+    реплики, всё остальное и все записи — с основной базы.
+
+    Реплика используется только внутри HTTP-запроса (PrimaryPinMiddleware),
+    и то не всегда — чтение остаётся на основной базе, если:
+      * запрос небезопасный (POST и т. п.) или в нём уже была запись;
+      * клиент недавно писал — cookie закрепления после basket_add, open_order;
+      * идёт транзакция на основной базе (select_for_update, place_order);
+      * модель из REPLICA_FRESH_MODELS менялась меньше REPLICA_MAX_LAG секунд
+        назад кем угодно — иначе кэш каталога сохранил бы устаревшую
+        страницу с новой версией;
+      * нет реплики с отставанием не больше REPLICA_MAX_LAG (replicas.lag).
+    Команды, фоновые задачи и shell читают только с основной базы.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = current.get()
+        if state is None or state.pinned or state.wrote or forced.get() or not replica_aliases():
+            return DEFAULT_DB_ALIAS
+        if not matches(model, getattr(settings, 'REPLICA_READ_MODELS', ())):
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db in replica_aliases():
+            return instance._state.db  # связанные объекты — с той же реплики
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if self.recently_written(state, model):
+            return DEFAULT_DB_ALIAS
+        return self.choose_replica(state)
+
+    def db_for_write(self, model, **hints):
+        state = current.get()
+        if state is not None:
+            state.wrote = True
+        if replica_aliases() and matches(model, getattr(settings, 'REPLICA_FRESH_MODELS', ())):
+            write_cache().set(WRITE_KEY, time.time(), max_lag())
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема приходит на реплики репликацией
+        if db in replica_aliases():
+            return False
+        return None
+
+    def recently_written(self, state, model):
+        if not matches(model, getattr(settings, 'REPLICA_FRESH_MODELS', ())):
+            return False
+        if state.fresh_write is None:
+            state.fresh_write = write_cache().get(WRITE_KEY, 0)
+        return time.time() - state.fresh_write < max_lag()
+
+    def choose_replica(self, state):
+        """Одна реплика на запрос — все его чтения видят один момент времени"""
+        if state.replica is None:
+            healthy = [alias for alias in replica_aliases() if is_healthy(alias)]
+            state.replica = random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+        return state.replica
@@ -0,0 +1,112 @@
+"""
+Роутер реплик на двух локальных SQLite-базах: default и REPLICA.
+
+Алиас REPLICA добавляется при импорте модуля, до создания тестовых баз, —
+раннер создаёт и мигрирует для него отдельную базу (не зеркало default),
+поэтому по содержимому видно, откуда пришло чтение. TransactionTestCase:
+внутри транзакции TestCase роутер по правилам читает только с основной базы.
+"""
+from unittest import mock
+
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings
+
+from knifestore.models import Category, Customer
+
+from . import lag
+from .middleware import PrimaryPinMiddleware
+from .router import RequestState, current, use_primary
+
+REPLICA = 'replica_test'
+
+primary = connections.settings[DEFAULT_DB_ALIAS]
+connections.settings.setdefault(REPLICA, dict(primary, TEST=dict(primary['TEST'], NAME=None, MIRROR=None)))
+
+ONLY_ON_REPLICA = 'Только на реплике'
+ONLY_ON_PRIMARY = 'Только на основной'
+
+
+@override_settings(REPLICA_DATABASES=[REPLICA], REPLICA_MAX_LAG=5, REPLICA_PIN_SECONDS=5)
+class ReplicaRouterTests(TransactionTestCase):
+    databases = {DEFAULT_DB_ALIAS, REPLICA}
+
+    def setUp(self):
+        caches['default'].clear()
+        lag.forget()
+        # Расхождение баз, как у отстающей реплики
+        Category(name=ONLY_ON_REPLICA).save(using=REPLICA)
+        Category(name=ONLY_ON_PRIMARY).save(using=DEFAULT_DB_ALIAS)
+
+    def tearDown(self):
+        # flush после теста не трогает реплику: allow_migrate для неё False
+        Category.objects.using(REPLICA).delete()
+
+    def read_categories(self, state):
+        token = current.set(state)
+        try:
+            return set(Category.objects.values_list('name', flat=True))
+        finally:
+            current.reset(token)
+
+    def test_request_reads_go_to_replica(self):
+        self.assertEqual(self.read_categories(RequestState()), {ONLY_ON_REPLICA})
+
+    def test_reads_outside_request_and_other_models_use_primary(self):
+        self.assertEqual(set(Category.objects.values_list('name', flat=True)), {ONLY_ON_PRIMARY})
+        Customer.objects.using(DEFAULT_DB_ALIAS).create(phone='1')
+        token = current.set(RequestState())
+        try:
+            self.assertEqual(Customer.objects.count(), 1)
+            with use_primary():
+                self.assertEqual(set(Category.objects.values_list('name', flat=True)), {ONLY_ON_PRIMARY})
+        finally:
+            current.reset(token)
+
+    def test_unsafe_request_reads_primary(self):
+        self.assertEqual(self.read_categories(RequestState(pinned=True)), {ONLY_ON_PRIMARY})
+
+    def test_reads_stick_to_primary_after_write(self):
+        state = RequestState()
+        token = current.set(state)
+        try:
+            Customer.objects.create(phone='1')
+            self.assertTrue(state.wrote)
+            self.assertEqual(set(Category.objects.values_list('name', flat=True)), {ONLY_ON_PRIMARY})
+        finally:
+            current.reset(token)
+
+    def test_write_pins_client_with_cookie(self):
+        def view(request):
+            if request.method == 'POST':
+                Customer.objects.create(phone='1')
+            return HttpResponse(','.join(sorted(Category.objects.values_list('name', flat=True))))
+
+        middleware = PrimaryPinMiddleware(view)
+        factory = RequestFactory()
+        response = middleware(factory.post('/'))
+        cookie = response.cookies['primary_until']
+
+        request = factory.get('/')
+        request.COOKIES['primary_until'] = cookie.value
+        self.assertEqual(middleware(request).content.decode(), ONLY_ON_PRIMARY)
+        self.assertEqual(middleware(factory.get('/')).content.decode(), ONLY_ON_REPLICA)
+
+    def test_fresh_catalog_write_reads_primary_for_everyone(self):
+        Category.objects.create(name='Новая')
+        self.assertEqual(self.read_categories(RequestState()), {ONLY_ON_PRIMARY, 'Новая'})
+        caches['default'].clear()  # отметка о записи истекла (REPLICA_MAX_LAG)
+        self.assertEqual(self.read_categories(RequestState()), {ONLY_ON_REPLICA})
+
+    def test_lagging_replica_falls_back_to_primary(self):
+        with mock.patch.object(lag, 'probe', return_value=30.0):
+            self.assertEqual(self.read_categories(RequestState()), {ONLY_ON_PRIMARY})
+
+    def test_failed_replica_falls_back_to_primary(self):
+        with mock.patch.object(lag, 'probe', return_value=None):
+            self.assertEqual(self.read_categories(RequestState()), {ONLY_ON_PRIMARY})
+
+    def test_replica_is_probed_for_real(self):
+        self.assertEqual(lag.probe(REPLICA), 0.0)
+        self.assertTrue(lag.is_healthy(REPLICA))